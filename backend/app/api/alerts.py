@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from ..core.database import get_db
+from ..api.dependencies import get_current_active_user, get_verified_active_user
+from ..api.stocks import stock_service
+from ..schemas.schemas import Alert, AlertCreate
+from ..services.alerts import AlertService, create_alert_notifier
+from ..models.models import Alert as AlertModel, User as UserModel
+
+router = APIRouter(prefix="/alerts", tags=["alerts"])
+
+alert_service = AlertService(create_alert_notifier())
+stock_service.listeners.append(alert_service.on_stocks_changed)
+
+
+def _alert_response(alert: AlertModel, symbol: str) -> Alert:
+    return Alert(
+        id=alert.id,
+        symbol=symbol,
+        metric=alert.metric,
+        direction=alert.direction,
+        threshold=alert.threshold,
+        active=alert.active,
+        created_at=alert.created_at,
+        triggered_at=alert.triggered_at,
+        triggered_value=alert.triggered_value,
+    )
+
+
+@router.post("", response_model=Alert, status_code=status.HTTP_201_CREATED)
+def create_alert(
+    request: AlertCreate,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_verified_active_user)
+):
+    """Alert when a stock's metric crosses a threshold."""
+    stock = stock_service.get_stock_by_symbol(db, request.symbol)
+    if not stock:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stock not found"
+        )
+    alert = alert_service.create_alert(
+        db, current_user, stock, request.metric, request.direction, request.threshold
+    )
+    return _alert_response(alert, stock.symbol)
+
+
+@router.get("", response_model=List[Alert])
+def list_alerts(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """List the user's alerts, newest first, including triggered ones."""
+    return [_alert_response(alert, symbol) for alert, symbol in alert_service.list_alerts(db, current_user)]
+
+
+@router.delete("/{alert_id}")
+def delete_alert(
+    alert_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_verified_active_user)
+):
+    """Delete an alert."""
+    alert = alert_service.get_alert(db, current_user, alert_id)
+    if not alert:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert not found"
+        )
+    alert_service.delete_alert(db, alert)
+    return {"message": "Alert deleted"}
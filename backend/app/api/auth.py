@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from datetime import timedelta
@@ -7,39 +8,65 @@ from ..core.security import create_access_token
 from ..core.config import settings
 from ..schemas.schemas import UserCreate, UserLogin, User, Token
 from ..services.user_service import UserService
+from ..services.password_hasher import HasherBusyError, PasswordHasher
+from ..api.dependencies import get_current_active_user, principal_cache
+from ..models.models import User as UserModel
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# bcrypt runs here instead of on the request threadpool
+password_hasher = PasswordHasher()
+
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 
 @router.post("/register", response_model=User)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     # Check if user already exists
-    if UserService.get_user_by_email(db, user.email):
+    if await run_in_threadpool(UserService.get_user_by_email, db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    if UserService.get_user_by_username(db, user.username):
+    if await run_in_threadpool(UserService.get_user_by_username, db, user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherBusyError:
+        raise _hasher_busy()
+    
     # Create user
-    db_user = UserService.create_user(db, user)
+    db_user = await run_in_threadpool(UserService.create_user, db, user, hashed_password)
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user and return access token."""
-    user = UserService.authenticate_user(
-        db, user_credentials.username, user_credentials.password
+    user = await run_in_threadpool(
+        UserService.get_user_by_username, db, user_credentials.username
     )
     
-    if not user:
+    try:
+        authenticated = user is not None and await password_hasher.verify(
+            user_credentials.password, user.hashed_password
+        )
+    except HasherBusyError:
+        raise _hasher_busy()
+    
+    if not authenticated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -47,8 +74,27 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    # Optionally embed the principal so authenticated requests need no query
+    claims = {"uid": user.id, "act": user.is_active} if settings.token_embed_principal else None
     access_token = create_access_token(
-        subject=user.username, expires_delta=access_token_expires
+        subject=user.username, expires_delta=access_token_expires, claims=claims
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/deactivate", response_model=User)
+def deactivate(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """Deactivate the current user's account."""
+    user = UserService.set_active(db, current_user, False)
+    principal_cache.revoke(user)
+    return user
+
+
+@router.get("/hashing/stats")
+def get_hashing_stats():
+    """Get password hashing pool queue depth, wait times and rejections."""
+    return password_hasher.stats()
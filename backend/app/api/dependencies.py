@@ -6,8 +6,10 @@ from ..core.config import settings
 from ..core.database import get_db
 from ..models.models import User
 from ..schemas.schemas import TokenData
+from ..services.principal_cache import PrincipalCache
 
 security = HTTPBearer()
+principal_cache = PrincipalCache()
 
 
 def get_current_user(
@@ -33,13 +35,42 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Tokens carrying uid/act claims and recently seen users skip the query
+    user = (
+        principal_cache.from_claims(db, token_data.username, payload)
+        or principal_cache.get(db, token_data.username)
+    )
+    if user is not None:
+        return user
+    
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
+    principal_cache.put(user)
     return user
 
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def get_verified_active_user(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Active user for requests that change data, re-checked against the database.
+
+    Cached principals and embedded token claims are trusted for up to
+    ``principal_cache_ttl_seconds`` (claims for the token lifetime), and only
+    ``/auth/deactivate`` in the same process revokes them. Writes read
+    ``is_active`` once more so a user deactivated elsewhere cannot change
+    anything, and revoke the stale principal in this process.
+    """
+    is_active = db.query(User.is_active).filter(User.id == current_user.id).scalar()
+    if not is_active:
+        principal_cache.revoke(current_user)
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from ..core.database import get_db
+from ..api.dependencies import get_current_active_user, get_verified_active_user
+from ..api.stocks import stock_service
+from ..schemas.schemas import SavedScreen, SavedScreenCreate, SavedScreenView
+from ..services.saved_screens import SavedScreenService
+from ..models.models import SavedScreen as SavedScreenModel, User as UserModel
+
+router = APIRouter(prefix="/screens", tags=["screens"])
+
+saved_screen_service = SavedScreenService(stock_service)
+stock_service.listeners.append(saved_screen_service.on_stocks_changed)
+
+
+def _screen_response(screen: SavedScreenModel) -> SavedScreen:
+    return SavedScreen(
+        id=screen.id,
+        name=screen.name,
+        filters=SavedScreenService.filters_of(screen),
+        created_at=screen.created_at,
+        last_viewed_at=screen.last_viewed_at,
+    )
+
+
+def _get_screen_or_404(db: Session, user: UserModel, screen_id: int) -> SavedScreenModel:
+    screen = saved_screen_service.get_screen(db, user, screen_id)
+    if not screen:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Saved screen not found"
+        )
+    return screen
+
+
+@router.post("", response_model=SavedScreen, status_code=status.HTTP_201_CREATED)
+def create_screen(
+    request: SavedScreenCreate,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_verified_active_user)
+):
+    """Save a screen and materialize its current results."""
+    try:
+        screen = saved_screen_service.create_screen(db, current_user, request.name, request.filters)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not screen:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A saved screen with this name already exists"
+        )
+    return _screen_response(screen)
+
+
+@router.get("", response_model=List[SavedScreen])
+def list_screens(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """List the user's saved screens."""
+    return [_screen_response(screen) for screen in saved_screen_service.list_screens(db, current_user)]
+
+
+@router.get("/{screen_id}", response_model=SavedScreenView)
+def view_screen(
+    screen_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    """Current results plus the symbols that entered and left since the last view."""
+    screen = _get_screen_or_404(db, current_user, screen_id)
+    try:
+        view = saved_screen_service.view_screen(db, screen)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    view['screen'] = _screen_response(view['screen'])
+    return view
+
+
+@router.delete("/{screen_id}")
+def delete_screen(
+    screen_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_verified_active_user)
+):
+    """Delete a saved screen."""
+    screen = _get_screen_or_404(db, current_user, screen_id)
+    saved_screen_service.delete_screen(db, screen)
+    return {"message": "Saved screen deleted"}
@@ -1,73 +1,227 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Response, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from ..core.database import get_db
-from ..api.dependencies import get_current_active_user
-from ..schemas.schemas import Stock, ScreeningFilters, User, WatchlistResponse, AIAnalysis
+from datetime import date
+from typing import Iterator, List, Literal, Optional
+import csv
+import io
+import json
+from ..core.config import settings
+from ..core.database import SessionLocal, get_db
+from ..api.dependencies import get_current_active_user, get_verified_active_user
+from ..schemas.schemas import (
+    Stock, ScreeningFilters, ScreenedStock, User, WatchlistResponse, AIAnalysis, PopulateRequest,
+    FinancialData, AnalysisJob, PriceHistory, HistoryRefreshRequest
+)
 from ..services.stock_service import StockService
-from ..services.alpha_vantage import AlphaVantageService
+from ..services.alpha_vantage import AlphaVantageService, RateLimiter
+from ..services.async_alpha_vantage import AsyncAlphaVantageService
 from ..services.ai_analysis import AIAnalysisService
+from ..services.analysis_jobs import AnalysisJobQueue
+from ..services.cache import create_response_cache
+from ..services.financial_data import FinancialDataService
+from ..services.ingestion import IngestionPipeline
+from ..services.refresh_scheduler import RefreshScheduler
+from ..services.price_history import PriceHistoryService, PriceHistoryStore, is_valid_symbol
+from ..services.pagination import InvalidCursorError, decode_cursor, projected_fields
+from ..services.screen_expressions import ExpressionError, compile_expression
+from ..services.screening_engine import ColumnarScreeningEngine
+from ..services.sector_ranks import SectorRankIndex
+from ..services.symbol_lookup import SymbolLookup
+from ..services.technical_indicators import TechnicalIndicatorEngine
+from ..services.watchlist_refresh import WatchlistRefresher
 from ..models.models import User as UserModel
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 
 # Initialize services
-alpha_vantage_service = AlphaVantageService()
-stock_service = StockService(alpha_vantage_service)
-ai_service = AIAnalysisService(alpha_vantage_service)
+response_cache = create_response_cache()
+# One budget per API key, shared by the sync and async clients
+alpha_vantage_rate_limiter = RateLimiter(settings.alpha_vantage_calls_per_minute)
+alpha_vantage_service = AlphaVantageService(response_cache, alpha_vantage_rate_limiter)
+async_alpha_vantage_service = AsyncAlphaVantageService(response_cache, alpha_vantage_rate_limiter)
+screening_engine = ColumnarScreeningEngine() if settings.screening_engine_enabled else None
+price_history_store = PriceHistoryStore()
+technical_engine = TechnicalIndicatorEngine(price_history_store)
+sector_rank_index = SectorRankIndex()
+stock_service = StockService(
+    alpha_vantage_service, screening_engine, technical_engine, sector_rank_index
+)
+symbol_lookup = SymbolLookup(stock_service)
+financial_data_service = FinancialDataService()
+ai_service = AIAnalysisService(alpha_vantage_service, financial_data_service)
+analysis_jobs = AnalysisJobQueue(ai_service)
+ingestion_pipeline = IngestionPipeline(
+    async_alpha_vantage_service, stock_service, financial_data=financial_data_service
+)
+refresh_scheduler = RefreshScheduler(async_alpha_vantage_service, stock_service)
+watchlist_refresher = WatchlistRefresher(async_alpha_vantage_service, stock_service)
+price_history_service = PriceHistoryService(async_alpha_vantage_service, price_history_store)
+price_history_service.listeners.append(technical_engine.notify)
 
 
 @router.get("/search/{symbol}", response_model=Stock)
 def get_stock(symbol: str, db: Session = Depends(get_db)):
     """Get stock information by symbol."""
-    stock = stock_service.get_stock_by_symbol(db, symbol)
+    # Falls back to Alpha Vantage, sharing one fetch between concurrent misses
+    stock = symbol_lookup.get_or_create(db, symbol)
     
     if not stock:
-        # Try to fetch from API
-        stock = stock_service.create_or_update_stock(db, symbol)
-        if not stock:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Stock not found"
-            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stock not found"
+        )
     
     return stock
 
 
-@router.post("/screen", response_model=List[Stock])
+@router.post("/screen", response_model=List[ScreenedStock], response_model_exclude_unset=True)
 def screen_stocks(
     filters: ScreeningFilters, 
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """Screen stocks based on filters."""
-    stocks = stock_service.screen_stocks(db, filters)
+    """
+    Screen stocks based on filters.
+    
+    Returns one page of results; when more rows match, the cursor for the
+    next page is sent in the X-Next-Cursor header.
+    """
+    try:
+        stocks, next_cursor = stock_service.screen_stocks(db, filters)
+    except (InvalidCursorError, ExpressionError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return stocks
 
 
+@router.post("/screen/export")
+def export_screen(
+    filters: ScreeningFilters,
+    format: Literal["ndjson", "csv"] = "ndjson"
+):
+    """
+    Stream every stock matching the filters as NDJSON or CSV.
+    
+    Uses the same filters, sort and projection as /screen but no limit. Rows
+    are read through a server-side cursor and written straight from the
+    database tuples, so memory use does not grow with the result size.
+    """
+    try:
+        decode_cursor(filters)
+        if filters.expression:
+            compile_expression(filters.expression)
+    except (InvalidCursorError, ExpressionError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    fields = projected_fields(filters)
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+    
+    def stream() -> Iterator[str]:
+        # The request session is not guaranteed to outlive the response,
+        # so the stream owns its session.
+        db = SessionLocal()
+        try:
+            rows = stock_service.iter_screen_rows(db, filters)
+            yield from encode(fields, rows)
+        finally:
+            db.close()
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=screen.{format}"}
+    )
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_ndjson(fields: List[str], rows: Iterator[tuple], chunk_rows: int = 500) -> Iterator[str]:
+    """One JSON object per line, emitted in chunks of ``chunk_rows`` lines."""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(fields, row)), default=_json_default))
+        if len(chunk) >= chunk_rows:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def _encode_csv(fields: List[str], rows: Iterator[tuple], chunk_rows: int = 500) -> Iterator[str]:
+    """Header line followed by the rows, emitted in chunks of ``chunk_rows``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Get Alpha Vantage response cache hit/miss counters."""
+    if not alpha_vantage_service.cache:
+        return {"backend": None, "hits": 0, "misses": 0, "hit_ratio": 0.0, "by_function": {}}
+    return alpha_vantage_service.cache.stats()
+
+
 @router.post("/populate")
 def populate_stocks(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    request: Optional[PopulateRequest] = None,
+    current_user: UserModel = Depends(get_verified_active_user)
 ):
     """Populate database with S&P 500 stocks (background task)."""
-    def populate_task():
-        symbols = alpha_vantage_service.get_sp500_symbols()
-        for symbol in symbols[:10]:  # Limit to first 10 for demo
-            try:
-                stock_service.create_or_update_stock(db, symbol)
-            except Exception as e:
-                print(f"Error populating {symbol}: {e}")
+    if ingestion_pipeline.progress.running:
+        return {
+            "message": "Stock population already running",
+            "progress": ingestion_pipeline.progress.to_dict()
+        }
     
-    background_tasks.add_task(populate_task)
-    return {"message": "Stock population started in background"}
+    symbols = request.symbols if request and request.symbols else alpha_vantage_service.get_sp500_symbols()
+    include_statements = request.include_statements if request else False
+    background_tasks.add_task(ingestion_pipeline.run, symbols, include_statements)
+    return {"message": f"Stock population of {len(symbols)} symbols started in background"}
+
+
+@router.get("/populate/status")
+def get_populate_status(current_user: UserModel = Depends(get_current_active_user)):
+    """Get progress and throughput of the current or last population run."""
+    return ingestion_pipeline.progress.to_dict()
+
+
+@router.get("/refresh/status")
+def get_refresh_status():
+    """Get the refresh queue depth and freshness SLO status."""
+    return refresh_scheduler.status()
 
 
 @router.post("/watchlist/add/{symbol}")
 def add_to_watchlist(
     symbol: str,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_verified_active_user)
 ):
     """Add stock to user's watchlist."""
     success = stock_service.add_to_watchlist(db, current_user, symbol)
@@ -85,7 +239,7 @@ def add_to_watchlist(
 def remove_from_watchlist(
     symbol: str,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_verified_active_user)
 ):
     """Remove stock from user's watchlist."""
     success = stock_service.remove_from_watchlist(db, current_user, symbol)
@@ -109,13 +263,120 @@ def get_watchlist(
     return {"stocks": stocks}
 
 
-@router.get("/{symbol}/analysis", response_model=AIAnalysis)
-def get_stock_analysis(
+@router.post("/watchlist/refresh", status_code=status.HTTP_202_ACCEPTED)
+async def refresh_watchlist(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_verified_active_user)
+):
+    """Refresh current prices for every stock on the user's watchlist (background task)."""
+    symbols = await run_in_threadpool(stock_service.get_watchlist_symbols, db, current_user)
+    
+    progress = watchlist_refresher.start(current_user.id, symbols)
+    if progress is None:
+        return {
+            "message": "Watchlist refresh already running",
+            "progress": watchlist_refresher.status(current_user.id).to_dict()
+        }
+    
+    background_tasks.add_task(watchlist_refresher.run, progress)
+    return {
+        "message": f"Watchlist refresh of {len(symbols)} symbols started in background",
+        "progress": progress.to_dict()
+    }
+
+
+@router.get("/watchlist/refresh/status")
+def get_watchlist_refresh_status(current_user: UserModel = Depends(get_current_active_user)):
+    """Get the progress of the user's current or last watchlist refresh."""
+    progress = watchlist_refresher.status(current_user.id)
+    
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No watchlist refresh started"
+        )
+    
+    return progress.to_dict()
+
+
+@router.get("/{symbol}/financials", response_model=List[FinancialData])
+def get_stock_financials(symbol: str, db: Session = Depends(get_db)):
+    """Get stored annual and quarterly financial history, newest first."""
+    stock = stock_service.get_stock_by_symbol(db, symbol)
+    
+    if not stock:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stock not found"
+        )
+    
+    return financial_data_service.get_history(db, stock.id)
+
+
+@router.post("/history/refresh")
+def refresh_price_history(
+    background_tasks: BackgroundTasks,
+    request: Optional[HistoryRefreshRequest] = None,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_verified_active_user)
+):
+    """Fetch missing daily bars for the given symbols, or every stock (background task)."""
+    if request and request.symbols:
+        symbols = request.symbols
+        invalid = [symbol for symbol in symbols if not is_valid_symbol(symbol)]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid symbols: {', '.join(invalid)}"
+            )
+    else:
+        symbols = [symbol for symbol in stock_service.get_all_symbols(db) if is_valid_symbol(symbol)]
+    background_tasks.add_task(price_history_service.update_many, symbols)
+    return {"message": f"Price history refresh of {len(symbols)} symbols started in background"}
+
+
+@router.get("/{symbol}/history", response_model=PriceHistory)
+def get_price_history(
     symbol: str,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
 ):
-    """Get AI analysis for a stock."""
+    """Get stored daily OHLCV bars, fetching any missing days in the background."""
+    if not is_valid_symbol(symbol):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid symbol"
+        )
+    
+    stock = stock_service.get_stock_by_symbol(db, symbol)
+    
+    if not stock:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stock not found"
+        )
+    
+    symbol = stock.symbol
+    refreshing = price_history_service.is_stale(symbol)
+    if refreshing:
+        background_tasks.add_task(price_history_service.update, symbol)
+    bars = price_history_service.store.read(symbol, start, end)
+    
+    return {
+        "symbol": symbol,
+        "dates": bars["date"].tolist(),
+        **{column: bars[column].tolist() for column in ("open", "high", "low", "close", "volume")},
+        "refreshing": refreshing,
+    }
+
+
+@router.get("/{symbol}/analysis", response_model=AIAnalysis)
+def get_stock_analysis(symbol: str, db: Session = Depends(get_db)):
+    """Get AI analysis for a stock, queueing its generation if none exists."""
     stock = stock_service.get_stock_by_symbol(db, symbol)
     
     if not stock:
@@ -128,15 +389,29 @@ def get_stock_analysis(
     analysis = ai_service.get_latest_analysis(db, stock.id)
     
     if not analysis:
-        # Generate new analysis in background
-        def generate_analysis():
-            ai_service.generate_analysis(db, stock)
-        
-        background_tasks.add_task(generate_analysis)
-        
+        # Concurrent requests for the same stock share one job
+        job = analysis_jobs.enqueue(db, stock)
         raise HTTPException(
             status_code=status.HTTP_202_ACCEPTED,
-            detail="Analysis generation started. Please check back in a few moments."
+            detail={
+                "message": "Analysis generation started. Please check back in a few moments.",
+                "job_id": job.id,
+                "status": job.status,
+            }
+        )
+    
+    return analysis
+
+
+@router.get("/analysis/jobs/{job_id}", response_model=AnalysisJob)
+def get_analysis_job(job_id: int, db: Session = Depends(get_db)):
+    """Get the status of an analysis job."""
+    job = analysis_jobs.get_job(db, job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis job not found"
         )
     
-    return analysis
\ No newline at end of file
+    return job
\ No newline at end of file
@@ -15,11 +15,56 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+    token_embed_principal: bool = False
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_entries: int = 10000
     
     # Alpha Vantage API
     alpha_vantage_api_key: str = "GGHF06JLSAHDOL5L"
     alpha_vantage_base_url: str = "https://www.alphavantage.co/query"
+    alpha_vantage_calls_per_minute: int = 5
+    alpha_vantage_max_connections: int = 10
+    alpha_vantage_cache_backend: str = "memory"  # memory, redis or none
+    alpha_vantage_cache_max_entries: int = 10000
+    unknown_symbol_ttl_seconds: int = 600
+    unknown_symbol_cache_max_entries: int = 10000
     
+    # Ingestion
+    ingestion_batch_size: int = 500
+    ingestion_parse_workers: int = 4
+    ingestion_checkpoint_path: str = "data/ingestion_checkpoint.json"
+    
+    # Background refresh
+    refresh_scheduler_enabled: bool = False
+    refresh_calls_per_minute: int = 3
+    refresh_scan_interval_seconds: int = 300
+    refresh_freshness_slo: float = 0.95
+    
+    # Price history
+    price_history_dir: str = "data/price_history"
+    technical_indicator_cache_size: int = 32
+    
+    # Screening
+    screening_engine_enabled: bool = False
+    screen_default_limit: int = 500
+    expression_plan_cache_size: int = 256
+    
+    # Analysis jobs
+    analysis_workers: int = 2
+    analysis_retry_after_seconds: int = 300
+    analysis_job_stale_seconds: int = 900
+    analysis_fetch_timeout_seconds: float = 60.0  # at least one rate-limit window
+    
+    # Alerts
+    alert_notifier: str = "log"  # log or none
+    alert_log_path: str = "data/alerts.log"
+    
+    # Metrics
+    metrics_enabled: bool = True
+
     # Redis (for caching)
     redis_url: str = "redis://localhost:6379/0"
     
@@ -1,14 +1,104 @@
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, UniqueConstraint, create_engine, func, inspect, select, text
+from sqlalchemy.schema import AddConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .metrics import instrument_pool
+import logging
 
-engine = create_engine(settings.database_url)
+logger = logging.getLogger(__name__)
+
+# SQLite connections are otherwise tied to the thread that opened them,
+# while FastAPI runs dependencies and endpoints on a threadpool
+connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+engine = create_engine(settings.database_url, connect_args=connect_args)
+if settings.metrics_enabled:
+    instrument_pool(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def add_missing_columns(metadata: MetaData):
+    """
+    Add model columns that existing tables lack.
+
+    ``create_all`` only creates missing tables, so a nullable column added
+    to an existing model (e.g. ``financial_data.fiscal_date_ending``) is
+    added here with ALTER TABLE. Columns that are NOT NULL or have a server
+    default are only logged; they need a migration.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable or column.server_default is not None:
+                    logger.warning(f"Column {table.name}.{column.name} is missing and needs a migration")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
+def add_missing_indexes(metadata: MetaData):
+    """
+    Create model indexes and named unique constraints that existing tables lack.
+
+    Rows that would violate a new unique constraint are removed first,
+    keeping the lowest id of each duplicate group; NULLs group together.
+    SQLite cannot add a constraint to a table, so it gets a unique index of
+    the same name. A failure is logged and leaves the rest to be created.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {index['name'] for index in inspector.get_indexes(table.name)}
+        present |= {constraint['name'] for constraint in inspector.get_unique_constraints(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in present:
+                continue
+            _create(f"index {index.name}", lambda conn, index=index: index.create(conn))
+        for constraint in table.constraints:
+            if not isinstance(constraint, UniqueConstraint) or not constraint.name or constraint.name in present:
+                continue
+            _create(f"constraint {constraint.name}", lambda conn, constraint=constraint: _add_unique(conn, constraint))
+
+
+def _create(label: str, create):
+    try:
+        with engine.begin() as conn:
+            create(conn)
+        logger.info(f"Created {label}")
+    except Exception as e:
+        logger.warning(f"Could not create {label}: {e}")
+
+
+def _add_unique(conn, constraint: UniqueConstraint):
+    table = constraint.table
+    columns = list(constraint.columns)
+    keep = select(func.min(table.c.id)).group_by(*columns).subquery()
+    removed = conn.execute(table.delete().where(table.c.id.not_in(select(keep.c[0])))).rowcount
+    if removed:
+        logger.warning(f"Removed {removed} duplicate rows from {table.name} before adding {constraint.name}")
+    if conn.dialect.name == 'sqlite':
+        quote = conn.dialect.identifier_preparer.quote
+        names = ', '.join(quote(column.name) for column in columns)
+        conn.execute(text(f"CREATE UNIQUE INDEX {quote(constraint.name)} ON {quote(table.name)} ({names})"))
+    else:
+        conn.execute(AddConstraint(constraint))
+
+
 def get_db():
     db = SessionLocal()
     try:
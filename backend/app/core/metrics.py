@@ -0,0 +1,246 @@
+import bisect
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class MetricFamily:
+    """
+    A named metric and its children, one per combination of label values.
+
+    Children are created by ``labels()``; the ones known up front should be
+    created at import so the request path only does a dict lookup. A child
+    first seen under concurrency is installed with ``dict.setdefault``, which
+    is atomic, so two callers always share one child.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, label_names: Sequence[str], factory: Callable[[], Any]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self.children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children.setdefault(values, self._factory())
+        return child
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        for values, child in sorted(self.children.copy().items()):
+            labels = tuple(zip(self.label_names, values))
+            if self.kind == 'histogram':
+                cumulative = 0
+                counts = list(child.counts)
+                for bound, count in zip(child.bounds, counts):
+                    cumulative += count
+                    yield f'{self.name}_bucket', labels + (('le', _format(bound)),), cumulative
+                cumulative += counts[-1]
+                yield f'{self.name}_bucket', labels + (('le', '+Inf'),), cumulative
+                yield f'{self.name}_sum', labels, child.sum
+                yield f'{self.name}_count', labels, cumulative
+            else:
+                yield self.name, labels, child.value
+
+
+class CallbackFamily:
+    """A metric read from existing state when scraped, e.g. a queue length or stats dict."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        label_names: Sequence[str],
+        collect: Callable[[], Union[float, Dict[Tuple[str, ...], float]]],
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.label_names, label_values)), value
+
+
+def _format(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics rendered in the Prometheus text format.
+
+    Counters and histograms are plain attribute and list-slot increments
+    without a lock. Under the GIL a concurrent increment can very rarely be
+    lost, which is accepted to keep the request path free of contention.
+    Registering a name twice returns the existing family.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Union[MetricFamily, CallbackFamily]] = {}
+
+    def _register(self, family):
+        return self._families.setdefault(family.name, family)
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, help, 'counter', label_names, Counter))
+
+    def histogram(
+        self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> MetricFamily:
+        bounds = tuple(sorted(buckets))
+        return self._register(MetricFamily(name, help, 'histogram', label_names, lambda: Histogram(bounds)))
+
+    def gauge_callback(
+        self, name: str, help: str, collect: Callable[[], Any], label_names: Sequence[str] = ()
+    ) -> CallbackFamily:
+        return self._register(CallbackFamily(name, help, 'gauge', label_names, collect))
+
+    def counter_callback(
+        self, name: str, help: str, collect: Callable[[], Any], label_names: Sequence[str] = ()
+    ) -> CallbackFamily:
+        return self._register(CallbackFamily(name, help, 'counter', label_names, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, family in sorted(self._families.items()):
+            lines.append(f'# HELP {name} {family.help}')
+            lines.append(f'# TYPE {name} {family.kind}')
+            for sample, labels, value in family.samples():
+                if labels:
+                    rendered = ','.join(f'{label}="{_escape(v)}"' for label, v in labels)
+                    lines.append(f'{sample}{{{rendered}}} {_format(value)}')
+                else:
+                    lines.append(f'{sample} {_format(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template', ('method', 'route')
+)
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP requests by route template and status', ('method', 'route', 'status')
+)
+db_pool_checkout_wait = registry.histogram(
+    'db_pool_checkout_wait_seconds', 'Time to check a connection out of the database pool', buckets=WAIT_BUCKETS
+)
+db_pool_checkout_wait.labels()
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request by its route template.
+
+    The router records the matched endpoint in the request scope, which is
+    mapped back to the route path so ``/stocks/AAPL`` and ``/stocks/MSFT``
+    share ``/stocks/{symbol}``. Histograms for every route are created up
+    front from ``routes``.
+    """
+
+    def __init__(self, app, routes: Sequence[Any]):
+        self.app = app
+        self._routes = routes
+        self._paths: Optional[Dict[Any, str]] = None
+
+    def _route_paths(self) -> Dict[Any, str]:
+        # Built on first request, once every route has been added
+        if self._paths is None:
+            paths = {}
+            for route in self._routes:
+                endpoint = getattr(route, 'endpoint', None)
+                if endpoint is None:
+                    continue
+                paths[endpoint] = route.path
+                for method in getattr(route, 'methods', None) or ():
+                    http_request_duration.labels(method, route.path)
+            self._paths = paths
+        return self._paths
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        paths = self._route_paths()
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = paths.get(scope.get('endpoint'), UNMATCHED_ROUTE)
+            method = scope['method']
+            http_request_duration.labels(method, route).observe(elapsed)
+            http_requests.labels(method, route, str(status)).inc()
+
+
+def instrument_pool(engine):
+    """Time every checkout from ``engine``'s connection pool, including connecting."""
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            db_pool_checkout_wait.labels().observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
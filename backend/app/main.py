@@ -1,12 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from .core import metrics
 from .core.config import settings
-from .core.database import engine
+from .core.database import add_missing_columns, add_missing_indexes, engine
 from .models.models import Base
-from .api import auth, stocks
+from .api import alerts, auth, screens, stocks
+from .services.screen_expressions import plan_cache
 
-# Create database tables
+# Create database tables, and columns, indexes and constraints added to existing ones
 Base.metadata.create_all(bind=engine)
+add_missing_columns(Base.metadata)
+add_missing_indexes(Base.metadata)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -22,11 +26,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Outermost, so latency covers every other middleware
+if settings.metrics_enabled:
+    app.add_middleware(metrics.RequestMetricsMiddleware, routes=app.routes)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(stocks.router, prefix="/api/v1")
+app.include_router(screens.router, prefix="/api/v1")
+app.include_router(alerts.router, prefix="/api/v1")
+
+
+@app.on_event("startup")
+async def startup():
+    stocks.analysis_jobs.recover()
+    # Before any write, so the first write's crossings are seen
+    alerts.alert_service.load()
+    if settings.refresh_scheduler_enabled:
+        stocks.refresh_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stocks.refresh_scheduler.stop()
+    stocks.analysis_jobs.shutdown()
+    auth.password_hasher.shutdown()
+    await stocks.async_alpha_vantage_service.aclose()
 
 
 @app.get("/")
@@ -36,4 +64,48 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+def _cache_requests():
+    cache = stocks.response_cache
+    if not cache:
+        return {}
+    counts = {(function, 'hit'): count for function, count in list(cache.hits.items())}
+    counts.update({(function, 'miss'): count for function, count in list(cache.misses.items())})
+    return counts
+
+
+def _pool_checked_out():
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+if settings.metrics_enabled:
+    metrics.registry.counter_callback(
+        "alpha_vantage_cache_requests_total", "Alpha Vantage response cache lookups by function and result",
+        _cache_requests, ("function", "result"),
+    )
+    metrics.registry.gauge_callback(
+        "alpha_vantage_cache_hit_ratio", "Share of Alpha Vantage lookups served from the response cache",
+        lambda: stocks.response_cache.stats()["hit_ratio"] if stocks.response_cache else 0.0,
+    )
+    metrics.registry.gauge_callback(
+        "expression_plan_cache_hit_ratio", "Share of screening expressions served from the plan cache",
+        lambda: plan_cache.stats()["hit_ratio"],
+    )
+    metrics.registry.gauge_callback(
+        "analysis_job_queue_depth", "Analysis jobs submitted by this process and not yet finished",
+        lambda: stocks.analysis_jobs.queue_depth,
+    )
+    metrics.registry.gauge_callback(
+        "password_hash_queue_depth", "Password hashing operations waiting for a worker",
+        lambda: auth.password_hasher.stats()["queued"],
+    )
+    metrics.registry.gauge_callback(
+        "db_pool_checked_out", "Database connections currently checked out of the pool", _pool_checked_out,
+    )
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
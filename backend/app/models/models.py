@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Table
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, Table, Index,
+    UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -52,13 +55,44 @@ class Stock(Base):
     ai_analysis = relationship("AIAnalysis", back_populates="stock")
 
 
+# Screening indexes. Sector filters are almost always combined with a market
+# cap bound, so they share a composite index; every other range filter gets a
+# partial index over non-null values, which is all a range predicate can match.
+Index('ix_stocks_sector_market_cap', Stock.sector, Stock.market_cap)
+SCREENING_RANGE_COLUMNS = (
+    Stock.market_cap,
+    Stock.pe_ratio,
+    Stock.pb_ratio,
+    Stock.dividend_yield,
+    Stock.debt_to_equity,
+    Stock.roe,
+)
+for _column in SCREENING_RANGE_COLUMNS:
+    Index(
+        f'ix_stocks_{_column.key}',
+        _column,
+        postgresql_where=_column.isnot(None),
+        sqlite_where=_column.isnot(None),
+    )
+del _column
+
+
 class FinancialData(Base):
     __tablename__ = "financial_data"
+    __table_args__ = (
+        # Annual rows have a NULL quarter, so NULLs must collide too
+        UniqueConstraint(
+            'stock_id', 'fiscal_year', 'fiscal_quarter',
+            name='uq_financial_data_period',
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
     fiscal_year = Column(Integer, nullable=False)
     fiscal_quarter = Column(Integer)  # Null for annual data
+    fiscal_date_ending = Column(Date)
     revenue = Column(Float)
     net_income = Column(Float)
     total_assets = Column(Float)
@@ -83,4 +117,88 @@ class AIAnalysis(Base):
     analysis_date = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
-    stock = relationship("Stock", back_populates="ai_analysis")
\ No newline at end of file
+    stock = relationship("Stock", back_populates="ai_analysis")
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    analysis_id = Column(Integer, ForeignKey("ai_analysis.id"))
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    # Relationships
+    stock = relationship("Stock")
+
+
+# At most one queued or running job per stock, enforced across processes
+ACTIVE_ANALYSIS_JOB_STATUSES = ("queued", "running")
+Index(
+    'uq_analysis_jobs_active_stock',
+    AnalysisJob.stock_id,
+    unique=True,
+    postgresql_where=AnalysisJob.status.in_(ACTIVE_ANALYSIS_JOB_STATUSES),
+    sqlite_where=AnalysisJob.status.in_(ACTIVE_ANALYSIS_JOB_STATUSES),
+)
+
+
+class SavedScreen(Base):
+    __tablename__ = "saved_screens"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'name', name='uq_saved_screens_user_name'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    filters = Column(Text, nullable=False)  # JSON-encoded ScreeningFilters
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    last_viewed_at = Column(DateTime(timezone=True))
+
+    # Relationships
+    user = relationship("User")
+
+
+class SavedScreenMember(Base):
+    """
+    Materialized membership of a saved screen.
+
+    ``active`` is current membership and ``seen`` whether the stock was a
+    member at the owner's last view, so the rows with the two flags
+    differing are the tickers that entered or left since then.
+    """
+    __tablename__ = "saved_screen_members"
+
+    screen_id = Column(Integer, ForeignKey("saved_screens.id", ondelete="CASCADE"), primary_key=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id"), primary_key=True, index=True)
+    active = Column(Boolean, nullable=False, default=True)
+    seen = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Alert(Base):
+    __tablename__ = "alerts"
+    __table_args__ = (
+        Index('ix_alerts_active_stock', 'stock_id', 'active'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
+    metric = Column(String, nullable=False)
+    direction = Column(String, nullable=False)  # above, below
+    threshold = Column(Float, nullable=False)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    triggered_at = Column(DateTime(timezone=True))
+    triggered_value = Column(Float)
+
+    # Relationships
+    stock = relationship("Stock")
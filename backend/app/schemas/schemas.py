@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Annotated, Dict, Optional, List, Literal
+from datetime import date, datetime
 
 
 # User schemas
@@ -72,6 +72,24 @@ class Stock(StockBase):
 
 
 # Screening filters
+SortField = Literal[
+    'id', 'symbol', 'name', 'sector', 'industry', 'market_cap', 'pe_ratio',
+    'pb_ratio', 'dividend_yield', 'debt_to_equity', 'roe', 'current_price'
+]
+StockField = Literal[
+    'id', 'symbol', 'name', 'sector', 'industry', 'market_cap', 'pe_ratio',
+    'pb_ratio', 'dividend_yield', 'debt_to_equity', 'roe', 'current_price',
+    'created_at', 'updated_at'
+]
+
+SmaSignal = Literal['above', 'below', 'crossed_above', 'crossed_below']
+RankMetric = Literal['market_cap', 'pe_ratio', 'pb_ratio', 'dividend_yield', 'debt_to_equity', 'roe']
+Percentile = Annotated[float, Field(ge=0, le=100)]
+Rank = Annotated[int, Field(ge=1)]
+
+MAX_SCREEN_LIMIT = 5000
+
+
 class ScreeningFilters(BaseModel):
     min_market_cap: Optional[float] = None
     max_market_cap: Optional[float] = None
@@ -86,12 +104,140 @@ class ScreeningFilters(BaseModel):
     min_roe: Optional[float] = None
     max_roe: Optional[float] = None
     sectors: Optional[List[str]] = None
+    
+    # Technical filters over stored daily price history; returns and
+    # distances are fractions, volatility is annualized
+    min_rsi: Optional[float] = Field(None, ge=0, le=100)
+    max_rsi: Optional[float] = Field(None, ge=0, le=100)
+    return_days: int = Field(21, ge=1, le=252)
+    min_return: Optional[float] = None
+    max_return: Optional[float] = None
+    min_pct_below_52w_high: Optional[float] = Field(None, ge=0)
+    max_pct_below_52w_high: Optional[float] = Field(None, ge=0)
+    volatility_days: int = Field(20, ge=2, le=252)
+    min_volatility: Optional[float] = None
+    max_volatility: Optional[float] = None
+    sma_fast: int = Field(50, ge=2, le=240)
+    sma_slow: int = Field(200, ge=2, le=240)
+    sma_signal: Optional[SmaSignal] = None
+    cross_within_days: int = Field(5, ge=1, le=20)
+    
+    # Position within the stock's sector per metric: percentiles are
+    # percent ranks (0-100), rank 1 is the sector's largest value
+    min_sector_percentile: Optional[Dict[RankMetric, Percentile]] = None
+    max_sector_percentile: Optional[Dict[RankMetric, Percentile]] = None
+    max_sector_rank: Optional[Dict[RankMetric, Rank]] = None
+    
+    # Free-form condition ANDed with the filters above, e.g.
+    # 'roe > 0.15 and (pe_ratio < 20 or sector in ["Technology"])'
+    expression: Optional[str] = Field(None, max_length=2000)
+    
+    # Sorting, keyset pagination and projection
+    sort_by: SortField = 'id'
+    sort_desc: bool = False
+    limit: Optional[int] = Field(None, ge=1, le=MAX_SCREEN_LIMIT)
+    cursor: Optional[str] = None
+    fields: Optional[List[StockField]] = None
+    
+    @model_validator(mode='after')
+    def check_sma_periods(self) -> 'ScreeningFilters':
+        if self.sma_fast >= self.sma_slow:
+            raise ValueError("sma_fast must be shorter than sma_slow")
+        return self
+
+
+class ScreenedStock(BaseModel):
+    """A screening result row; only the requested fields are present."""
+    id: Optional[int] = None
+    symbol: Optional[str] = None
+    name: Optional[str] = None
+    sector: Optional[str] = None
+    industry: Optional[str] = None
+    market_cap: Optional[float] = None
+    pe_ratio: Optional[float] = None
+    pb_ratio: Optional[float] = None
+    dividend_yield: Optional[float] = None
+    debt_to_equity: Optional[float] = None
+    roe: Optional[float] = None
+    current_price: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Saved screens
+class SavedScreenCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    filters: ScreeningFilters
+
+
+class SavedScreen(BaseModel):
+    id: int
+    name: str
+    filters: ScreeningFilters
+    created_at: datetime
+    last_viewed_at: Optional[datetime] = None
+
+
+class SavedScreenView(BaseModel):
+    screen: SavedScreen
+    stocks: List[Stock]
+    entered: List[str]
+    left: List[str]
+
+
+# Alerts
+AlertMetric = Literal[
+    'current_price', 'market_cap', 'pe_ratio', 'pb_ratio', 'dividend_yield', 'debt_to_equity', 'roe'
+]
+AlertDirection = Literal['above', 'below']
+
+
+class AlertCreate(BaseModel):
+    symbol: str
+    metric: AlertMetric
+    direction: AlertDirection
+    threshold: float
+
+
+class Alert(BaseModel):
+    id: int
+    symbol: str
+    metric: AlertMetric
+    direction: AlertDirection
+    threshold: float
+    active: bool
+    created_at: datetime
+    triggered_at: Optional[datetime] = None
+    triggered_value: Optional[float] = None
+
+
+# Ingestion
+class PopulateRequest(BaseModel):
+    symbols: Optional[List[str]] = None
+    include_statements: bool = False
+
+
+# Price history
+class PriceHistory(BaseModel):
+    symbol: str
+    dates: List[date]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[int]
+    refreshing: bool = False
+
+
+class HistoryRefreshRequest(BaseModel):
+    symbols: Optional[List[str]] = None
 
 
 # Financial Data schemas
 class FinancialDataBase(BaseModel):
     fiscal_year: int
     fiscal_quarter: Optional[int] = None
+    fiscal_date_ending: Optional[date] = None
     revenue: Optional[float] = None
     net_income: Optional[float] = None
     total_assets: Optional[float] = None
@@ -126,6 +272,21 @@ class AIAnalysis(AIAnalysisBase):
         from_attributes = True
 
 
+class AnalysisJob(BaseModel):
+    id: int
+    stock_id: int
+    status: str
+    analysis_id: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Watchlist schemas
 class WatchlistResponse(BaseModel):
     stocks: List[Stock]
\ No newline at end of file
@@ -1,16 +1,27 @@
 import json
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, Optional
 from sqlalchemy.orm import Session
+from ..core.config import settings
 from ..models.models import Stock, AIAnalysis
 from .alpha_vantage import AlphaVantageService
+from .financial_data import FinancialDataService
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class AIAnalysisService:
-    def __init__(self, alpha_vantage_service: AlphaVantageService):
+    def __init__(
+        self,
+        alpha_vantage_service: AlphaVantageService,
+        financial_data_service: Optional[FinancialDataService] = None
+    ):
         self.alpha_vantage = alpha_vantage_service
+        self.financial_data = financial_data_service or FinancialDataService()
+        # One worker per Alpha Vantage call made for an analysis
+        self._fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="av-fetch")
     
     def generate_analysis(self, db: Session, stock: Stock) -> Optional[AIAnalysis]:
         """
@@ -19,7 +30,7 @@ class AIAnalysisService:
         """
         try:
             # Fetch financial data from Alpha Vantage
-            financial_data = self._fetch_financial_data(stock.symbol)
+            financial_data = self._fetch_financial_data(db, stock)
             if not financial_data:
                 logger.error(f"Could not fetch financial data for {stock.symbol}")
                 return None
@@ -47,32 +58,85 @@ class AIAnalysisService:
             logger.error(f"Error generating analysis for {stock.symbol}: {e}")
             return None
     
-    def _fetch_financial_data(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """Fetch comprehensive financial data for analysis."""
+    def _fetch_financial_data(self, db: Session, stock: Stock) -> Optional[Dict[str, Any]]:
+        """
+        Gather financial data for analysis.
+        
+        Statement history is read from the FinancialData table; the three
+        statement endpoints are only called when a newer period than the
+        latest stored one is likely to have been filed.
+        """
         financial_data = {}
         
-        # Get overview
-        overview = self.alpha_vantage.get_company_overview(symbol)
-        if overview:
-            financial_data['overview'] = overview
+        calls: Dict[str, Callable[[str, float], Optional[Dict[str, Any]]]] = {
+            'overview': self.alpha_vantage.get_company_overview,
+        }
+        if self.financial_data.needs_refresh(db, stock.id):
+            calls['income_statement'] = self.alpha_vantage.get_income_statement
+            calls['balance_sheet'] = self.alpha_vantage.get_balance_sheet
+            calls['cash_flow'] = self.alpha_vantage.get_cash_flow
+        responses = self._fetch_concurrently(stock.symbol, calls)
         
-        # Get income statement
-        income_statement = self.alpha_vantage.get_income_statement(symbol)
-        if income_statement:
-            financial_data['income_statement'] = income_statement
+        if responses.get('overview'):
+            financial_data['overview'] = responses['overview']
         
-        # Get balance sheet
-        balance_sheet = self.alpha_vantage.get_balance_sheet(symbol)
-        if balance_sheet:
-            financial_data['balance_sheet'] = balance_sheet
+        statements = [responses.get(name) for name in ('income_statement', 'balance_sheet', 'cash_flow')]
+        # Stored periods are never re-fetched, so only persist complete sets;
+        # a partial fetch falls back to the history already stored.
+        if all(statements):
+            self.financial_data.store_statements(db, stock, *statements)
+        elif any(statements):
+            logger.warning(f"Incomplete statements for {stock.symbol}, keeping stored history")
         
-        # Get cash flow
-        cash_flow = self.alpha_vantage.get_cash_flow(symbol)
-        if cash_flow:
-            financial_data['cash_flow'] = cash_flow
+        history = self.financial_data.get_history(db, stock.id)
+        if history:
+            financial_data['history'] = [
+                {
+                    'fiscal_year': period.fiscal_year,
+                    'fiscal_quarter': period.fiscal_quarter,
+                    'fiscal_date_ending': period.fiscal_date_ending,
+                    'revenue': period.revenue,
+                    'net_income': period.net_income,
+                    'total_assets': period.total_assets,
+                    'total_debt': period.total_debt,
+                    'cash_flow_from_operations': period.cash_flow_from_operations,
+                }
+                for period in history
+            ]
         
         return financial_data if financial_data else None
     
+    def _fetch_concurrently(
+        self, symbol: str, calls: Dict[str, Callable[[str, float], Optional[Dict[str, Any]]]]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Run the Alpha Vantage calls in parallel under a shared deadline.
+        
+        Calls still pass through the service's rate limiter, and one that
+        cannot get a rate slot before the deadline gives up without spending
+        it. A call that fails or misses the deadline yields None, and is
+        cancelled if it has not started; the rest are kept.
+        """
+        deadline = time.monotonic() + settings.analysis_fetch_timeout_seconds
+        futures = {
+            name: self._fetch_executor.submit(fetch, symbol, deadline)
+            for name, fetch in calls.items()
+        }
+        
+        responses = {}
+        for name, future in futures.items():
+            try:
+                responses[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                # A call still queued behind other analyses never starts
+                future.cancel()
+                logger.warning(f"Timed out fetching {name} for {symbol}")
+                responses[name] = None
+            except Exception as e:
+                logger.error(f"Error fetching {name} for {symbol}: {e}")
+                responses[name] = None
+        return responses
+    
     def _analyze_with_gemini(self, stock: Stock, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         PLACEHOLDER: This is where Gemini 2.5 Pro would be integrated.
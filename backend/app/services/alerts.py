@@ -0,0 +1,252 @@
+import bisect
+import json
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.models import Alert, Stock, User
+import logging
+
+logger = logging.getLogger(__name__)
+
+ALERT_METRICS = (
+    'current_price', 'market_cap', 'pe_ratio', 'pb_ratio', 'dividend_yield', 'debt_to_equity', 'roe',
+)
+
+
+class AlertNotifier(ABC):
+    """Interface for delivering triggered alerts."""
+
+    @abstractmethod
+    def notify(self, events: List[Dict[str, Any]]):
+        ...
+
+
+class LogFileNotifier(AlertNotifier):
+    """Appends each triggered alert to a local file as one JSON line."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.alert_log_path
+        self._lock = threading.Lock()
+
+    def notify(self, events: List[Dict[str, Any]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, 'a') as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + '\n')
+
+
+def create_alert_notifier() -> Optional[AlertNotifier]:
+    """Build the notifier selected by ``settings.alert_notifier``."""
+    name = settings.alert_notifier.lower()
+    if name == 'log':
+        return LogFileNotifier(settings.alert_log_path)
+    if name == 'none':
+        return None
+    raise ValueError(f"Unknown alert notifier: {settings.alert_notifier}")
+
+
+class _Armed(NamedTuple):
+    user_id: int
+    symbol: str
+    metric: str
+    direction: str
+    threshold: float
+
+
+class AlertService:
+    """
+    Threshold alerts on stock metrics, evaluated in batches as stocks change.
+
+    Active alerts are indexed per (symbol, metric) in two lists of
+    ``(threshold, alert id)`` sorted by threshold, one per direction. When
+    ``on_stocks_changed`` (a StockService listener) sees a metric move from
+    ``old`` to ``new``, the alerts it crossed form one contiguous slice of
+    the list, found by bisection and removed in one step; no other alert or
+    user is looked at.
+
+    Alerts fire on the crossing, once: ``above`` when the value moves from
+    at or below the threshold to above it, ``below`` the reverse. A value
+    that is already past the threshold when the alert is created must come
+    back across it first.
+
+    ``load()`` must run at startup, before any stock write: the index keeps
+    each symbol's last seen values, and building it from rows a write has
+    already changed would miss that write's crossings. Writes seen before
+    the index is loaded are ignored.
+    """
+
+    def __init__(
+        self,
+        notifier: Optional[AlertNotifier] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.notifier = notifier
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        # (symbol, metric) -> direction -> sorted [(threshold, alert id)]
+        self._index: Dict[Tuple[str, str], Dict[str, List[Tuple[float, int]]]] = {}
+        self._alerts: Dict[int, _Armed] = {}
+        # symbol -> last seen value of each metric, for symbols with alerts
+        self._values: Dict[str, Dict[str, Optional[float]]] = {}
+
+    def _load(self):
+        db = self.session_factory()
+        try:
+            columns = [Alert.id, Alert.user_id, Stock.symbol, Alert.metric, Alert.direction, Alert.threshold]
+            columns += [getattr(Stock, metric) for metric in ALERT_METRICS]
+            rows = db.query(*columns).join(Stock, Stock.id == Alert.stock_id).filter(Alert.active.is_(True)).all()
+        finally:
+            db.close()
+
+        self._index, self._alerts, self._values = {}, {}, {}
+        for row in rows:
+            self._values[row.symbol] = {metric: getattr(row, metric) for metric in ALERT_METRICS}
+            self._arm(row.id, _Armed(row.user_id, row.symbol, row.metric, row.direction, row.threshold))
+        self._loaded = True
+        logger.info(f"Alert index loaded {len(rows)} active alerts")
+
+    def load(self):
+        """Build the index from the active alerts and current stock values."""
+        with self._lock:
+            self._load()
+
+    def _arm(self, alert_id: int, alert: _Armed):
+        lists = self._index.setdefault((alert.symbol, alert.metric), {'above': [], 'below': []})
+        bisect.insort(lists[alert.direction], (alert.threshold, alert_id))
+        self._alerts[alert_id] = alert
+
+    def _disarm(self, alert_id: int):
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return
+        entries = self._index[(alert.symbol, alert.metric)][alert.direction]
+        i = bisect.bisect_left(entries, (alert.threshold, alert_id))
+        if i < len(entries) and entries[i] == (alert.threshold, alert_id):
+            entries.pop(i)
+
+    def create_alert(
+        self, db: Session, user: User, stock: Stock, metric: str, direction: str, threshold: float
+    ) -> Alert:
+        alert = Alert(user_id=user.id, stock_id=stock.id, metric=metric, direction=direction, threshold=threshold)
+        db.add(alert)
+        db.commit()
+        db.refresh(alert)
+
+        with self._lock:
+            if not self._loaded:
+                # Loading picks up the alert just committed
+                self._load()
+            else:
+                self._values.setdefault(
+                    stock.symbol, {name: getattr(stock, name) for name in ALERT_METRICS}
+                )
+                self._arm(alert.id, _Armed(user.id, stock.symbol, metric, direction, threshold))
+        return alert
+
+    def list_alerts(self, db: Session, user: User) -> List[Tuple[Alert, str]]:
+        return (
+            db.query(Alert, Stock.symbol)
+            .join(Stock, Stock.id == Alert.stock_id)
+            .filter(Alert.user_id == user.id)
+            .order_by(Alert.created_at.desc(), Alert.id.desc())
+            .all()
+        )
+
+    def get_alert(self, db: Session, user: User, alert_id: int) -> Optional[Alert]:
+        return db.query(Alert).filter(Alert.id == alert_id, Alert.user_id == user.id).first()
+
+    def delete_alert(self, db: Session, alert: Alert):
+        with self._lock:
+            self._disarm(alert.id)
+        db.delete(alert)
+        db.commit()
+
+    @staticmethod
+    def _crossed(entries: List[Tuple[float, int]], direction: str, old: float, new: float) -> slice:
+        """The slice of ``entries`` whose threshold the move from old to new crossed."""
+        if direction == 'above' and new > old:
+            # old <= threshold < new
+            return slice(bisect.bisect_left(entries, (old, -math.inf)), bisect.bisect_left(entries, (new, -math.inf)))
+        if direction == 'below' and new < old:
+            # new < threshold <= old
+            return slice(bisect.bisect_right(entries, (new, math.inf)), bisect.bisect_right(entries, (old, math.inf)))
+        return slice(0, 0)
+
+    def on_stocks_changed(self, rows: List[Dict[str, Any]]):
+        """Find and deliver the alerts crossed by the written rows."""
+        triggered: List[Tuple[int, _Armed, float]] = []
+        with self._lock:
+            if not self._loaded:
+                return
+            for row in rows:
+                values = self._values.get(row['symbol'])
+                if values is None:
+                    continue
+                for metric in ALERT_METRICS:
+                    if metric not in row:
+                        continue
+                    old, new = values[metric], row[metric]
+                    values[metric] = new
+                    lists = self._index.get((row['symbol'], metric))
+                    if not lists or old is None or new is None:
+                        continue
+                    for direction, entries in lists.items():
+                        crossed = self._crossed(entries, direction, old, new)
+                        for _, alert_id in entries[crossed]:
+                            triggered.append((alert_id, self._alerts.pop(alert_id), new))
+                        del entries[crossed]
+
+        if triggered:
+            self._deliver(triggered)
+
+    def _deliver(self, triggered: List[Tuple[int, _Armed, float]]):
+        """
+        Record triggered alerts in one UPDATE, then notify those it changed.
+
+        Only alerts still active are updated, and RETURNING tells which, so
+        an alert deleted or fired elsewhere in the meantime is not notified.
+        If the write fails the alerts are re-armed and fire on their next
+        crossing.
+        """
+        now = datetime.now(timezone.utc)
+        values = {alert_id: value for alert_id, _, value in triggered}
+        table = Alert.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id.in_(list(values)), table.c.active.is_(True))
+            .values(active=False, triggered_at=now, triggered_value=case(values, value=table.c.id))
+            .returning(table.c.id)
+        )
+        db = self.session_factory()
+        try:
+            updated = {alert_id for (alert_id,) in db.execute(stmt)}
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for alert_id, alert, _ in triggered:
+                    self._arm(alert_id, alert)
+            raise
+        finally:
+            db.close()
+
+        events = [
+            dict(alert._asdict(), alert_id=alert_id, value=value, triggered_at=now.isoformat())
+            for alert_id, alert, value in triggered
+            if alert_id in updated
+        ]
+        if not events:
+            return
+        logger.info(f"Triggered {len(events)} alerts")
+        if self.notifier:
+            self.notifier.notify(events)
@@ -1,98 +1,224 @@
+import asyncio
 import requests
+import threading
 import time
 from typing import Dict, Any, Optional, List
+from ..core import metrics
 from ..core.config import settings
+from .cache import FUNCTION_TTLS, ResponseCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Calls that reached the API, so cache hits are not counted here
+CALL_OUTCOMES = ('ok', 'error', 'note', 'failed')
+api_calls = metrics.registry.counter(
+    'alpha_vantage_calls_total', 'Alpha Vantage API calls by function and outcome', ('function', 'outcome')
+)
+api_latency = metrics.registry.histogram(
+    'alpha_vantage_request_duration_seconds', 'Alpha Vantage round trip by function', ('function',)
+)
+rate_limit_sleep = metrics.registry.counter(
+    'alpha_vantage_rate_limit_sleep_seconds_total', 'Time spent sleeping in Alpha Vantage rate limiters',
+    ('limiter',),
+)
+for function in FUNCTION_TTLS:
+    api_latency.labels(function)
+    for outcome in CALL_OUTCOMES:
+        api_calls.labels(function, outcome)
+
+# This is a small subset for demonstration
+# In production, you'd fetch this from a reliable source
+SP500_SYMBOLS = [
+    'AAPL', 'MSFT', 'AMZN', 'GOOGL', 'TSLA', 'META', 'NVDA', 'JPM',
+    'JNJ', 'V', 'PG', 'UNH', 'HD', 'MA', 'DIS', 'PYPL', 'BAC', 'NFLX',
+    'ADBE', 'CRM', 'CMCSA', 'XOM', 'VZ', 'KO', 'ABT', 'ORCL', 'PFE',
+    'WMT', 'CVX', 'CSCO', 'PEP', 'TMO', 'ACN', 'ABBV', 'COST', 'AVGO',
+    'DHR', 'LLY', 'NEE', 'TXN', 'MDT', 'UNP', 'PM', 'HON', 'LOW',
+    'QCOM', 'IBM', 'CHTR', 'LIN', 'UPS', 'RTX', 'BMY', 'AMGN'
+]
+
+
+class RateLimiter:
+    """
+    Token bucket for the one Alpha Vantage key, shared by every client in
+    the process.
+
+    Holds up to ``capacity`` tokens refilled at ``capacity`` per ``period``
+    seconds. A token is taken in a short critical section under a thread
+    lock and never slept on while held, so threads block in ``acquire`` and
+    coroutines wait in ``acquire_async`` on the same budget. ``reserve``
+    leaves that many tokens in the bucket, so background callers only spend
+    headroom interactive calls are not using.
+    """
+
+    def __init__(self, capacity: int, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, reserve: int) -> float:
+        """Take a token and return 0, or return the seconds until one can be taken."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            needed = 1 + min(reserve, self.capacity - 1)
+            if self.tokens >= needed:
+                self.tokens -= 1
+                return 0.0
+            return (needed - self.tokens) / self.rate
+
+    def acquire(self, reserve: int = 0, deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Block until a token is taken; returns the seconds slept.
+
+        With a ``time.monotonic()`` ``deadline``, returns None without
+        sleeping or taking a token once the deadline has passed or the next
+        token would come too late.
+        """
+        slept = 0.0
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            wait = self._take(reserve)
+            if not wait:
+                return slept
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return None
+            logger.info(f"Rate limit reached, sleeping for {wait:.2f} seconds")
+            time.sleep(wait)
+            slept += wait
+
+    async def acquire_async(self, reserve: int = 0) -> float:
+        """Wait on the event loop until a token is taken; returns the seconds slept."""
+        slept = 0.0
+        while True:
+            wait = self._take(reserve)
+            if not wait:
+                return slept
+            logger.info(f"Rate limit reached, waiting {wait:.2f} seconds")
+            await asyncio.sleep(wait)
+            slept += wait
+
 
 class AlphaVantageService:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None, rate_limiter: Optional[RateLimiter] = None):
         self.api_key = settings.alpha_vantage_api_key
         self.base_url = settings.alpha_vantage_base_url
-        self.rate_limit_calls = 0
-        self.rate_limit_reset_time = time.time()
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter(settings.alpha_vantage_calls_per_minute)
+        self._slept = rate_limit_sleep.labels('sync')
+    
+    def _acquire_rate_slot(self, deadline: Optional[float] = None) -> bool:
+        """Block until the shared rate limiter grants a call; False if not before ``deadline``."""
+        slept = self.rate_limiter.acquire(deadline=deadline)
+        if slept:
+            self._slept.inc(slept)
+        return slept is not None
         
-    def _make_request(self, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
-        """Make API request with rate limiting."""
-        current_time = time.time()
+    def _make_request(self, params: Dict[str, str], deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Make API request with caching and rate limiting.
         
-        # Reset rate limit counter every minute
-        if current_time - self.rate_limit_reset_time > 60:
-            self.rate_limit_calls = 0
-            self.rate_limit_reset_time = current_time
-            
-        # Alpha Vantage free tier: 5 calls per minute
-        if self.rate_limit_calls >= 5:
-            sleep_time = 60 - (current_time - self.rate_limit_reset_time)
-            if sleep_time > 0:
-                logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-                self.rate_limit_calls = 0
-                self.rate_limit_reset_time = time.time()
+        A caller with a ``time.monotonic()`` ``deadline`` gets None instead
+        of waiting past it for a rate slot, so no budget is spent on a call
+        whose result would arrive too late.
+        """
+        if self.cache:
+            cached = self.cache.get(params)
+            if cached is not None:
+                return cached
+        
+        if not self._acquire_rate_slot(deadline):
+            logger.warning(f"No rate slot for {params.get('function')} {params.get('symbol')} before the deadline")
+            return None
         
         params['apikey'] = self.api_key
+        function = params.get('function', '')
+        outcome = 'failed'
+        start = time.perf_counter()
         
         try:
             response = requests.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
-            self.rate_limit_calls += 1
             
             data = response.json()
             
             # Check for API errors
             if "Error Message" in data:
                 logger.error(f"API Error: {data['Error Message']}")
+                outcome = 'error'
                 return None
             if "Note" in data:
                 logger.warning(f"API Note: {data['Note']}")
+                outcome = 'note'
                 return None
-                
+            
+            # Empty payloads mean an unknown symbol; SymbolLookup caches those briefly
+            if self.cache and data:
+                self.cache.set(params, data)
+            
+            outcome = 'ok'
             return data
             
         except requests.RequestException as e:
             logger.error(f"Request failed: {e}")
             return None
+        finally:
+            api_latency.labels(function).observe(time.perf_counter() - start)
+            api_calls.labels(function, outcome).inc()
     
-    def get_company_overview(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def get_company_overview(self, symbol: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Get company overview data."""
         params = {
             'function': 'OVERVIEW',
             'symbol': symbol
         }
-        return self._make_request(params)
+        return self._make_request(params, deadline)
     
-    def get_income_statement(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def get_income_statement(self, symbol: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Get income statement data."""
         params = {
             'function': 'INCOME_STATEMENT',
             'symbol': symbol
         }
-        return self._make_request(params)
+        return self._make_request(params, deadline)
     
-    def get_balance_sheet(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def get_balance_sheet(self, symbol: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Get balance sheet data."""
         params = {
             'function': 'BALANCE_SHEET',
             'symbol': symbol
         }
-        return self._make_request(params)
+        return self._make_request(params, deadline)
     
-    def get_cash_flow(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def get_cash_flow(self, symbol: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Get cash flow data."""
         params = {
             'function': 'CASH_FLOW',
             'symbol': symbol
         }
-        return self._make_request(params)
+        return self._make_request(params, deadline)
     
-    def get_time_series_daily(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """Get daily time series data."""
+    def get_time_series_daily(
+        self, symbol: str, outputsize: str = 'compact'
+    ) -> Optional[Dict[str, Any]]:
+        """Get daily time series data: the last 100 days, or 20+ years with ``full``."""
         params = {
             'function': 'TIME_SERIES_DAILY',
             'symbol': symbol,
-            'outputsize': 'compact'  # Last 100 data points
+            'outputsize': outputsize
+        }
+        return self._make_request(params)
+    
+    def get_global_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get the latest price and volume for a symbol."""
+        params = {
+            'function': 'GLOBAL_QUOTE',
+            'symbol': symbol
         }
         return self._make_request(params)
     
@@ -101,13 +227,4 @@ class AlphaVantageService:
         Get S&P 500 symbols. In a real implementation, this would
         fetch from a reliable source. For now, returning a subset.
         """
-        # This is a small subset for demonstration
-        # In production, you'd fetch this from a reliable source
-        return [
-            'AAPL', 'MSFT', 'AMZN', 'GOOGL', 'TSLA', 'META', 'NVDA', 'JPM',
-            'JNJ', 'V', 'PG', 'UNH', 'HD', 'MA', 'DIS', 'PYPL', 'BAC', 'NFLX',
-            'ADBE', 'CRM', 'CMCSA', 'XOM', 'VZ', 'KO', 'ABT', 'ORCL', 'PFE',
-            'WMT', 'CVX', 'CSCO', 'PEP', 'TMO', 'ACN', 'ABBV', 'COST', 'AVGO',
-            'DHR', 'LLY', 'NEE', 'TXN', 'MDT', 'UNP', 'PM', 'HON', 'LOW',
-            'QCOM', 'IBM', 'CHTR', 'LIN', 'UPS', 'RTX', 'BMY', 'AMGN'
-        ]
\ No newline at end of file
+        return list(SP500_SYMBOLS)
\ No newline at end of file
@@ -0,0 +1,216 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.models import ACTIVE_ANALYSIS_JOB_STATUSES, AnalysisJob, Stock
+from .ai_analysis import AIAnalysisService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class AnalysisJobQueue:
+    """
+    Durable, deduplicated analysis jobs run on a bounded worker pool.
+
+    Jobs are rows in ``analysis_jobs``; a partial unique index allows only
+    one queued or running job per stock, so concurrent requests for the same
+    ticker share a single job even across processes. Workers claim a job
+    with a conditional UPDATE and use their own sessions. Jobs left queued,
+    or running past ``analysis_job_stale_seconds``, by a dead process are
+    picked up again by ``recover()`` at startup.
+    """
+
+    def __init__(
+        self,
+        ai_service: AIAnalysisService,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_workers: Optional[int] = None,
+    ):
+        self.ai_service = ai_service
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.analysis_workers,
+            thread_name_prefix="analysis",
+        )
+        # stock_id -> job_id for jobs submitted by this process
+        self._inflight: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._inflight)
+
+    def _active_job(self, db: Session, stock_id: int) -> Optional[AnalysisJob]:
+        return (
+            db.query(AnalysisJob)
+            .filter(
+                AnalysisJob.stock_id == stock_id,
+                AnalysisJob.status.in_(ACTIVE_ANALYSIS_JOB_STATUSES),
+            )
+            .first()
+        )
+
+    def _latest_job(self, db: Session, stock_id: int) -> Optional[AnalysisJob]:
+        return (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.stock_id == stock_id)
+            .order_by(AnalysisJob.id.desc())
+            .first()
+        )
+
+    def _recent_failure(self, db: Session, stock_id: int) -> Optional[AnalysisJob]:
+        job = self._latest_job(db, stock_id)
+        retry_after = timedelta(seconds=settings.analysis_retry_after_seconds)
+        if job and job.status == "failed" and _as_utc(job.finished_at) > _utcnow() - retry_after:
+            return job
+        return None
+
+    def enqueue(self, db: Session, stock: Stock) -> AnalysisJob:
+        """Return the stock's active job, creating and submitting one if needed."""
+        job = self._active_job(db, stock.id)
+        if job:
+            self._reclaim_if_stale(db, job)
+            return job
+        job = self._recent_failure(db, stock.id)
+        if job:
+            return job
+
+        job = AnalysisJob(stock_id=stock.id, status="queued")
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request created the job between our check and insert;
+            # it may already have finished
+            db.rollback()
+            return self._active_job(db, stock.id) or self._latest_job(db, stock.id)
+
+        db.refresh(job)
+        self._submit(job.id, stock.id)
+        return job
+
+    def _reclaim_if_stale(self, db: Session, job: AnalysisJob):
+        """
+        Resubmit an active job whose worker is presumed dead.
+
+        A job running past ``analysis_job_stale_seconds``, or queued that
+        long without a worker in this process, would otherwise block new
+        jobs for the stock until some process restarts and runs ``recover()``.
+        """
+        if job.stock_id in self._inflight:
+            return
+        stale_before = _utcnow() - timedelta(seconds=settings.analysis_job_stale_seconds)
+        if job.status == "running":
+            if job.started_at is not None and _as_utc(job.started_at) >= stale_before:
+                return
+            reset = (
+                db.query(AnalysisJob)
+                .filter(AnalysisJob.id == job.id, AnalysisJob.status == "running")
+                .update({AnalysisJob.status: "queued"}, synchronize_session=False)
+            )
+            db.commit()
+            db.refresh(job)
+            if not reset:
+                return
+        elif job.created_at is not None and _as_utc(job.created_at) >= stale_before:
+            return
+        logger.warning(f"Reclaiming stale analysis job {job.id} for stock {job.stock_id}")
+        # Claiming is conditional, so a live worker elsewhere still runs it at most once
+        self._submit(job.id, job.stock_id)
+
+    def _submit(self, job_id: int, stock_id: int):
+        with self._lock:
+            if stock_id in self._inflight:
+                return
+            self._inflight[stock_id] = job_id
+        self._executor.submit(self._run, job_id, stock_id)
+
+    def _claim(self, db: Session, job_id: int) -> bool:
+        """Atomically move a job from queued to running."""
+        claimed = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+            .update(
+                {
+                    AnalysisJob.status: "running",
+                    AnalysisJob.started_at: _utcnow(),
+                    AnalysisJob.attempts: AnalysisJob.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return claimed == 1
+
+    def _run(self, job_id: int, stock_id: int):
+        db = self.session_factory()
+        try:
+            if not self._claim(db, job_id):
+                return
+            job = db.get(AnalysisJob, job_id)
+            stock = db.get(Stock, stock_id)
+            analysis = self.ai_service.generate_analysis(db, stock) if stock else None
+            job.status = "succeeded" if analysis else "failed"
+            job.analysis_id = analysis.id if analysis else None
+            job.error = None if analysis else "Analysis could not be generated"
+            job.finished_at = _utcnow()
+            db.commit()
+        except Exception as e:
+            logger.error(f"Analysis job {job_id} failed: {e}")
+            db.rollback()
+            db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(
+                {
+                    AnalysisJob.status: "failed",
+                    AnalysisJob.error: str(e),
+                    AnalysisJob.finished_at: _utcnow(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            with self._lock:
+                self._inflight.pop(stock_id, None)
+            db.close()
+
+    def recover(self):
+        """Resubmit queued jobs and reset running jobs abandoned by a dead process."""
+        db = self.session_factory()
+        try:
+            stale_before = _utcnow() - timedelta(seconds=settings.analysis_job_stale_seconds)
+            db.query(AnalysisJob).filter(
+                AnalysisJob.status == "running",
+                AnalysisJob.started_at < stale_before,
+            ).update({AnalysisJob.status: "queued"}, synchronize_session=False)
+            db.commit()
+
+            queued = db.query(AnalysisJob.id, AnalysisJob.stock_id).filter(
+                AnalysisJob.status == "queued"
+            ).all()
+            for job_id, stock_id in queued:
+                self._submit(job_id, stock_id)
+            if queued:
+                logger.info(f"Recovered {len(queued)} analysis jobs")
+        finally:
+            db.close()
+
+    def get_job(self, db: Session, job_id: int) -> Optional[AnalysisJob]:
+        return db.get(AnalysisJob, job_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from typing import Dict, Any, Optional, List
+import httpx
+from ..core.config import settings
+from .alpha_vantage import SP500_SYMBOLS, RateLimiter, api_calls, api_latency, rate_limit_sleep
+from .cache import ResponseCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAlphaVantageService:
+    """
+    Asynchronous counterpart of ``AlphaVantageService``.
+
+    All requests share one pooled ``httpx.AsyncClient`` so connections are
+    kept alive between calls. The client is created on first use and must be
+    released with ``aclose()`` on shutdown. Pass the sync client's
+    ``RateLimiter`` so both spend the same per-key budget.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, rate_limiter: Optional[RateLimiter] = None):
+        self.api_key = settings.alpha_vantage_api_key
+        self.base_url = settings.alpha_vantage_base_url
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter(settings.alpha_vantage_calls_per_minute)
+        self._slept = rate_limit_sleep.labels('async')
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(
+                    max_connections=settings.alpha_vantage_max_connections,
+                    max_keepalive_connections=settings.alpha_vantage_max_connections,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _make_request(self, params: Dict[str, str], reserve: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Make API request with caching and rate limiting.
+
+        ``reserve`` is passed to the rate limiter, for background callers
+        that should leave part of the budget to interactive ones.
+        """
+        if self.cache:
+            cached = self.cache.get(params)
+            if cached is not None:
+                return cached
+
+        slept = await self.rate_limiter.acquire_async(reserve)
+        if slept:
+            self._slept.inc(slept)
+
+        request_params = dict(params, apikey=self.api_key)
+        function = params.get('function', '')
+        outcome = 'failed'
+        start = time.perf_counter()
+
+        try:
+            response = await self.client.get(self.base_url, params=request_params)
+            response.raise_for_status()
+
+            data = response.json()
+
+            # Check for API errors
+            if "Error Message" in data:
+                logger.error(f"API Error: {data['Error Message']}")
+                outcome = 'error'
+                return None
+            if "Note" in data:
+                logger.warning(f"API Note: {data['Note']}")
+                outcome = 'note'
+                return None
+
+            # Empty payloads mean an unknown symbol; SymbolLookup caches those briefly
+            if self.cache and data:
+                self.cache.set(params, data)
+
+            outcome = 'ok'
+            return data
+
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Request failed: {e}")
+            return None
+        finally:
+            api_latency.labels(function).observe(time.perf_counter() - start)
+            api_calls.labels(function, outcome).inc()
+
+    async def get_company_overview(self, symbol: str, reserve: int = 0) -> Optional[Dict[str, Any]]:
+        """Get company overview data."""
+        params = {
+            'function': 'OVERVIEW',
+            'symbol': symbol
+        }
+        return await self._make_request(params, reserve)
+
+    async def get_income_statement(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get income statement data."""
+        params = {
+            'function': 'INCOME_STATEMENT',
+            'symbol': symbol
+        }
+        return await self._make_request(params)
+
+    async def get_balance_sheet(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get balance sheet data."""
+        params = {
+            'function': 'BALANCE_SHEET',
+            'symbol': symbol
+        }
+        return await self._make_request(params)
+
+    async def get_cash_flow(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get cash flow data."""
+        params = {
+            'function': 'CASH_FLOW',
+            'symbol': symbol
+        }
+        return await self._make_request(params)
+
+    async def get_time_series_daily(
+        self, symbol: str, outputsize: str = 'compact'
+    ) -> Optional[Dict[str, Any]]:
+        """Get daily time series data: the last 100 days, or 20+ years with ``full``."""
+        params = {
+            'function': 'TIME_SERIES_DAILY',
+            'symbol': symbol,
+            'outputsize': outputsize
+        }
+        return await self._make_request(params)
+
+    async def get_global_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get the latest price and volume for a symbol."""
+        params = {
+            'function': 'GLOBAL_QUOTE',
+            'symbol': symbol
+        }
+        return await self._make_request(params)
+
+    async def get_global_quotes(self, symbols: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch quotes for many symbols concurrently.
+
+        Alpha Vantage has no multi-symbol quote endpoint, so the calls run
+        side by side on the pooled client, paced by the shared rate limiter.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        quotes = await asyncio.gather(*(self.get_global_quote(symbol) for symbol in symbols))
+        return dict(zip(symbols, quotes))
+
+    def get_sp500_symbols(self) -> List[str]:
+        """Get S&P 500 symbols."""
+        return list(SP500_SYMBOLS)
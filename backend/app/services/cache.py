@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# How long each Alpha Vantage function's payload stays fresh. Statements only
+# change when a company reports, daily prices once per trading day; quotes
+# are kept just long enough to absorb repeated watchlist refreshes.
+FUNCTION_TTLS = {
+    'OVERVIEW': DAY,
+    'INCOME_STATEMENT': 7 * DAY,
+    'BALANCE_SHEET': 7 * DAY,
+    'CASH_FLOW': 7 * DAY,
+    'TIME_SERIES_DAILY': 12 * HOUR,
+    'GLOBAL_QUOTE': 5 * 60,
+}
+DEFAULT_TTL = HOUR
+
+
+class CacheBackend(ABC):
+    """Interface for response cache storage."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+
+class LRUCacheBackend(CacheBackend):
+    """In-process cache bounded by entry count, evicting least recently used."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis-backed cache shared between workers and restarts."""
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self._client.get(key)
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        try:
+            self._client.setex(key, ttl, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+
+    def delete(self, key: str):
+        try:
+            self._client.delete(key)
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+
+
+class ResponseCache:
+    """
+    TTL cache for Alpha Vantage responses keyed on (function, symbol, params).
+
+    Hits and misses are counted per function so the API budget saved by the
+    cache can be measured.
+    """
+
+    def __init__(self, backend: CacheBackend, ttls: Optional[Dict[str, int]] = None):
+        self.backend = backend
+        self.ttls = ttls if ttls is not None else FUNCTION_TTLS
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(params: Dict[str, str]) -> str:
+        extra = sorted(
+            (name, value) for name, value in params.items()
+            if name not in ('function', 'symbol', 'apikey')
+        )
+        parts = [params.get('function', ''), params.get('symbol', '').upper()]
+        parts.extend(f"{name}={value}" for name, value in extra)
+        return "av:" + ":".join(parts)
+
+    def get(self, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        function = params.get('function', '')
+        value = self.backend.get(self.make_key(params))
+        if value is None:
+            self.misses[function] = self.misses.get(function, 0) + 1
+        else:
+            self.hits[function] = self.hits.get(function, 0) + 1
+        return value
+
+    def set(self, params: Dict[str, str], value: Dict[str, Any]):
+        ttl = self.ttls.get(params.get('function', ''), DEFAULT_TTL)
+        self.backend.set(self.make_key(params), value, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts per function and overall hit ratio."""
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        total = hits + misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+            'by_function': {
+                function: {
+                    'hits': self.hits.get(function, 0),
+                    'misses': self.misses.get(function, 0),
+                }
+                for function in sorted(set(self.hits) | set(self.misses))
+            },
+        }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the response cache selected by ``settings.alpha_vantage_cache_backend``."""
+    backend_name = settings.alpha_vantage_cache_backend.lower()
+    if backend_name == 'memory':
+        backend = LRUCacheBackend(settings.alpha_vantage_cache_max_entries)
+    elif backend_name == 'redis':
+        backend = RedisCacheBackend(settings.redis_url)
+    elif backend_name == 'none':
+        return None
+    else:
+        raise ValueError(f"Unknown cache backend: {settings.alpha_vantage_cache_backend}")
+    return ResponseCache(backend)
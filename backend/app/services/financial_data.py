@@ -0,0 +1,179 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from ..models.models import FinancialData, Stock
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A company files its next quarter roughly 45 days after a ~91 day quarter
+# ends, so statements are re-fetched once the newest stored period is older.
+NEW_PERIOD_AFTER = timedelta(days=136)
+
+# FinancialData column -> candidate Alpha Vantage report keys, first non-null wins
+STATEMENT_FIELDS = {
+    'revenue': ('totalRevenue',),
+    'net_income': ('netIncome',),
+    'total_assets': ('totalAssets',),
+    'total_debt': ('shortLongTermDebtTotal', 'longTermDebt'),
+    'cash_flow_from_operations': ('operatingCashflow',),
+}
+
+
+class FinancialDataService:
+    """Persists parsed financial statements so analysis reads local history."""
+
+    @staticmethod
+    def _safe_float(value) -> Optional[float]:
+        """Safely convert string to float."""
+        if value is None or value == 'None' or value == '':
+            return None
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def _parse_date(value) -> Optional[date]:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _fiscal_period(period_end: date, fiscal_year_end_month: int) -> Tuple[int, int]:
+        """
+        Map a quarter's end date to (fiscal_year, fiscal_quarter).
+
+        Rounds to the nearest quarter so 52/53-week calendars whose quarters
+        end a few days into the next month still line up.
+        """
+        months_after = (period_end.month - fiscal_year_end_month) % 12
+        quarter = round(months_after / 3) % 4 or 4
+        months_to_year_end = period_end.month + (4 - quarter) * 3
+        return period_end.year + (months_to_year_end - 1) // 12, quarter
+
+    @staticmethod
+    def parse_statements(
+        income_statement: Optional[Dict[str, Any]],
+        balance_sheet: Optional[Dict[str, Any]],
+        cash_flow: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Merge the three statements' annual and quarterly reports into FinancialData rows."""
+        statements = [s for s in (income_statement, balance_sheet, cash_flow) if s]
+        periods: Dict[Tuple[str, date], Dict[str, Any]] = {}
+
+        for kind in ('annualReports', 'quarterlyReports'):
+            for statement in statements:
+                for report in statement.get(kind, []):
+                    period_end = FinancialDataService._parse_date(report.get('fiscalDateEnding'))
+                    if period_end is None:
+                        continue
+                    row = periods.setdefault((kind, period_end), {})
+                    for column, keys in STATEMENT_FIELDS.items():
+                        if row.get(column) is not None:
+                            continue
+                        for key in keys:
+                            value = FinancialDataService._safe_float(report.get(key))
+                            if value is not None:
+                                row[column] = value
+                                break
+
+        annual_ends = sorted(end for kind, end in periods if kind == 'annualReports')
+        fiscal_year_end_month = annual_ends[-1].month if annual_ends else 12
+
+        rows = []
+        for (kind, period_end), values in periods.items():
+            if kind == 'annualReports':
+                fiscal_year, fiscal_quarter = period_end.year, None
+            else:
+                fiscal_year, fiscal_quarter = FinancialDataService._fiscal_period(
+                    period_end, fiscal_year_end_month
+                )
+            row = {column: values.get(column) for column in STATEMENT_FIELDS}
+            row.update(
+                fiscal_year=fiscal_year,
+                fiscal_quarter=fiscal_quarter,
+                fiscal_date_ending=period_end,
+            )
+            rows.append(row)
+        return rows
+
+    def store_statement_batch(self, db: Session, rows_by_symbol: Dict[str, List[Dict[str, Any]]]) -> int:
+        """
+        Insert the periods not yet stored for each symbol.
+
+        Stock ids and existing periods are each read with one query, and all
+        new rows go out in one executemany INSERT.
+        """
+        if not rows_by_symbol:
+            return 0
+
+        stock_ids = dict(
+            db.query(Stock.symbol, Stock.id).filter(Stock.symbol.in_(list(rows_by_symbol)))
+        )
+        existing: Set[Tuple[int, int, Optional[int]]] = set(
+            db.query(FinancialData.stock_id, FinancialData.fiscal_year, FinancialData.fiscal_quarter)
+            .filter(FinancialData.stock_id.in_(list(stock_ids.values())))
+        )
+
+        new_rows = []
+        for symbol, rows in rows_by_symbol.items():
+            stock_id = stock_ids.get(symbol)
+            if stock_id is None:
+                continue
+            for row in rows:
+                key = (stock_id, row['fiscal_year'], row['fiscal_quarter'])
+                if key in existing:
+                    continue
+                existing.add(key)
+                new_rows.append(dict(row, stock_id=stock_id))
+
+        if new_rows:
+            stmt = insert(FinancialData)
+            if db.get_bind().dialect.name == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+                # A concurrent writer may have stored the same period meanwhile
+                stmt = pg_insert(FinancialData).on_conflict_do_nothing()
+            db.execute(stmt, new_rows)
+        db.commit()
+        return len(new_rows)
+
+    def store_statements(
+        self,
+        db: Session,
+        stock: Stock,
+        income_statement: Optional[Dict[str, Any]],
+        balance_sheet: Optional[Dict[str, Any]],
+        cash_flow: Optional[Dict[str, Any]],
+    ) -> int:
+        """Parse and store one stock's statements; returns the number of new periods."""
+        rows = self.parse_statements(income_statement, balance_sheet, cash_flow)
+        return self.store_statement_batch(db, {stock.symbol: rows})
+
+    def get_history(self, db: Session, stock_id: int) -> List[FinancialData]:
+        """Stored periods for a stock, newest first."""
+        return (
+            db.query(FinancialData)
+            .filter(FinancialData.stock_id == stock_id)
+            .order_by(FinancialData.fiscal_date_ending.desc())
+            .all()
+        )
+
+    def needs_refresh(self, db: Session, stock_id: int, today: Optional[date] = None) -> bool:
+        """Whether a newer quarter than the latest stored one is likely filed."""
+        latest = (
+            db.query(FinancialData.fiscal_date_ending)
+            .filter(
+                FinancialData.stock_id == stock_id,
+                FinancialData.fiscal_quarter.isnot(None),
+            )
+            .order_by(FinancialData.fiscal_date_ending.desc())
+            .limit(1)
+            .scalar()
+        )
+        if latest is None:
+            return True
+        return (today or date.today()) - latest > NEW_PERIOD_AFTER
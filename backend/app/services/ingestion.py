@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from .async_alpha_vantage import AsyncAlphaVantageService
+from .financial_data import FinancialDataService
+from .stock_service import StockService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling the writer that all fetchers are done
+_DONE = object()
+
+
+class IngestionProgress:
+    """Counters for the current (or last) ingestion run."""
+
+    def __init__(self):
+        self.running = False
+        self.total = 0
+        self.resumed = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def symbols_per_minute(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.completed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'total': self.total,
+            'resumed': self.resumed,
+            'completed': self.completed,
+            'failed': self.failed,
+            'remaining': max(self.total - self.resumed - self.completed - self.failed, 0),
+            'symbols_per_minute': round(self.symbols_per_minute, 2),
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class IngestionPipeline:
+    """
+    Concurrent overview ingestion for a symbol universe.
+
+    Fetchers pull symbols as fast as the async client's rate limiter allows,
+    overviews are parsed on a worker thread pool, and a single writer stores
+    them with batched UPSERTs through its own session. With
+    ``include_statements`` the three financial statements are fetched too and
+    their new periods stored in bulk alongside each batch. Symbols are
+    checkpointed after each committed batch so a crashed run resumes where it
+    stopped; the checkpoint is removed once a run finishes.
+    """
+
+    def __init__(
+        self,
+        alpha_vantage: AsyncAlphaVantageService,
+        stock_service: StockService,
+        session_factory: Callable[[], Session] = SessionLocal,
+        checkpoint_path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        parse_workers: Optional[int] = None,
+        financial_data: Optional[FinancialDataService] = None,
+    ):
+        self.alpha_vantage = alpha_vantage
+        self.stock_service = stock_service
+        self.session_factory = session_factory
+        self.checkpoint_path = checkpoint_path or settings.ingestion_checkpoint_path
+        self.batch_size = batch_size or settings.ingestion_batch_size
+        self.parse_workers = parse_workers or settings.ingestion_parse_workers
+        self.financial_data = financial_data or FinancialDataService()
+        self.progress = IngestionProgress()
+
+    def _load_checkpoint(self) -> Set[str]:
+        try:
+            with open(self.checkpoint_path) as f:
+                return set(json.load(f).get('completed', []))
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable ingestion checkpoint: {e}")
+            return set()
+
+    def _save_checkpoint(self, completed: Set[str]):
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'completed': sorted(completed)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+    def _write_batch(self, batch: List[Tuple[Dict[str, Any], Optional[list]]]) -> int:
+        db = self.session_factory()
+        try:
+            written = self.stock_service.upsert_stock_rows(db, [row for row, _ in batch])
+            statements = {
+                row['symbol']: periods for row, periods in batch if periods
+            }
+            if statements:
+                self.financial_data.store_statement_batch(db, statements)
+            return written
+        finally:
+            db.close()
+
+    async def run(self, symbols: List[str], include_statements: bool = False):
+        """Ingest ``symbols``, skipping any recorded in the checkpoint."""
+        if self.progress.running:
+            logger.warning("Ingestion already running, ignoring new run")
+            return
+
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        completed = self._load_checkpoint() & set(symbols)
+        pending = [symbol for symbol in symbols if symbol not in completed]
+
+        progress = IngestionProgress()
+        progress.running = True
+        progress.total = len(symbols)
+        progress.resumed = len(completed)
+        progress.started_at = time.time()
+        self.progress = progress
+
+        if completed:
+            logger.info(f"Resuming ingestion: {len(completed)} of {len(symbols)} symbols already done")
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix="ingest-parse")
+        symbol_queue: asyncio.Queue = asyncio.Queue()
+        for symbol in pending:
+            symbol_queue.put_nowait(symbol)
+        row_queue: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 2)
+
+        async def fetch_worker():
+            while True:
+                try:
+                    symbol = symbol_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    payload = await self.alpha_vantage.get_company_overview(symbol)
+                    if not payload:
+                        progress.failed += 1
+                        continue
+                    row = await loop.run_in_executor(executor, StockService.parse_overview, payload)
+                    periods = None
+                    if include_statements:
+                        statements = await asyncio.gather(
+                            self.alpha_vantage.get_income_statement(symbol),
+                            self.alpha_vantage.get_balance_sheet(symbol),
+                            self.alpha_vantage.get_cash_flow(symbol),
+                        )
+                        periods = await loop.run_in_executor(
+                            executor, FinancialDataService.parse_statements, *statements
+                        )
+                    await row_queue.put((row, periods))
+                except Exception as e:
+                    progress.failed += 1
+                    logger.error(f"Error ingesting {symbol}: {e}")
+
+        async def writer():
+            batch: List[Tuple[Dict[str, Any], Optional[list]]] = []
+            while True:
+                item = await row_queue.get()
+                if item is not _DONE:
+                    batch.append(item)
+                if batch and (item is _DONE or len(batch) >= self.batch_size):
+                    await self._flush(batch, completed)
+                    batch = []
+                if item is _DONE:
+                    return
+
+        workers = max(1, min(settings.alpha_vantage_max_connections, len(pending)))
+        writer_task = asyncio.create_task(writer())
+        try:
+            await asyncio.gather(*(fetch_worker() for _ in range(workers)))
+            await row_queue.put(_DONE)
+            await writer_task
+            if progress.failed == 0:
+                self._clear_checkpoint()
+        except Exception as e:
+            writer_task.cancel()
+            logger.error(f"Ingestion aborted: {e}")
+        finally:
+            executor.shutdown(wait=False)
+            progress.running = False
+            progress.finished_at = time.time()
+            logger.info(
+                f"Ingestion finished: {progress.completed} stored, {progress.failed} failed, "
+                f"{progress.symbols_per_minute:.1f} symbols/min"
+            )
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], Optional[list]]], completed: Set[str]):
+        try:
+            written = await asyncio.to_thread(self._write_batch, batch)
+        except Exception as e:
+            self.progress.failed += len(batch)
+            logger.error(f"Failed to store batch of {len(batch)} stocks: {e}")
+            return
+
+        completed.update(row['symbol'] for row, _ in batch)
+        await asyncio.to_thread(self._save_checkpoint, set(completed))
+        self.progress.completed += written
+        logger.info(
+            f"Ingested {self.progress.completed + self.progress.resumed}/{self.progress.total} "
+            f"symbols ({self.progress.symbols_per_minute:.1f} symbols/min)"
+        )
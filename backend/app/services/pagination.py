@@ -0,0 +1,74 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..schemas.schemas import ScreeningFilters
+
+# Every column a screening result row can carry, in response order.
+STOCK_FIELDS = (
+    'id', 'symbol', 'name', 'sector', 'industry', 'market_cap', 'pe_ratio',
+    'pb_ratio', 'dividend_yield', 'debt_to_equity', 'roe', 'current_price',
+    'created_at', 'updated_at',
+)
+
+# Sort columns holding strings; every other sort column is numeric.
+TEXT_SORT_FIELDS = ('symbol', 'name', 'sector', 'industry')
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a screening cursor is malformed or belongs to another sort."""
+
+
+def projected_fields(filters: ScreeningFilters) -> List[str]:
+    """
+    Columns to select for ``filters``.
+
+    ``id``, ``symbol`` and the sort column are always included: they identify
+    the row and carry the keyset position for the next cursor.
+    """
+    if not filters.fields:
+        return list(STOCK_FIELDS)
+    wanted = {'id', 'symbol', filters.sort_by, *filters.fields}
+    return [name for name in STOCK_FIELDS if name in wanted]
+
+
+def page_limit(filters: ScreeningFilters) -> int:
+    return filters.limit or settings.screen_default_limit
+
+
+def encode_cursor(filters: ScreeningFilters, row: Dict[str, Any]) -> str:
+    """Opaque token pointing just after ``row`` in ``filters``' sort order."""
+    payload = [filters.sort_by, filters.sort_desc, row[filters.sort_by], row['id']]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(filters: ScreeningFilters) -> Optional[Tuple[Any, int]]:
+    """Return the (sort value, id) position of ``filters.cursor``, if any."""
+    if not filters.cursor:
+        return None
+    try:
+        padded = filters.cursor + '=' * (-len(filters.cursor) % 4)
+        sort_by, sort_desc, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+    if sort_by != filters.sort_by or sort_desc != filters.sort_desc:
+        raise InvalidCursorError("Cursor was issued for a different sort order")
+    expected = str if sort_by in TEXT_SORT_FIELDS else (int, float)
+    if not isinstance(row_id, int) or not (value is None or isinstance(value, expected)):
+        raise InvalidCursorError("Malformed cursor")
+    return value, row_id
+
+
+def paginate(filters: ScreeningFilters, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trim a ``limit + 1`` row fetch to one page and build the next cursor.
+
+    The extra row only signals that another page exists.
+    """
+    limit = page_limit(filters)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(filters, rows[-1])
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from passlib.context import CryptContext
+from ..core.config import settings
+from ..core.security import pwd_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusyError(Exception):
+    """Raised when too many hashing operations are already pending."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool.
+
+    bcrypt releases the GIL while hashing, so a few threads keep hashing
+    off the event loop and off the request threadpool without a process
+    pool. At most ``max_pending`` operations may be queued or running;
+    beyond that callers get ``HasherBusyError`` instead of waiting.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.context = context
+        self.max_workers = max_workers or settings.password_hash_workers
+        self.max_pending = max_pending or settings.password_hash_max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="bcrypt"
+        )
+
+        # Only touched from the event loop thread
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_hash_seconds = 0.0
+
+    async def _submit(self, fn: Callable[..., Any], *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusyError("Password hashing queue is full")
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        started = []
+
+        def call():
+            started.append(time.perf_counter())
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            finished = time.perf_counter()
+            self.pending -= 1
+            self.completed += 1
+            if started:
+                wait = started[0] - submitted
+                self.total_wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+                self.total_hash_seconds += finished - started[0]
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(self.context.verify, password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self.completed or 1
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'queued': max(self.pending - self.max_workers, 0),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'avg_wait_ms': round(self.total_wait_seconds / completed * 1000, 2),
+            'max_wait_ms': round(self.max_wait_seconds * 1000, 2),
+            'avg_hash_ms': round(self.total_hash_seconds / completed * 1000, 2),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import re
+import threading
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+import numpy as np
+from ..core.config import settings
+from .async_alpha_vantage import AsyncAlphaVantageService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One raw binary file per column; ``date`` is written last on every append
+# and its length is the number of committed bars.
+COLUMNS = (
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.int64),
+)
+DATE_DTYPE = np.dtype('datetime64[D]')
+
+# Ticker symbols double as directory names, so only these are accepted;
+# at least one letter or digit rules out '.' and '..'.
+SYMBOL_PATTERN = re.compile(r'(?=.*[A-Z0-9])[A-Z0-9.\-]{1,10}')
+
+# A compact TIME_SERIES_DAILY response holds the last 100 trading days,
+# about 140 calendar days; older gaps need the full history.
+COMPACT_SPAN = timedelta(days=140)
+
+# Alpha Vantage field for each column
+SERIES_FIELDS = {
+    'open': '1. open',
+    'high': '2. high',
+    'low': '3. low',
+    'close': '4. close',
+    'volume': '5. volume',
+}
+
+
+class InvalidSymbolError(ValueError):
+    pass
+
+
+def is_valid_symbol(symbol: str) -> bool:
+    return bool(SYMBOL_PATTERN.fullmatch(symbol.upper()))
+
+
+class PriceHistoryStore:
+    """
+    Append-only columnar store of daily OHLCV bars.
+
+    Each symbol is a directory of raw little-endian column files. Reads
+    memory-map the files and return array views, so slicing years of
+    history copies nothing. Dates are stored sorted, and the date column
+    doubles as the index: ``searchsorted`` maps a date to its offset.
+    Appends write the value columns before the date column, so a crash
+    mid-append leaves extra bytes, in any column, that the next append
+    truncates.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.price_history_dir
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _dir(self, symbol: str) -> str:
+        if not is_valid_symbol(symbol):
+            raise InvalidSymbolError(f"Invalid symbol: {symbol!r}")
+        return os.path.join(self.root, symbol.upper())
+
+    def _path(self, symbol: str, column: str) -> str:
+        return os.path.join(self._dir(symbol), f'{column}.bin')
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, 'date.bin'))
+        )
+
+    def length(self, symbol: str) -> int:
+        """Number of committed bars for ``symbol``."""
+        try:
+            return os.path.getsize(self._path(symbol, 'date')) // DATE_DTYPE.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def _map(self, symbol: str, column: str, dtype, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(symbol, column), dtype=dtype, mode='r', shape=(length,))
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        length = self.length(symbol)
+        if length == 0:
+            return None
+        return self._map(symbol, 'date', DATE_DTYPE, length)[-1].item()
+
+    def read(
+        self, symbol: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Bars between ``start`` and ``end`` inclusive as read-only array views.
+
+        Returns a ``date`` column plus one array per OHLCV column; all are
+        empty when nothing is stored.
+        """
+        length = self.length(symbol)
+        dates = self._map(symbol, 'date', DATE_DTYPE, length)
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, 'D'), 'left'))
+        hi = length if end is None else int(np.searchsorted(dates, np.datetime64(end, 'D'), 'right'))
+
+        bars = {'date': dates[lo:hi]}
+        for column, dtype in COLUMNS:
+            bars[column] = self._map(symbol, column, dtype, length)[lo:hi]
+        return bars
+
+    def append(self, symbol: str, bars: Dict[str, np.ndarray]) -> int:
+        """
+        Append bars newer than the last stored date; returns how many were added.
+
+        ``bars`` maps ``date`` and each OHLCV column to equal-length arrays in
+        any order. Rows on or before the last stored date are dropped.
+        """
+        with self._lock(symbol):
+            length = self.length(symbol)
+            dates = np.asarray(bars['date'], dtype=DATE_DTYPE)
+            order = np.argsort(dates, kind='stable')
+            keep = order
+            if length:
+                last = self._map(symbol, 'date', DATE_DTYPE, length)[-1]
+                keep = order[dates[order] > last]
+            if len(keep) == 0:
+                return 0
+            # Duplicate dates within one payload keep their first occurrence
+            keep = keep[np.concatenate(([True], np.diff(dates[keep]) > np.timedelta64(0, 'D')))]
+
+            os.makedirs(self._dir(symbol), exist_ok=True)
+            for column, dtype in COLUMNS:
+                with open(self._path(symbol, column), 'ab') as f:
+                    # Drop bytes left by an append that crashed before its dates
+                    f.truncate(length * np.dtype(dtype).itemsize)
+                    np.asarray(bars[column], dtype=dtype)[keep].tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+            with open(self._path(symbol, 'date'), 'ab') as f:
+                # A torn date write leaves a partial record past the last whole one
+                f.truncate(length * DATE_DTYPE.itemsize)
+                dates[keep].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            return len(keep)
+
+    @staticmethod
+    def parse_time_series(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, np.ndarray]]:
+        """Convert a TIME_SERIES_DAILY payload into column arrays."""
+        series = (data or {}).get('Time Series (Daily)')
+        if not series:
+            return None
+        days = list(series)
+        bars = {'date': np.array(days, dtype=DATE_DTYPE)}
+        for column, dtype in COLUMNS:
+            field = SERIES_FIELDS[column]
+            bars[column] = np.array([float(series[day][field]) for day in days]).astype(dtype)
+        return bars
+
+
+class PriceHistoryService:
+    """
+    Keeps a PriceHistoryStore current by fetching only the missing days.
+
+    Each callable in ``listeners`` is called with the symbol after new bars
+    are appended. A symbol already being updated is not fetched again by a
+    concurrent call.
+    """
+
+    def __init__(self, alpha_vantage: AsyncAlphaVantageService, store: Optional[PriceHistoryStore] = None):
+        self.alpha_vantage = alpha_vantage
+        self.store = store or PriceHistoryStore()
+        self.listeners: List[Callable[[str], None]] = []
+        self._updating: Set[str] = set()
+
+    def is_stale(self, symbol: str, today: Optional[date] = None) -> bool:
+        """Whether bars before yesterday may be missing for ``symbol``."""
+        last = self.store.last_date(symbol)
+        return last is None or last < (today or date.today()) - timedelta(days=1)
+
+    async def update(self, symbol: str, today: Optional[date] = None) -> int:
+        """Fetch and append new bars for ``symbol``; returns the number added."""
+        symbol = symbol.upper()
+        if symbol in self._updating or not self.is_stale(symbol, today):
+            return 0
+        self._updating.add(symbol)
+        try:
+            return await self._fetch_and_append(symbol, today or date.today())
+        finally:
+            self._updating.discard(symbol)
+
+    async def _fetch_and_append(self, symbol: str, today: date) -> int:
+        last = self.store.last_date(symbol)
+        outputsize = 'compact' if last is not None and today - last < COMPACT_SPAN else 'full'
+        payload = await self.alpha_vantage.get_time_series_daily(symbol, outputsize)
+        bars = PriceHistoryStore.parse_time_series(payload)
+        if bars is None:
+            logger.error(f"No price history returned for {symbol}")
+            return 0
+        added = await asyncio.to_thread(self.store.append, symbol, bars)
+        if added:
+            logger.info(f"Stored {added} new bars for {symbol}")
+            for listener in self.listeners:
+                listener(symbol)
+        return added
+
+    async def update_many(self, symbols: List[str]) -> Dict[str, int]:
+        """Update several symbols concurrently within the client's rate limit."""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        added = await asyncio.gather(*(self.update(symbol) for symbol in symbols))
+        return dict(zip(symbols, added))
@@ -0,0 +1,69 @@
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session, make_transient_to_detached
+from ..core.config import settings
+from ..models.models import User
+from .cache import LRUCacheBackend
+import logging
+
+logger = logging.getLogger(__name__)
+
+# User columns kept in the cache; the password hash is left out and loads
+# lazily if anything asks for it.
+PRINCIPAL_COLUMNS = ('id', 'email', 'username', 'is_active', 'created_at', 'updated_at')
+
+
+class PrincipalCache:
+    """
+    TTL-bounded LRU of authenticated users keyed by token subject.
+
+    Cached users are re-attached to the request's session without a query,
+    so relationships such as ``watchlist`` still load normally. Deactivating
+    a user must call ``revoke()``: it drops the cached entry and, for tokens
+    that embed the user id and active flag, forces them back onto the
+    database lookup until they expire. Revocations are per process.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl or settings.principal_cache_ttl_seconds
+        max_entries = max_entries or settings.principal_cache_max_entries
+        self._users = LRUCacheBackend(max_entries)
+        self._revoked = LRUCacheBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _attach(db: Session, values: Dict[str, Any]) -> User:
+        """Return a session-bound User built from ``values`` without a SELECT."""
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def get(self, db: Session, username: str) -> Optional[User]:
+        values = self._users.get(username)
+        if values is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._attach(db, values)
+
+    def put(self, user: User):
+        values = {column: getattr(user, column) for column in PRINCIPAL_COLUMNS}
+        self._users.set(user.username, values, self.ttl)
+
+    def from_claims(self, db: Session, username: str, payload: Dict[str, Any]) -> Optional[User]:
+        """Build the user from ``uid``/``act`` token claims, if present and not revoked."""
+        user_id, is_active = payload.get('uid'), payload.get('act')
+        if not isinstance(user_id, int) or not isinstance(is_active, bool):
+            return None
+        if self._revoked.get(str(user_id)) is not None:
+            return None
+        return self._attach(db, {'id': user_id, 'username': username, 'is_active': is_active})
+
+    def invalidate(self, username: str):
+        self._users.delete(username)
+
+    def revoke(self, user: User):
+        """Forget ``user`` and distrust the claims of tokens issued to it."""
+        self.invalidate(user.username)
+        token_lifetime = settings.access_token_expire_minutes * 60
+        self._revoked.set(str(user.id), {}, token_lifetime)
@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.models import Stock, user_watchlist
+from .async_alpha_vantage import AsyncAlphaVantageService
+from .cache import FUNCTION_TTLS
+from .stock_service import StockService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_priority(age_seconds: float, watchers: int, ttl: float) -> float:
+    """
+    How urgently a stock needs refreshing.
+
+    Staleness is measured in TTLs, so 2.0 means twice as old as the data
+    type allows; each doubling of the watcher count adds the same boost.
+    """
+    return (age_seconds / ttl) * (1 + math.log1p(watchers))
+
+
+class RefreshScheduler:
+    """
+    Background refresher that spends a slice of the Alpha Vantage budget on
+    the most valuable stale stocks first.
+
+    Every scan loads each stock's age and watcher count, queues those older
+    than the overview TTL in a max-heap keyed on ``refresh_priority``, and
+    the loop refreshes from the top of the heap. Refreshes draw on the
+    client's shared rate limiter but leave all except
+    ``refresh_calls_per_minute`` of its tokens to interactive calls, so the
+    scheduler only uses budget they are not. The overview TTL matches the
+    response cache's, so a refresh never reads back a cached stale payload.
+    """
+
+    def __init__(
+        self,
+        alpha_vantage: AsyncAlphaVantageService,
+        stock_service: StockService,
+        session_factory: Callable[[], Session] = SessionLocal,
+        ttl: Optional[float] = None,
+    ):
+        self.alpha_vantage = alpha_vantage
+        self.stock_service = stock_service
+        self.session_factory = session_factory
+        self.ttl = ttl or FUNCTION_TTLS['OVERVIEW']
+        # Tokens left in the shared bucket for interactive calls
+        self.reserve = max(settings.alpha_vantage_calls_per_minute - settings.refresh_calls_per_minute, 0)
+        self._queue: List[Tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.total_stocks = 0
+        self.fresh_stocks = 0
+        self.oldest_age_seconds = 0.0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_scan_at: Optional[float] = None
+
+    def scan(self, db: Session):
+        """Rebuild the priority queue from current ages and watcher counts."""
+        rows = (
+            db.query(
+                Stock.symbol,
+                func.coalesce(Stock.updated_at, Stock.created_at),
+                func.count(user_watchlist.c.user_id),
+            )
+            .outerjoin(user_watchlist, user_watchlist.c.stock_id == Stock.id)
+            .group_by(Stock.id, Stock.symbol, Stock.updated_at, Stock.created_at)
+            .all()
+        )
+
+        now = datetime.now(timezone.utc)
+        queue = []
+        fresh = 0
+        oldest = 0.0
+        for symbol, refreshed_at, watchers in rows:
+            if refreshed_at is None:
+                age = math.inf
+            else:
+                if refreshed_at.tzinfo is None:
+                    refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+                age = (now - refreshed_at).total_seconds()
+            oldest = max(oldest, age)
+            if age < self.ttl:
+                fresh += 1
+                continue
+            priority = refresh_priority(min(age, 100 * self.ttl), watchers, self.ttl)
+            queue.append((-priority, symbol))
+
+        heapq.heapify(queue)
+        self._queue = queue
+        self.total_stocks = len(rows)
+        self.fresh_stocks = fresh
+        self.oldest_age_seconds = oldest if oldest != math.inf else -1
+        self.last_scan_at = time.time()
+
+    def _scan(self):
+        db = self.session_factory()
+        try:
+            self.scan(db)
+        finally:
+            db.close()
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            self.stock_service.upsert_stock_rows(db, rows)
+        finally:
+            db.close()
+
+    async def refresh_next(self) -> bool:
+        """Refresh the highest-priority queued stock; False if none is queued."""
+        if not self._queue:
+            return False
+        _, symbol = heapq.heappop(self._queue)
+        payload = await self.alpha_vantage.get_company_overview(symbol, reserve=self.reserve)
+        if not payload or not payload.get('Symbol'):
+            self.failed += 1
+            return True
+        await asyncio.to_thread(self._write, [StockService.parse_overview(payload)])
+        self.refreshed += 1
+        self.fresh_stocks += 1
+        return True
+
+    async def run_forever(self):
+        interval = settings.refresh_scan_interval_seconds
+        while True:
+            try:
+                await asyncio.to_thread(self._scan)
+                deadline = time.monotonic() + interval
+                while time.monotonic() < deadline:
+                    if not await self.refresh_next():
+                        await asyncio.sleep(max(deadline - time.monotonic(), 0))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Refresh scheduler error: {e}")
+                await asyncio.sleep(interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        fresh_ratio = self.fresh_stocks / self.total_stocks if self.total_stocks else 1.0
+        return {
+            'running': self._task is not None,
+            'queue_depth': len(self._queue),
+            'total_stocks': self.total_stocks,
+            'fresh_stocks': self.fresh_stocks,
+            'fresh_ratio': round(fresh_ratio, 4),
+            'freshness_slo': settings.refresh_freshness_slo,
+            'slo_met': fresh_ratio >= settings.refresh_freshness_slo,
+            'ttl_seconds': self.ttl,
+            'oldest_age_seconds': self.oldest_age_seconds,
+            'refreshed': self.refreshed,
+            'failed': self.failed,
+            'last_scan_at': self.last_scan_at,
+        }
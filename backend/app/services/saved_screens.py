@@ -0,0 +1,229 @@
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from ..models.models import SavedScreen, SavedScreenMember, Stock, User
+from ..schemas.schemas import ScreeningFilters
+from .screen_expressions import compile_expression
+from .screening_engine import NUMERIC_COLUMNS
+from .sector_ranks import has_rank_filters
+from .stock_service import StockService
+from .technical_indicators import has_technical_filters
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Paging, projection and ordering are per request, not part of a saved screen
+UNSAVED_FIELDS = {'sort_by', 'sort_desc', 'limit', 'cursor', 'fields'}
+
+
+def is_incremental(filters: ScreeningFilters) -> bool:
+    """
+    Whether a stock's membership depends only on its own row.
+
+    Technical filters depend on price history and rank filters on the rest
+    of the sector, so screens using them are re-materialized on view instead.
+    """
+    return not has_technical_filters(filters) and not has_rank_filters(filters)
+
+
+def row_matches(filters: ScreeningFilters, row: Dict[str, Any]) -> bool:
+    """Evaluate the range, sector and expression filters on one stock row, as SQL would."""
+    for name in NUMERIC_COLUMNS:
+        lower = getattr(filters, f'min_{name}')
+        upper = getattr(filters, f'max_{name}')
+        if lower is None and upper is None:
+            continue
+        value = row.get(name)
+        if value is None:
+            return False
+        if lower is not None and value < lower:
+            return False
+        if upper is not None and value > upper:
+            return False
+    if filters.sectors and row.get('sector') not in filters.sectors:
+        return False
+    if filters.expression and not compile_expression(filters.expression).matches_row(row):
+        return False
+    return True
+
+
+class SavedScreenService:
+    """
+    Saved screens with materialized, incrementally maintained results.
+
+    Each screen's matching stocks are stored as SavedScreenMember rows. For
+    screens whose filters only look at a stock's own row, ``on_stocks_changed``
+    (registered as a StockService listener) re-tests just the written rows,
+    so a view never re-runs the screen. Members that leave before the owner
+    has seen them are dropped outright; members that leave after are kept
+    inactive until the next view, which reports what entered and left.
+    """
+
+    def __init__(self, stock_service: StockService, session_factory: Callable[[], Session] = SessionLocal):
+        self.stock_service = stock_service
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        # screen id -> filters for every incrementally maintained screen
+        self._screens: Optional[Dict[int, ScreeningFilters]] = None
+
+    @staticmethod
+    def filters_of(screen: SavedScreen) -> ScreeningFilters:
+        return ScreeningFilters.model_validate(json.loads(screen.filters))
+
+    def _incremental_screens(self) -> Dict[int, ScreeningFilters]:
+        with self._lock:
+            if self._screens is None:
+                db = self.session_factory()
+                try:
+                    screens = {screen.id: self.filters_of(screen) for screen in db.query(SavedScreen)}
+                finally:
+                    db.close()
+                self._screens = {
+                    screen_id: filters for screen_id, filters in screens.items() if is_incremental(filters)
+                }
+            return dict(self._screens)
+
+    def _track(self, screen_id: int, filters: Optional[ScreeningFilters]):
+        with self._lock:
+            if self._screens is None:
+                return
+            if filters is not None and is_incremental(filters):
+                self._screens[screen_id] = filters
+            else:
+                self._screens.pop(screen_id, None)
+
+    def list_screens(self, db: Session, user: User) -> List[SavedScreen]:
+        return db.query(SavedScreen).filter(SavedScreen.user_id == user.id).order_by(SavedScreen.name).all()
+
+    def get_screen(self, db: Session, user: User, screen_id: int) -> Optional[SavedScreen]:
+        return db.query(SavedScreen).filter(
+            SavedScreen.id == screen_id, SavedScreen.user_id == user.id
+        ).first()
+
+    def create_screen(
+        self, db: Session, user: User, name: str, filters: ScreeningFilters
+    ) -> Optional[SavedScreen]:
+        """Save and materialize a screen; returns None if the name is taken."""
+        stored = ScreeningFilters(**filters.model_dump(exclude=UNSAVED_FIELDS))
+        if stored.expression:
+            # Raises ExpressionError before anything is stored or tracked
+            compile_expression(stored.expression)
+        screen = SavedScreen(user_id=user.id, name=name, filters=stored.model_dump_json(exclude_defaults=True))
+        db.add(screen)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            return None
+
+        self._reconcile(db, screen.id, stored)
+        self._acknowledge(db, screen)
+        db.commit()
+
+        # Tracked only once stored; reconciling again picks up writes made
+        # while the first run was in flight, and they show as entered/left
+        self._track(screen.id, stored)
+        if is_incremental(stored):
+            self._reconcile(db, screen.id, stored)
+            db.commit()
+        db.refresh(screen)
+        return screen
+
+    def delete_screen(self, db: Session, screen: SavedScreen):
+        self._track(screen.id, None)
+        db.query(SavedScreenMember).filter(SavedScreenMember.screen_id == screen.id).delete()
+        db.delete(screen)
+        db.commit()
+
+    def view_screen(self, db: Session, screen: SavedScreen) -> Dict[str, Any]:
+        """
+        Current members plus the symbols that entered and left since the
+        last view, which becomes this one.
+        """
+        filters = self.filters_of(screen)
+        if not is_incremental(filters):
+            self._reconcile(db, screen.id, filters)
+            db.flush()
+
+        rows = db.query(SavedScreenMember, Stock).join(
+            Stock, Stock.id == SavedScreenMember.stock_id
+        ).filter(SavedScreenMember.screen_id == screen.id).order_by(Stock.symbol).all()
+
+        stocks = [stock for member, stock in rows if member.active]
+        entered = [stock.symbol for member, stock in rows if member.active and not member.seen]
+        left = [stock.symbol for member, stock in rows if member.seen and not member.active]
+
+        self._acknowledge(db, screen)
+        db.commit()
+        db.refresh(screen)
+        return {'screen': screen, 'stocks': stocks, 'entered': entered, 'left': left}
+
+    def _acknowledge(self, db: Session, screen: SavedScreen):
+        """Make the current membership the baseline for the next diff."""
+        members = db.query(SavedScreenMember).filter(SavedScreenMember.screen_id == screen.id)
+        members.filter(SavedScreenMember.active.is_(False)).delete(synchronize_session=False)
+        members.filter(SavedScreenMember.seen.is_(False)).update(
+            {SavedScreenMember.seen: True}, synchronize_session=False
+        )
+        screen.last_viewed_at = datetime.now(timezone.utc)
+
+    def _reconcile(self, db: Session, screen_id: int, filters: ScreeningFilters):
+        """Bring a screen's members in line with a full run of its filters."""
+        query = filters.model_copy(update={'fields': ['id'], 'sort_by': 'id', 'cursor': None})
+        matching: Set[int] = {row[0] for row in self.stock_service.iter_screen_rows(db, query)}
+        members = {
+            member.stock_id: member
+            for member in db.query(SavedScreenMember).filter(SavedScreenMember.screen_id == screen_id)
+        }
+        for stock_id in matching | set(members):
+            self._transition(db, screen_id, stock_id, stock_id in matching, members.get(stock_id))
+
+    @staticmethod
+    def _transition(
+        db: Session, screen_id: int, stock_id: int, matches: bool, member: Optional[SavedScreenMember]
+    ):
+        if matches:
+            if member is None:
+                db.add(SavedScreenMember(screen_id=screen_id, stock_id=stock_id, active=True, seen=False))
+            elif not member.active:
+                member.active = True
+        elif member is not None and member.active:
+            if member.seen:
+                member.active = False
+            else:
+                # Entered and left between views; nothing to report
+                db.delete(member)
+
+    def on_stocks_changed(self, rows: List[Dict[str, Any]]):
+        """Re-test written rows against every incrementally maintained screen."""
+        if not rows:
+            return
+        screens = self._incremental_screens()
+        if not screens:
+            return
+
+        db = self.session_factory()
+        try:
+            members = {
+                (member.screen_id, member.stock_id): member
+                for member in db.query(SavedScreenMember).filter(
+                    SavedScreenMember.stock_id.in_([row['id'] for row in rows]),
+                    SavedScreenMember.screen_id.in_(list(screens)),
+                )
+            }
+            for screen_id, filters in screens.items():
+                # Evaluated up front so one broken screen skips only itself
+                try:
+                    matches = [row_matches(filters, row) for row in rows]
+                except Exception as e:
+                    logger.error(f"Saved screen {screen_id} could not be re-tested: {e}")
+                    continue
+                for row, match in zip(rows, matches):
+                    self._transition(db, screen_id, row['id'], match, members.get((screen_id, row['id'])))
+            db.commit()
+        finally:
+            db.close()
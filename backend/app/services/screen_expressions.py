@@ -0,0 +1,514 @@
+import ast
+import hashlib
+import operator
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Float, String, and_, func, literal, not_, or_
+
+from ..core.config import settings
+from ..models.models import Stock
+from .screening_engine import NULL_SECTOR, NUMERIC_COLUMNS, SORT_ONLY_COLUMNS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Grammar, loosest binding first; keywords are case-insensitive:
+#
+#   expr       := and_expr ('or' and_expr)*
+#   and_expr   := not_expr ('and' not_expr)*
+#   not_expr   := 'not' not_expr | comparison
+#   comparison := sum [('<' | '<=' | '>' | '>=' | '==' | '!=') sum
+#                      | ['not'] 'in' '[' literal (',' literal)* ']'
+#                      | 'is' ['not'] 'null']
+#   sum        := product (('+' | '-') product)*
+#   product    := unary (('*' | '/') unary)*
+#   unary      := '-' unary | NUMBER | STRING | FIELD | '(' expr ')'
+#
+# NULL follows SQL: arithmetic on it gives NULL, comparing it is unknown,
+# and a stock matches only if the whole expression is true. Division by
+# zero gives NULL.
+NUMBER_FIELDS = NUMERIC_COLUMNS + SORT_ONLY_COLUMNS
+STRING_FIELDS = ('sector', 'symbol')
+KEYWORDS = {'and', 'or', 'not', 'in', 'is', 'null'}
+
+# Deepest nesting of parentheses, '-' and 'not' accepted; each level costs
+# several parser frames, so this keeps well inside Python's recursion limit.
+MAX_DEPTH = 50
+
+_TOKEN = re.compile(r'''\s*(?:
+    (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><=|>=|==|!=|<>|[<>=+\-*/(),\[\]])
+)''', re.VERBOSE)
+
+# Spellings folded together before hashing
+OP_ALIASES = {'=': '==', '<>': '!='}
+
+COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+Token = Tuple[str, Any]
+Node = tuple
+
+
+class ExpressionError(ValueError):
+    """Raised when a screening expression cannot be parsed or type-checked."""
+
+
+def tokenize(text: str) -> List[Token]:
+    tokens: List[Token] = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            position = len(text) - len(text[position:].lstrip())
+            raise ExpressionError(f"Unexpected character at position {position}: {text[position]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'num':
+            tokens.append(('num', float(value)))
+        elif kind == 'str':
+            tokens.append(('str', ast.literal_eval(value)))
+        elif kind == 'name':
+            name = value.lower()
+            tokens.append(('kw' if name in KEYWORDS else 'name', name))
+        else:
+            tokens.append(('op', OP_ALIASES.get(value, value)))
+    return tokens
+
+
+def normalize(tokens: Sequence[Token]) -> str:
+    """Canonical spelling of a token stream: case, spacing, quoting and number format folded."""
+    return ' '.join(repr(value) if kind in ('num', 'str') else value for kind, value in tokens)
+
+
+class _Parser:
+    """Recursive-descent parser producing tuple nodes."""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def peek(self) -> Optional[Token]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def accept(self, kind: str, value: Any = None) -> bool:
+        token = self.peek()
+        if token and token[0] == kind and (value is None or token[1] == value):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, kind: str, value: Any = None) -> Token:
+        token = self.peek()
+        if not self.accept(kind, value):
+            found = 'end of expression' if token is None else repr(token[1])
+            raise ExpressionError(f"Expected {value or kind}, found {found}")
+        return token
+
+    def nest(self, parse: Callable[[], Node]) -> Node:
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ExpressionError(f"Expression nests deeper than {MAX_DEPTH} levels")
+        node = parse()
+        self.depth -= 1
+        return node
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        node = self.expr()
+        if self.peek() is not None:
+            raise ExpressionError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expr(self) -> Node:
+        terms = [self.and_expr()]
+        while self.accept('kw', 'or'):
+            terms.append(self.and_expr())
+        return terms[0] if len(terms) == 1 else ('or', tuple(terms))
+
+    def and_expr(self) -> Node:
+        terms = [self.not_expr()]
+        while self.accept('kw', 'and'):
+            terms.append(self.not_expr())
+        return terms[0] if len(terms) == 1 else ('and', tuple(terms))
+
+    def not_expr(self) -> Node:
+        if self.accept('kw', 'not'):
+            return ('not', self.nest(self.not_expr))
+        return self.comparison()
+
+    def comparison(self) -> Node:
+        left = self.sum()
+        token = self.peek()
+        if token and token[0] == 'op' and token[1] in COMPARISONS:
+            self.position += 1
+            return ('cmp', token[1], left, self.sum())
+        if self.accept('kw', 'is'):
+            negated = self.accept('kw', 'not')
+            self.expect('kw', 'null')
+            return ('null', left, negated)
+        negated = self.accept('kw', 'not')
+        if negated or token == ('kw', 'in'):
+            self.expect('kw', 'in')
+            return ('in', left, self.literal_list(), negated)
+        return left
+
+    def literal_list(self) -> Tuple[Any, ...]:
+        self.expect('op', '[')
+        values = []
+        while True:
+            token = self.peek()
+            negative = self.accept('op', '-')
+            if token is None or not (self.accept('num') or (not negative and self.accept('str'))):
+                raise ExpressionError("Lists may only hold numbers or strings")
+            value = self.tokens[self.position - 1][1]
+            values.append(-value if negative else value)
+            if not self.accept('op', ','):
+                break
+        self.expect('op', ']')
+        return tuple(values)
+
+    def sum(self) -> Node:
+        node = self.product()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            op = self.tokens[self.position][1]
+            self.position += 1
+            node = ('arith', op, node, self.product())
+        return node
+
+    def product(self) -> Node:
+        node = self.unary()
+        while self.peek() in (('op', '*'), ('op', '/')):
+            op = self.tokens[self.position][1]
+            self.position += 1
+            node = ('arith', op, node, self.unary())
+        return node
+
+    def unary(self) -> Node:
+        if self.accept('op', '-'):
+            return ('neg', self.nest(self.unary))
+        if self.accept('op', '('):
+            node = self.nest(self.expr)
+            self.expect('op', ')')
+            return node
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Unexpected end of expression")
+        kind, value = token
+        if kind == 'num':
+            self.position += 1
+            return ('num', value)
+        if kind == 'str':
+            self.position += 1
+            return ('str', value)
+        if kind == 'name':
+            self.position += 1
+            if value not in NUMBER_FIELDS and value not in STRING_FIELDS:
+                raise ExpressionError(f"Unknown field: {value}")
+            return ('field', value)
+        raise ExpressionError(f"Unexpected {value!r}")
+
+
+def _type(node: Node) -> str:
+    """Type-check ``node``; returns 'bool', 'number' or 'string'."""
+    kind = node[0]
+    if kind in ('and', 'or'):
+        for term in node[1]:
+            if _type(term) != 'bool':
+                raise ExpressionError(f"Operands of '{kind}' must be conditions")
+        return 'bool'
+    if kind == 'not':
+        if _type(node[1]) != 'bool':
+            raise ExpressionError("Operand of 'not' must be a condition")
+        return 'bool'
+    if kind == 'cmp':
+        _, op, left, right = node
+        types = (_type(left), _type(right))
+        if types == ('number', 'number'):
+            return 'bool'
+        if types == ('string', 'string') and op in ('==', '!=') and _is_field_and_string(left, right):
+            return 'bool'
+        raise ExpressionError(
+            f"Cannot compare {types[0]} {op} {types[1]}; text fields support == and != against a string"
+        )
+    if kind == 'in':
+        _, left, values, _ = node
+        left_type = _type(left)
+        if left_type == 'number' and all(isinstance(v, float) for v in values):
+            return 'bool'
+        if left_type == 'string' and left[0] == 'field' and all(isinstance(v, str) for v in values):
+            return 'bool'
+        raise ExpressionError("'in' needs a list of the same type as its left side")
+    if kind == 'null':
+        if _type(node[1]) == 'bool' or node[1][0] == 'str':
+            raise ExpressionError("'is null' applies to fields and arithmetic")
+        return 'bool'
+    if kind == 'arith':
+        if _type(node[2]) != 'number' or _type(node[3]) != 'number':
+            raise ExpressionError(f"Operands of '{node[1]}' must be numbers")
+        return 'number'
+    if kind == 'neg':
+        if _type(node[1]) != 'number':
+            raise ExpressionError("Only numbers can be negated")
+        return 'number'
+    if kind == 'num':
+        return 'number'
+    if kind == 'str':
+        return 'string'
+    return 'number' if node[1] in NUMBER_FIELDS else 'string'
+
+
+def _is_field_and_string(left: Node, right: Node) -> bool:
+    return {left[0], right[0]} == {'field', 'str'}
+
+
+def _field_and_values(node: Node) -> Tuple[str, Tuple[str, ...], bool]:
+    """(field, values, negated) for a string comparison or membership test."""
+    if node[0] == 'in':
+        return node[1][1], node[2], node[3]
+    _, op, left, right = node
+    field, value = (left, right) if left[0] == 'field' else (right, left)
+    return field[1], (value[1],), op == '!='
+
+
+# SQL
+
+def _to_sql(node: Node):
+    kind = node[0]
+    if kind == 'and':
+        return and_(*(_to_sql(term) for term in node[1]))
+    if kind == 'or':
+        return or_(*(_to_sql(term) for term in node[1]))
+    if kind == 'not':
+        return not_(_to_sql(node[1]))
+    if kind == 'cmp' and _type(node[2]) == 'string' or kind == 'in' and _type(node[1]) == 'string':
+        name, values, negated = _field_and_values(node)
+        column = getattr(Stock, name)
+        return column.not_in(values) if negated else column.in_(values)
+    if kind == 'cmp':
+        return COMPARISONS[node[1]](_to_sql(node[2]), _to_sql(node[3]))
+    if kind == 'in':
+        left = _to_sql(node[1])
+        return left.not_in(node[2]) if node[3] else left.in_(node[2])
+    if kind == 'null':
+        left = _to_sql(node[1])
+        return left.is_not(None) if node[2] else left.is_(None)
+    if kind == 'arith':
+        left, right = _to_sql(node[2]), _to_sql(node[3])
+        if node[1] == '/':
+            # NULL instead of a division-by-zero error on PostgreSQL
+            return left / func.nullif(right, 0)
+        return {'+': operator.add, '-': operator.sub, '*': operator.mul}[node[1]](left, right)
+    if kind == 'neg':
+        return -_to_sql(node[1])
+    if kind == 'num':
+        return literal(node[1], Float)
+    if kind == 'str':
+        return literal(node[1], String)
+    return getattr(Stock, node[1])
+
+
+# NumPy
+#
+# Conditions evaluate to a (true, false) pair of masks; a row in neither is
+# unknown, as in SQL's three-valued logic, so 'not' can swap the pair.
+
+class _SnapshotColumns:
+    """Expression inputs read from a screening engine snapshot."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def number(self, name: str) -> np.ndarray:
+        return self.snapshot.columns[name]
+
+    def string_in(self, name: str, values: Tuple[str, ...]) -> np.ndarray:
+        if name == 'symbol':
+            return np.isin(self.snapshot.symbols, np.array(values, dtype=str))
+        codes = [self.snapshot.sector_codes[v] for v in values if v in self.snapshot.sector_codes]
+        return np.isin(self.snapshot.sector, np.array(codes, dtype=np.int32))
+
+    def string_null(self, name: str) -> np.ndarray:
+        if name == 'symbol':
+            return np.zeros(len(self.snapshot), dtype=bool)
+        return self.snapshot.sector == NULL_SECTOR
+
+
+class _RowColumns:
+    """Expression inputs read from one stock row dict."""
+
+    def __init__(self, row: Dict[str, Any]):
+        self.row = row
+
+    def number(self, name: str) -> np.ndarray:
+        value = self.row.get(name)
+        return np.array([np.nan if value is None else value], dtype=np.float64)
+
+    def string_in(self, name: str, values: Tuple[str, ...]) -> np.ndarray:
+        return np.array([self.row.get(name) in values])
+
+    def string_null(self, name: str) -> np.ndarray:
+        return np.array([self.row.get(name) is None])
+
+
+def _to_numpy(node: Node) -> Callable:
+    kind = node[0]
+    if kind in ('and', 'or'):
+        terms = [_to_numpy(term) for term in node[1]]
+
+        def combine(columns):
+            true, false = terms[0](columns)
+            for term in terms[1:]:
+                t, f = term(columns)
+                if kind == 'and':
+                    true, false = true & t, false | f
+                else:
+                    true, false = true | t, false & f
+            return true, false
+        return combine
+    if kind == 'not':
+        operand = _to_numpy(node[1])
+        return lambda columns: operand(columns)[::-1]
+    if kind == 'cmp' and _type(node[2]) == 'string' or kind == 'in' and _type(node[1]) == 'string':
+        name, values, negated = _field_and_values(node)
+
+        def string_match(columns):
+            match, known = columns.string_in(name, values), ~columns.string_null(name)
+            true, false = match & known, ~match & known
+            return (false, true) if negated else (true, false)
+        return string_match
+    if kind == 'cmp':
+        compare, left, right = COMPARISONS[node[1]], _to_numpy(node[2]), _to_numpy(node[3])
+
+        def numeric_match(columns):
+            a, b = left(columns), right(columns)
+            known = ~np.isnan(a) & ~np.isnan(b)
+            with np.errstate(invalid='ignore'):
+                result = compare(a, b)
+            return result & known, ~result & known
+        return numeric_match
+    if kind == 'in':
+        left, values, negated = _to_numpy(node[1]), np.array(node[2]), node[3]
+
+        def numeric_in(columns):
+            a = left(columns)
+            match, known = np.isin(a, values), ~np.isnan(a)
+            true, false = match & known, ~match & known
+            return (false, true) if negated else (true, false)
+        return numeric_in
+    if kind == 'null':
+        left, negated = node[1], node[2]
+        value = None if left[0] == 'field' and left[1] in STRING_FIELDS else _to_numpy(left)
+
+        def null_match(columns):
+            null = columns.string_null(left[1]) if value is None else np.isnan(value(columns))
+            return (~null, null) if negated else (null, ~null)
+        return null_match
+    if kind == 'arith':
+        op, left, right = node[1], _to_numpy(node[2]), _to_numpy(node[3])
+
+        def arith(columns):
+            a, b = left(columns), right(columns)
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                if op == '/':
+                    return np.where(b == 0, np.nan, a / b)
+                return {'+': np.add, '-': np.subtract, '*': np.multiply}[op](a, b)
+        return arith
+    if kind == 'neg':
+        operand = _to_numpy(node[1])
+        return lambda columns: -operand(columns)
+    if kind == 'num':
+        value = np.float64(node[1])
+        return lambda columns: value
+    name = node[1]
+    return lambda columns: columns.number(name)
+
+
+class CompiledExpression:
+    """A parsed and type-checked expression with its SQL and NumPy forms."""
+
+    def __init__(self, text: str, key: str, tree: Node):
+        self.text = text
+        self.key = key
+        self.tree = tree
+        self.clause = _to_sql(tree)
+        self._predicate = _to_numpy(tree)
+
+    def mask(self, snapshot) -> np.ndarray:
+        """Rows of a screening engine snapshot for which the expression is true."""
+        true, _ = self._predicate(_SnapshotColumns(snapshot))
+        return np.broadcast_to(true, (len(snapshot),)).copy()
+
+    def matches_row(self, row: Dict[str, Any]) -> bool:
+        true, _ = self._predicate(_RowColumns(row))
+        return bool(np.broadcast_to(true, (1,))[0])
+
+
+class PlanCache:
+    """
+    LRU cache of compiled expressions keyed by a hash of the normalized text.
+
+    Expressions differing only in case, spacing, quoting or number format
+    share one plan, so a repeated screen costs a tokenize and a lookup.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[str, CompiledExpression]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> CompiledExpression:
+        tokens = tokenize(text)
+        key = hashlib.sha1(normalize(tokens).encode()).hexdigest()
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        tree = _Parser(tokens).parse()
+        if _type(tree) != 'bool':
+            raise ExpressionError("Expression must be a condition, e.g. 'roe > 0.15'")
+        plan = CompiledExpression(text, key, tree)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._plans),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+plan_cache = PlanCache(settings.expression_plan_cache_size)
+
+
+def compile_expression(text: str) -> CompiledExpression:
+    """Compile ``text`` through the shared plan cache; raises ExpressionError."""
+    return plan_cache.get(text)
@@ -0,0 +1,235 @@
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.models import Stock
+from ..schemas.schemas import ScreeningFilters
+from .pagination import STOCK_FIELDS, decode_cursor, page_limit, paginate, projected_fields
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns held as float64 arrays; NULL is stored as NaN so that every
+# comparison against it is False, matching SQL semantics for range filters.
+NUMERIC_COLUMNS = (
+    'market_cap',
+    'pe_ratio',
+    'pb_ratio',
+    'dividend_yield',
+    'debt_to_equity',
+    'roe',
+)
+
+# Numeric columns that can be sorted on but not filtered
+SORT_ONLY_COLUMNS = ('current_price',)
+
+NULL_SECTOR = -1
+
+
+class _Snapshot:
+    """Immutable columnar copy of the screenable part of the stocks table."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        self.symbols = np.array([row['symbol'] for row in rows], dtype=str)
+        self.columns = {
+            name: np.array(
+                [np.nan if row[name] is None else row[name] for row in rows],
+                dtype=np.float64,
+            )
+            for name in NUMERIC_COLUMNS + SORT_ONLY_COLUMNS
+        }
+
+        # Dictionary-encode sectors: each distinct string gets a small int
+        self.sector_codes: Dict[str, int] = {}
+        codes = np.empty(len(rows), dtype=np.int32)
+        for i, row in enumerate(rows):
+            sector = row['sector']
+            if sector is None:
+                codes[i] = NULL_SECTOR
+            else:
+                codes[i] = self.sector_codes.setdefault(sector, len(self.sector_codes))
+        self.sector = codes
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class ColumnarScreeningEngine:
+    """
+    In-memory screening over NumPy column arrays.
+
+    The engine loads the screenable columns once and evaluates
+    ``ScreeningFilters`` as vectorized boolean masks. Writers call
+    ``invalidate()`` after committing; the next screen reloads the snapshot,
+    so a burst of updates costs a single rebuild.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next screen rebuilds it."""
+        self._stale = True
+
+    def on_stocks_changed(self, rows: List[Dict[str, Any]]):
+        """StockService change listener."""
+        self.invalidate()
+
+    def load(self, db: Session) -> _Snapshot:
+        """Rebuild the snapshot from the database."""
+        with self._lock:
+            if not self._stale and self._snapshot is not None:
+                return self._snapshot
+            # Clear the flag before reading so a concurrent invalidate()
+            # during the load forces another rebuild instead of being lost.
+            self._stale = False
+            columns = [getattr(Stock, name) for name in STOCK_FIELDS]
+            result = db.query(*columns).order_by(Stock.id).all()
+            snapshot = _Snapshot([row._asdict() for row in result])
+            self._snapshot = snapshot
+            logger.info(f"Screening engine loaded {len(snapshot)} stocks")
+            return snapshot
+
+    def _current(self, db: Session) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._stale or snapshot is None:
+            snapshot = self.load(db)
+        return snapshot
+
+    def screen(
+        self,
+        db: Session,
+        filters: ScreeningFilters,
+        symbols: Optional[Set[str]] = None,
+        rank_bounds: Optional[Dict[str, Dict[str, tuple]]] = None,
+        expression=None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of rows matching ``filters`` and the next cursor.
+
+        ``symbols``, when given, further restricts the result, e.g. to the
+        stocks passing the technical filters; ``rank_bounds`` holds the
+        per-sector metric bounds from ``SectorRankIndex.bounds`` and
+        ``expression`` the compiled ``filters.expression``.
+        """
+        snapshot = self._current(db)
+        mask = self.mask(snapshot, filters)
+        if expression is not None:
+            mask &= expression.mask(snapshot)
+        if symbols is not None:
+            mask &= np.isin(snapshot.symbols, np.array(sorted(symbols), dtype=str))
+        if rank_bounds:
+            mask &= self._rank_mask(snapshot, rank_bounds)
+        position = decode_cursor(filters)
+        if position is not None:
+            mask &= self._after_cursor(snapshot, filters, *position)
+
+        matches = self._order(snapshot, np.flatnonzero(mask), filters)
+        matches = matches[:page_limit(filters) + 1]
+
+        fields = projected_fields(filters)
+        if len(fields) == len(STOCK_FIELDS):
+            rows = [snapshot.rows[i] for i in matches]
+        else:
+            rows = [{name: snapshot.rows[i][name] for name in fields} for i in matches]
+        return paginate(filters, rows)
+
+    @staticmethod
+    def _order(snapshot: _Snapshot, matches: np.ndarray, filters: ScreeningFilters) -> np.ndarray:
+        """Sort ``matches`` like SQL's ``ORDER BY key NULLS LAST, id``."""
+        sort_by = filters.sort_by
+        # Snapshot rows are stored in id order, so matches already are
+        if sort_by == 'id':
+            return matches[::-1] if filters.sort_desc else matches
+
+        if sort_by in snapshot.columns:
+            keys = snapshot.columns[sort_by][matches]
+            nulls = np.isnan(keys)
+            keys = np.where(nulls, 0.0, -keys if filters.sort_desc else keys)
+            # lexsort sorts by the last key first
+            return matches[np.lexsort((snapshot.ids[matches], keys, nulls))]
+
+        present = [i for i in matches if snapshot.rows[i][sort_by] is not None]
+        missing = [i for i in matches if snapshot.rows[i][sort_by] is None]
+        # Python's sort is stable even when reversed, so ties stay in id order
+        present.sort(key=lambda i: snapshot.rows[i][sort_by], reverse=filters.sort_desc)
+        return np.array(present + missing, dtype=np.int64)
+
+    @staticmethod
+    def _after_cursor(
+        snapshot: _Snapshot, filters: ScreeningFilters, value: Any, row_id: int
+    ) -> np.ndarray:
+        """Mask of rows strictly after (value, row_id) in ``_order``'s order."""
+        ids = snapshot.ids
+        sort_by = filters.sort_by
+        if sort_by == 'id':
+            return ids < row_id if filters.sort_desc else ids > row_id
+
+        if sort_by in snapshot.columns:
+            keys = snapshot.columns[sort_by]
+            nulls = np.isnan(keys)
+            if value is None:
+                return nulls & (ids > row_id)
+            beyond = keys < value if filters.sort_desc else keys > value
+            return beyond | ((keys == value) & (ids > row_id)) | nulls
+
+        def after(row: Dict[str, Any]) -> bool:
+            key = row[sort_by]
+            if value is None:
+                return key is None and row['id'] > row_id
+            if key is None:
+                return True
+            if key == value:
+                return row['id'] > row_id
+            return key < value if filters.sort_desc else key > value
+
+        return np.fromiter((after(row) for row in snapshot.rows), dtype=bool, count=len(snapshot))
+
+    @staticmethod
+    def _rank_mask(snapshot: _Snapshot, rank_bounds: Dict[str, Dict[str, tuple]]) -> np.ndarray:
+        """Mask of rows inside their own sector's bound for every metric."""
+        mask = np.ones(len(snapshot), dtype=bool)
+        for metric, by_sector in rank_bounds.items():
+            column = snapshot.columns[metric]
+            passing = np.zeros(len(snapshot), dtype=bool)
+            for sector, (lower, strict, upper) in by_sector.items():
+                code = snapshot.sector_codes.get(sector)
+                if code is None:
+                    continue
+                in_bound = snapshot.sector == code
+                if lower is not None:
+                    in_bound &= column > lower if strict else column >= lower
+                if upper is not None:
+                    in_bound &= column <= upper
+                passing |= in_bound & ~np.isnan(column)
+            mask &= passing
+        return mask
+
+    def mask(self, snapshot: _Snapshot, filters: ScreeningFilters) -> np.ndarray:
+        """Evaluate ``filters`` against ``snapshot`` as a boolean mask."""
+        mask = np.ones(len(snapshot), dtype=bool)
+
+        for name in NUMERIC_COLUMNS:
+            column = snapshot.columns[name]
+            lower = getattr(filters, f'min_{name}')
+            upper = getattr(filters, f'max_{name}')
+            if lower is not None:
+                mask &= column >= lower
+            if upper is not None:
+                mask &= column <= upper
+
+        if filters.sectors:
+            wanted = [
+                snapshot.sector_codes[sector]
+                for sector in filters.sectors
+                if sector in snapshot.sector_codes
+            ]
+            mask &= np.isin(snapshot.sector, np.array(wanted, dtype=np.int32))
+
+        return mask
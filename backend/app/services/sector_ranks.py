@@ -0,0 +1,168 @@
+import bisect
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.models import Stock
+from ..schemas.schemas import ScreeningFilters
+from .screening_engine import NUMERIC_COLUMNS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (lower, lower_is_strict, upper) on a metric within one sector; None means
+# unbounded on that side, and the upper bound is always inclusive.
+Bound = Tuple[Optional[float], bool, Optional[float]]
+
+# metric -> sector -> bound; sectors missing from the inner dict match nothing
+SectorBounds = Dict[str, Dict[str, Bound]]
+
+RANK_METRICS = NUMERIC_COLUMNS
+
+
+def has_rank_filters(filters: ScreeningFilters) -> bool:
+    return bool(filters.min_sector_percentile or filters.max_sector_percentile or filters.max_sector_rank)
+
+
+def _tighter_lower(a: Bound, value: float, strict: bool) -> Bound:
+    lower, lower_strict, upper = a
+    if lower is None or value > lower or (value == lower and strict):
+        return value, strict, upper
+    return a
+
+
+class SectorRankIndex:
+    """
+    Per-sector sorted value lists for each screenable metric.
+
+    Rank and percentile filters are turned into one value threshold per
+    sector by indexing the sorted list, so a screen costs a lookup per
+    sector rather than a sort of the universe. The lists are loaded once
+    and kept current by ``on_stocks_changed``, which ``StockService`` calls
+    with the stored rows after every write.
+
+    Percentiles are percent ranks, ``100 * values below / (n - 1)``, and
+    rank 1 is a sector's largest value. Stocks without a sector or without
+    the metric are not ranked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # metric -> sector -> sorted values
+        self._sorted: Dict[str, Dict[str, List[float]]] = {}
+        # symbol -> last seen sector and metric values
+        self._current: Dict[str, Dict[str, Any]] = {}
+
+    def invalidate(self):
+        """Drop the index so the next screen reloads it from the database."""
+        with self._lock:
+            self._loaded = False
+
+    def load(self, db: Session):
+        columns = [Stock.symbol, Stock.sector] + [getattr(Stock, name) for name in RANK_METRICS]
+        rows = [row._asdict() for row in db.query(*columns)]
+        self._sorted = {metric: {} for metric in RANK_METRICS}
+        self._current = {}
+        for row in rows:
+            self._current[row['symbol']] = row
+            if row['sector'] is None:
+                continue
+            for metric in RANK_METRICS:
+                if row[metric] is not None:
+                    self._sorted[metric].setdefault(row['sector'], []).append(row[metric])
+        for by_sector in self._sorted.values():
+            for values in by_sector.values():
+                values.sort()
+        self._loaded = True
+        logger.info(f"Sector rank index loaded {len(rows)} stocks")
+
+    def _remove(self, metric: str, sector: Optional[str], value: Optional[float]):
+        if sector is None or value is None:
+            return
+        values = self._sorted[metric].get(sector)
+        if values:
+            i = bisect.bisect_left(values, value)
+            if i < len(values) and values[i] == value:
+                values.pop(i)
+
+    def _insert(self, metric: str, sector: Optional[str], value: Optional[float]):
+        if sector is None or value is None:
+            return
+        bisect.insort(self._sorted[metric].setdefault(sector, []), value)
+
+    def on_stocks_changed(self, rows: List[Dict[str, Any]]):
+        """Move changed metric values to their new sorted positions."""
+        with self._lock:
+            if not self._loaded:
+                return
+            for row in rows:
+                old = self._current.get(row['symbol'], {})
+                new = dict(old, **row)
+                for metric in RANK_METRICS:
+                    if old.get('sector') == new.get('sector') and old.get(metric) == new.get(metric):
+                        continue
+                    self._remove(metric, old.get('sector'), old.get(metric))
+                    self._insert(metric, new.get('sector'), new.get(metric))
+                self._current[row['symbol']] = new
+
+    def bounds(self, db: Session, filters: ScreeningFilters) -> Optional[SectorBounds]:
+        """Per-sector value bounds equivalent to the rank filters, or None if none are set."""
+        if not has_rank_filters(filters):
+            return None
+
+        with self._lock:
+            if not self._loaded:
+                self.load(db)
+
+            metrics = set(filters.min_sector_percentile or {})
+            metrics |= set(filters.max_sector_percentile or {})
+            metrics |= set(filters.max_sector_rank or {})
+
+            result: SectorBounds = {}
+            for metric in metrics:
+                min_pct = (filters.min_sector_percentile or {}).get(metric)
+                max_pct = (filters.max_sector_percentile or {}).get(metric)
+                max_rank = (filters.max_sector_rank or {}).get(metric)
+                result[metric] = {}
+                for sector, values in self._sorted[metric].items():
+                    bound = self._sector_bound(values, min_pct, max_pct, max_rank)
+                    if bound is not None:
+                        result[metric][sector] = bound
+            return result
+
+    @staticmethod
+    def _sector_bound(
+        values: List[float],
+        min_pct: Optional[float],
+        max_pct: Optional[float],
+        max_rank: Optional[int],
+    ) -> Optional[Bound]:
+        """Translate rank filters into a bound on one sector's sorted values."""
+        n = len(values)
+        if n == 0:
+            return None
+        bound: Bound = (None, False, None)
+
+        if min_pct is not None and min_pct > 0:
+            if n == 1:
+                return None
+            # percent rank >= p  <=>  at least k values below  <=>  v > values[k - 1]
+            k = math.ceil(min_pct * (n - 1) / 100 - 1e-9)
+            if k > 0:
+                bound = _tighter_lower(bound, values[k - 1], True)
+
+        if max_pct is not None and n > 1:
+            # percent rank <= q  <=>  at most m values below  <=>  v <= values[m]
+            m = math.floor(max_pct * (n - 1) / 100 + 1e-9)
+            if m < n - 1:
+                bound = (bound[0], bound[1], values[m])
+
+        if max_rank is not None and max_rank < n:
+            # rank <= r  <=>  at most r - 1 values above  <=>  v >= values[n - r]
+            bound = _tighter_lower(bound, values[n - max_rank], False)
+
+        lower, strict, upper = bound
+        if lower is not None and upper is not None and (lower > upper or (lower == upper and strict)):
+            return None
+        return bound
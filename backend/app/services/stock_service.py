@@ -1,76 +1,99 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
-from ..models.models import Stock, User, FinancialData
+from sqlalchemy import and_, or_, bindparam, case, exists, false, func, select
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from ..models.models import Stock, User, FinancialData, user_watchlist
 from ..schemas.schemas import StockCreate, ScreeningFilters
 from .alpha_vantage import AlphaVantageService
+from .pagination import decode_cursor, page_limit, paginate, projected_fields
+from .screen_expressions import compile_expression
+from .screening_engine import ColumnarScreeningEngine
+from .sector_ranks import SectorBounds, SectorRankIndex, has_rank_filters
+from .technical_indicators import TechnicalIndicatorEngine, has_technical_filters
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows per UPSERT statement, capped so rows * columns stays under the
+# bind-parameter limit of PostgreSQL (65535) and SQLite (32766).
+UPSERT_BATCH_SIZE = 2000
+MAX_BIND_PARAMS = 32000
+
+# Rows fetched per round-trip when streaming screen exports
+EXPORT_BATCH_SIZE = 1000
+
+# Columns of each written row passed to change listeners
+CHANGED_COLUMNS = (
+    'id', 'symbol', 'sector', 'market_cap', 'pe_ratio', 'pb_ratio',
+    'dividend_yield', 'debt_to_equity', 'roe', 'current_price',
+)
+
 
 class StockService:
-    def __init__(self, alpha_vantage_service: AlphaVantageService):
+    def __init__(
+        self,
+        alpha_vantage_service: AlphaVantageService,
+        screening_engine: Optional[ColumnarScreeningEngine] = None,
+        technical_engine: Optional[TechnicalIndicatorEngine] = None,
+        rank_index: Optional[SectorRankIndex] = None
+    ):
         self.alpha_vantage = alpha_vantage_service
+        self.screening_engine = screening_engine
+        self.technical_engine = technical_engine
+        self.rank_index = rank_index
+        
+        # Called after every committed write with the stored rows
+        self.listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        if screening_engine:
+            self.listeners.append(screening_engine.on_stocks_changed)
+        if rank_index:
+            self.listeners.append(rank_index.on_stocks_changed)
+    
+    def _notify(self, rows: List[Dict[str, Any]]):
+        for listener in self.listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                logger.error(f"Stock change listener failed: {e}")
     
     def get_stock_by_symbol(self, db: Session, symbol: str) -> Optional[Stock]:
         return db.query(Stock).filter(Stock.symbol == symbol.upper()).first()
     
+    def get_all_symbols(self, db: Session) -> List[str]:
+        return [symbol for (symbol,) in db.query(Stock.symbol).order_by(Stock.symbol)]
+    
     def create_or_update_stock(self, db: Session, symbol: str) -> Optional[Stock]:
         """Create or update stock data from Alpha Vantage."""
         symbol = symbol.upper()
         
         # Get data from Alpha Vantage
         overview_data = self.alpha_vantage.get_company_overview(symbol)
-        if not overview_data:
+        if not overview_data or not overview_data.get('Symbol'):
             logger.error(f"Failed to fetch data for {symbol}")
             return None
         
-        # Check if stock exists
-        stock = self.get_stock_by_symbol(db, symbol)
-        
-        if stock:
-            # Update existing stock
-            self._update_stock_from_overview(stock, overview_data)
-        else:
-            # Create new stock
-            stock = self._create_stock_from_overview(overview_data)
-            db.add(stock)
-        
-        db.commit()
-        db.refresh(stock)
-        return stock
-    
-    def _create_stock_from_overview(self, data: dict) -> Stock:
-        """Create Stock object from Alpha Vantage overview data."""
-        return Stock(
-            symbol=data.get('Symbol', '').upper(),
-            name=data.get('Name', ''),
-            sector=data.get('Sector'),
-            industry=data.get('Industry'),
-            market_cap=self._safe_float(data.get('MarketCapitalization')),
-            pe_ratio=self._safe_float(data.get('PERatio')),
-            pb_ratio=self._safe_float(data.get('PriceToBookRatio')),
-            dividend_yield=self._safe_float(data.get('DividendYield')),
-            debt_to_equity=self._safe_float(data.get('DebtToEquityRatio')),
-            roe=self._safe_float(data.get('ReturnOnEquityTTM')),
-            current_price=self._safe_float(data.get('Price'))
-        )
+        self.upsert_stocks(db, [overview_data])
+        return self.get_stock_by_symbol(db, overview_data['Symbol'])
     
-    def _update_stock_from_overview(self, stock: Stock, data: dict):
-        """Update existing Stock object from Alpha Vantage overview data."""
-        stock.name = data.get('Name', stock.name)
-        stock.sector = data.get('Sector') or stock.sector
-        stock.industry = data.get('Industry') or stock.industry
-        stock.market_cap = self._safe_float(data.get('MarketCapitalization')) or stock.market_cap
-        stock.pe_ratio = self._safe_float(data.get('PERatio')) or stock.pe_ratio
-        stock.pb_ratio = self._safe_float(data.get('PriceToBookRatio')) or stock.pb_ratio
-        stock.dividend_yield = self._safe_float(data.get('DividendYield')) or stock.dividend_yield
-        stock.debt_to_equity = self._safe_float(data.get('DebtToEquityRatio')) or stock.debt_to_equity
-        stock.roe = self._safe_float(data.get('ReturnOnEquityTTM')) or stock.roe
-        stock.current_price = self._safe_float(data.get('Price')) or stock.current_price
-    
-    def _safe_float(self, value) -> Optional[float]:
+    @staticmethod
+    def parse_overview(data: dict) -> Dict[str, Any]:
+        """Convert Alpha Vantage overview data into Stock column values."""
+        return {
+            'symbol': data.get('Symbol', '').upper(),
+            # Missing and empty names are None, so an update keeps the stored name
+            'name': data.get('Name') or None,
+            'sector': data.get('Sector'),
+            'industry': data.get('Industry'),
+            'market_cap': StockService._safe_float(data.get('MarketCapitalization')),
+            'pe_ratio': StockService._safe_float(data.get('PERatio')),
+            'pb_ratio': StockService._safe_float(data.get('PriceToBookRatio')),
+            'dividend_yield': StockService._safe_float(data.get('DividendYield')),
+            'debt_to_equity': StockService._safe_float(data.get('DebtToEquityRatio')),
+            'roe': StockService._safe_float(data.get('ReturnOnEquityTTM')),
+            'current_price': StockService._safe_float(data.get('Price'))
+        }
+    
+    @staticmethod
+    def _safe_float(value) -> Optional[float]:
         """Safely convert string to float."""
         if value is None or value == 'None' or value == '':
             return None
@@ -79,13 +102,192 @@ class StockService:
         except (ValueError, TypeError):
             return None
     
-    def screen_stocks(self, db: Session, filters: ScreeningFilters) -> List[Stock]:
-        """Screen stocks based on filters."""
-        query = db.query(Stock)
+    def upsert_stocks(self, db: Session, overview_payloads: List[dict]) -> int:
+        """Create or update stocks from a batch of Alpha Vantage overview payloads."""
+        return self.upsert_stock_rows(db, [self.parse_overview(data) for data in overview_payloads])
+    
+    def upsert_stock_rows(self, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Create or update parsed overview rows with multi-row UPSERT statements.
+        
+        PostgreSQL and SQLite use INSERT ... ON CONFLICT (symbol) DO UPDATE;
+        other databases fall back to a load-and-merge in one transaction. In
+        both cases a None value keeps the stored one. ``name`` is NOT NULL,
+        so a new stock without one is inserted with an empty name, which an
+        update likewise never writes over a stored one.
+        """
+        rows = self._dedupe_rows(rows)
+        if not rows:
+            return 0
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+        
+        if insert is None:
+            stored = self._merge_stock_rows(db, rows)
+        else:
+            columns = list(rows[0])
+            chunk_size = min(UPSERT_BATCH_SIZE, MAX_BIND_PARAMS // len(columns))
+            table = Stock.__table__
+            returning = [table.c[name] for name in CHANGED_COLUMNS]
+            stored = []
+            if 'name' in columns:
+                rows = [dict(row, name=row['name'] or '') for row in rows]
+            for start in range(0, len(rows), chunk_size):
+                stmt = insert(Stock).values(rows[start:start + chunk_size])
+                update = {
+                    name: func.coalesce(stmt.excluded[name], table.c[name])
+                    for name in columns if name != 'symbol'
+                }
+                if 'name' in update:
+                    update['name'] = func.coalesce(func.nullif(stmt.excluded.name, ''), table.c.name)
+                update['updated_at'] = func.now()
+                upsert = stmt.on_conflict_do_update(index_elements=['symbol'], set_=update)
+                # RETURNING hands listeners the merged rows without a re-read
+                result = db.execute(upsert.returning(*returning))
+                stored.extend(row._asdict() for row in result)
+        
+        db.commit()
+        self._notify(stored)
+        
+        return len(rows)
+    
+    @staticmethod
+    def _dedupe_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Collapse repeated symbols (later non-None values win); one statement
+        cannot update the same row twice."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            symbol = row.get('symbol')
+            if not symbol:
+                continue
+            if symbol in merged:
+                merged[symbol].update({k: v for k, v in row.items() if v is not None})
+            else:
+                merged[symbol] = dict(row)
+        return list(merged.values())
+    
+    def _merge_stock_rows(self, db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Portable UPSERT fallback: one IN query, then merge in the session."""
+        existing = {
+            stock.symbol: stock
+            for stock in db.query(Stock).filter(Stock.symbol.in_([row['symbol'] for row in rows]))
+        }
+        stocks = []
+        for row in rows:
+            stock = existing.get(row['symbol'])
+            if stock is None:
+                stock = Stock(**dict(row, name=row.get('name') or ''))
+                db.add(stock)
+            else:
+                for name, value in row.items():
+                    if value is not None:
+                        setattr(stock, name, value)
+            stocks.append(stock)
+        db.flush()
+        return [{name: getattr(stock, name) for name in CHANGED_COLUMNS} for stock in stocks]
+    
+    def screen_stocks(
+        self, db: Session, filters: ScreeningFilters
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Screen stocks based on filters.
+        
+        Returns one page of row dicts holding the projected fields, plus the
+        cursor for the next page (None on the last page). When a screening
+        engine is configured the filters are evaluated in memory.
+        """
+        if self.screening_engine:
+            expression = compile_expression(filters.expression) if filters.expression else None
+            return self.screening_engine.screen(
+                db, filters, self._technical_symbols(filters), self._rank_bounds(db, filters), expression
+            )
+        
+        rows = [row._asdict() for row in self.screen_query(db, filters)]
+        return paginate(filters, rows)
+    
+    def screen_query(self, db: Session, filters: ScreeningFilters):
+        """Build the SQL query for one page of ``filters`` without executing it."""
+        columns = [getattr(Stock, name) for name in projected_fields(filters)]
+        query = db.query(*columns)
+        
+        conditions = self._screen_conditions(db, filters)
+        position = decode_cursor(filters)
+        if position is not None:
+            conditions.append(self._after_cursor(filters, *position))
+        
+        if conditions:
+            query = query.filter(and_(*conditions))
         
-        # Apply filters
+        # One extra row tells paginate() whether another page exists
+        return query.order_by(*self._screen_order(filters)).limit(page_limit(filters) + 1)
+    
+    def iter_screen_rows(
+        self, db: Session, filters: ScreeningFilters, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[tuple]:
+        """
+        Stream every row matching ``filters`` as plain tuples.
+        
+        Columns follow ``projected_fields(filters)``. ``limit`` is ignored; the
+        cursor, if any, still sets the starting position. Rows are fetched
+        ``batch_size`` at a time through a server-side cursor where the
+        driver supports one, so memory stays flat regardless of match count.
+        """
+        columns = [getattr(Stock, name) for name in projected_fields(filters)]
+        conditions = self._screen_conditions(db, filters)
+        position = decode_cursor(filters)
+        if position is not None:
+            conditions.append(self._after_cursor(filters, *position))
+        
+        stmt = select(*columns).where(*conditions).order_by(*self._screen_order(filters))
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for row in result:
+            yield tuple(row)
+    
+    def _technical_symbols(self, filters: ScreeningFilters) -> Optional[Set[str]]:
+        """Symbols passing the technical filters, or None when none are set."""
+        if not has_technical_filters(filters):
+            return None
+        if self.technical_engine is None:
+            raise ValueError("Technical filters require price history")
+        return self.technical_engine.matching_symbols(filters)
+    
+    def _rank_bounds(self, db: Session, filters: ScreeningFilters) -> Optional[SectorBounds]:
+        """Per-sector value bounds for the rank filters, or None when none are set."""
+        if not has_rank_filters(filters):
+            return None
+        if self.rank_index is None:
+            raise ValueError("Sector rank filters require a rank index")
+        return self.rank_index.bounds(db, filters)
+    
+    def _screen_conditions(self, db: Session, filters: ScreeningFilters) -> list:
+        """Translate the range, sector, technical, rank and expression filters into SQL conditions."""
         conditions = []
         
+        if filters.expression:
+            conditions.append(compile_expression(filters.expression).clause)
+        
+        symbols = self._technical_symbols(filters)
+        if symbols is not None:
+            conditions.append(Stock.symbol.in_(sorted(symbols)))
+        
+        for metric, by_sector in (self._rank_bounds(db, filters) or {}).items():
+            column = getattr(Stock, metric)
+            per_sector = []
+            for sector, (lower, strict, upper) in by_sector.items():
+                clause = [Stock.sector == sector, column.isnot(None)]
+                if lower is not None:
+                    clause.append(column > lower if strict else column >= lower)
+                if upper is not None:
+                    clause.append(column <= upper)
+                per_sector.append(and_(*clause))
+            conditions.append(or_(*per_sector) if per_sector else false())
+        
         if filters.min_market_cap is not None:
             conditions.append(Stock.market_cap >= filters.min_market_cap)
         if filters.max_market_cap is not None:
@@ -119,10 +321,37 @@ class StockService:
         if filters.sectors:
             conditions.append(Stock.sector.in_(filters.sectors))
         
-        if conditions:
-            query = query.filter(and_(*conditions))
-        
-        return query.all()
+        return conditions
+    
+    @staticmethod
+    def _screen_order(filters: ScreeningFilters) -> list:
+        """ORDER BY for the keyset: sort column with NULLs last, then id."""
+        if filters.sort_by == 'id':
+            return [Stock.id.desc() if filters.sort_desc else Stock.id.asc()]
+        column = getattr(Stock, filters.sort_by)
+        ordered = column.desc() if filters.sort_desc else column.asc()
+        return [ordered.nulls_last(), Stock.id.asc()]
+    
+    @staticmethod
+    def _after_cursor(filters: ScreeningFilters, value: Any, row_id: int):
+        """Rows strictly after (value, row_id) in the ``_screen_order`` order."""
+        if filters.sort_by == 'id':
+            return Stock.id < row_id if filters.sort_desc else Stock.id > row_id
+        column = getattr(Stock, filters.sort_by)
+        if value is None:
+            # Already inside the trailing NULL block
+            return and_(column.is_(None), Stock.id > row_id)
+        beyond = column < value if filters.sort_desc else column > value
+        return or_(beyond, and_(column == value, Stock.id > row_id), column.is_(None))
+    
+    def is_watching(self, db: Session, user: User, stock: Stock) -> bool:
+        """Membership test against user_watchlist without loading the list."""
+        return db.query(
+            exists().where(
+                user_watchlist.c.user_id == user.id,
+                user_watchlist.c.stock_id == stock.id,
+            )
+        ).scalar()
     
     def add_to_watchlist(self, db: Session, user: User, symbol: str) -> bool:
         """Add stock to user's watchlist."""
@@ -133,8 +362,8 @@ class StockService:
             if not stock:
                 return False
         
-        if stock not in user.watchlist:
-            user.watchlist.append(stock)
+        if not self.is_watching(db, user, stock):
+            db.execute(user_watchlist.insert().values(user_id=user.id, stock_id=stock.id))
             db.commit()
         
         return True
@@ -142,12 +371,85 @@ class StockService:
     def remove_from_watchlist(self, db: Session, user: User, symbol: str) -> bool:
         """Remove stock from user's watchlist."""
         stock = self.get_stock_by_symbol(db, symbol)
-        if stock and stock in user.watchlist:
-            user.watchlist.remove(stock)
-            db.commit()
-            return True
-        return False
+        if not stock:
+            return False
+        result = db.execute(
+            user_watchlist.delete().where(
+                user_watchlist.c.user_id == user.id,
+                user_watchlist.c.stock_id == stock.id,
+            )
+        )
+        db.commit()
+        return result.rowcount > 0
     
     def get_user_watchlist(self, db: Session, user: User) -> List[Stock]:
-        """Get user's watchlist."""
-        return user.watchlist
\ No newline at end of file
+        """Get user's watchlist with one joined query."""
+        return (
+            db.query(Stock)
+            .join(user_watchlist, user_watchlist.c.stock_id == Stock.id)
+            .filter(user_watchlist.c.user_id == user.id)
+            .order_by(Stock.symbol)
+            .all()
+        )
+    
+    def get_watchlist_symbols(self, db: Session, user: User) -> List[str]:
+        return [
+            symbol for (symbol,) in
+            db.query(Stock.symbol)
+            .join(user_watchlist, user_watchlist.c.stock_id == Stock.id)
+            .filter(user_watchlist.c.user_id == user.id)
+            .order_by(Stock.symbol)
+        ]
+    
+    @staticmethod
+    def parse_quote_price(data: Optional[dict]) -> Optional[float]:
+        """Extract the latest price from an Alpha Vantage GLOBAL_QUOTE payload."""
+        if not data:
+            return None
+        return StockService._safe_float(data.get('Global Quote', {}).get('05. price'))
+    
+    def update_prices(self, db: Session, prices: Dict[str, float]) -> int:
+        """
+        Set current_price for many symbols; returns how many stocks exist.
+        
+        Where UPDATE ... RETURNING is supported, each chunk is one UPDATE
+        with a CASE on symbol that hands listeners the full changed rows;
+        elsewhere an executemany UPDATE is followed by one read. updated_at
+        is left alone: it tracks overview freshness for the refresh
+        scheduler, and a quote does not refresh the fundamentals.
+        """
+        if not prices:
+            return 0
+        
+        table = Stock.__table__
+        returning = [table.c[name] for name in CHANGED_COLUMNS]
+        if db.get_bind().dialect.update_returning:
+            items = list(prices.items())
+            # Each symbol binds three parameters: IN, WHEN and THEN
+            chunk_size = MAX_BIND_PARAMS // 3
+            stored = []
+            for start in range(0, len(items), chunk_size):
+                chunk = dict(items[start:start + chunk_size])
+                stmt = (
+                    table.update()
+                    .where(table.c.symbol.in_(list(chunk)))
+                    .values(current_price=case(chunk, value=table.c.symbol), updated_at=table.c.updated_at)
+                    .returning(*returning)
+                )
+                stored.extend(row._asdict() for row in db.execute(stmt))
+        else:
+            stmt = (
+                table.update()
+                .where(table.c.symbol == bindparam('b_symbol'))
+                .values(current_price=bindparam('b_price'), updated_at=table.c.updated_at)
+            )
+            db.execute(stmt, [
+                {'b_symbol': symbol, 'b_price': price} for symbol, price in prices.items()
+            ])
+            stored = [
+                row._asdict() for row in db.execute(select(*returning).where(table.c.symbol.in_(list(prices))))
+            ]
+        db.commit()
+        self._notify(stored)
+        
+        return len(stored)
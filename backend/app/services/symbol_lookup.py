@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.models import Stock
+from .cache import LRUCacheBackend
+from .stock_service import StockService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls sharing a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait on the same future and get its result or exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class SymbolLookup:
+    """
+    Resolve a symbol to a Stock, fetching unknown ones from Alpha Vantage once.
+
+    Concurrent misses for the same symbol share a single fetch and insert,
+    and symbols Alpha Vantage does not know are remembered for
+    ``unknown_symbol_ttl_seconds`` so mistyped tickers stop spending the
+    rate budget. Transient failures are not cached.
+    """
+
+    def __init__(
+        self,
+        stock_service: StockService,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.stock_service = stock_service
+        self.session_factory = session_factory
+        self._flight = SingleFlight()
+        self._unknown = LRUCacheBackend(settings.unknown_symbol_cache_max_entries)
+
+    def is_unknown(self, symbol: str) -> bool:
+        return self._unknown.get(symbol.upper()) is not None
+
+    def get_or_create(self, db: Session, symbol: str) -> Optional[Stock]:
+        symbol = symbol.upper()
+        stock = self.stock_service.get_stock_by_symbol(db, symbol)
+        if stock or self.is_unknown(symbol):
+            return stock
+
+        stored_symbol = self._flight.do(symbol, lambda: self._materialize(symbol))
+        if not stored_symbol:
+            return None
+        return self.stock_service.get_stock_by_symbol(db, stored_symbol)
+
+    def _materialize(self, symbol: str) -> Optional[str]:
+        """
+        Fetch and store ``symbol``, returning the symbol it was stored under.
+
+        Runs once per burst of concurrent lookups, in its own session so the
+        result does not depend on any one caller's transaction.
+        """
+        overview = self.stock_service.alpha_vantage.get_company_overview(symbol)
+        if overview is None:
+            # Request failed or was rate limited; let the next caller retry
+            return None
+        if not overview.get('Symbol'):
+            # Alpha Vantage answers unknown symbols with an empty object
+            self._unknown.set(symbol, {}, settings.unknown_symbol_ttl_seconds)
+            return None
+
+        db = self.session_factory()
+        try:
+            self.stock_service.upsert_stocks(db, [overview])
+        finally:
+            db.close()
+        return overview['Symbol'].upper()
@@ -0,0 +1,290 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..schemas.schemas import ScreeningFilters
+from .price_history import PriceHistoryStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Trailing bars kept per symbol: a 52-week high needs 252, and a 240-day
+# SMA compared over the last 20 days needs 260.
+WINDOW = 260
+YEAR_BARS = 252
+RSI_PERIOD = 14
+
+# Symbols whose newest bar lags the universe's by more than this are left
+# out of technical screens rather than judged on old prices.
+MAX_LAG = np.timedelta64(10, 'D')
+
+TECHNICAL_FILTERS = (
+    'min_rsi', 'max_rsi', 'min_return', 'max_return', 'min_pct_below_52w_high',
+    'max_pct_below_52w_high', 'min_volatility', 'max_volatility', 'sma_signal',
+)
+
+
+def has_technical_filters(filters: ScreeningFilters) -> bool:
+    return any(getattr(filters, name) is not None for name in TECHNICAL_FILTERS)
+
+
+# Kernels take (closes, highs) blocks of shape (rows, WINDOW), newest bar in
+# the last column and NaN before a symbol's first bar; a window reaching
+# into the padding yields NaN, which fails every comparison.
+
+def sma(closes: np.ndarray, days: int, offset: int = 0) -> np.ndarray:
+    end = WINDOW - offset
+    return closes[:, end - days:end].mean(axis=1)
+
+
+def period_return(closes: np.ndarray, highs: np.ndarray, days: int) -> np.ndarray:
+    return closes[:, -1] / closes[:, -1 - days] - 1
+
+
+def pct_below_52w_high(closes: np.ndarray, highs: np.ndarray) -> np.ndarray:
+    return 1 - closes[:, -1] / highs[:, -YEAR_BARS:].max(axis=1)
+
+
+def volatility(closes: np.ndarray, highs: np.ndarray, days: int) -> np.ndarray:
+    log_returns = np.diff(np.log(closes[:, -days - 1:]), axis=1)
+    return log_returns.std(axis=1, ddof=1) * np.sqrt(YEAR_BARS)
+
+
+def sma_spread(closes: np.ndarray, highs: np.ndarray, fast: int, slow: int, within: int) -> np.ndarray:
+    """Fast minus slow SMA for each of the last ``within + 1`` bars, oldest first."""
+    return np.stack(
+        [sma(closes, fast, offset) - sma(closes, slow, offset) for offset in range(within, -1, -1)],
+        axis=1,
+    )
+
+
+KERNELS: Dict[str, Callable[..., np.ndarray]] = {
+    'return': period_return,
+    'pct_below_52w_high': pct_below_52w_high,
+    'volatility': volatility,
+    'sma_spread': sma_spread,
+}
+
+
+class TechnicalIndicatorEngine:
+    """
+    Vectorized technical indicators over the whole stored universe.
+
+    The last ``WINDOW`` closes and highs of every symbol sit in two
+    ``(symbols, WINDOW)`` matrices, so each indicator is one NumPy kernel
+    over all symbols. Indicator vectors are cached per parameter set, up
+    to ``cache_size`` of them with the least recently used evicted first.
+    When ``PriceHistoryService`` appends bars it calls ``notify()``; on the
+    next screen only those rows are shifted, their RSI state advanced by the
+    new bars, and their entries in each cached vector recomputed.
+    """
+
+    def __init__(self, store: PriceHistoryStore, cache_size: Optional[int] = None):
+        self.store = store
+        self.cache_size = cache_size or settings.technical_indicator_cache_size
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Guards only ``_dirty``, so notify() never waits behind a screen
+        self._dirty_lock = threading.Lock()
+        self._dirty: Set[str] = set()
+
+        self._symbols: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._closes = np.empty((0, WINDOW))
+        self._highs = np.empty((0, WINDOW))
+        self._lengths = np.empty(0, dtype=np.int64)
+        self._last_dates = np.empty(0, dtype='datetime64[D]')
+        # Wilder-smoothed average gain and loss behind RSI
+        self._avg_gain = np.empty(0)
+        self._avg_loss = np.empty(0)
+        self._cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+
+    def notify(self, symbol: str):
+        """Record that ``symbol`` has new bars in the store."""
+        with self._dirty_lock:
+            self._dirty.add(symbol.upper())
+
+    def _take_dirty(self) -> Set[str]:
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def reload(self):
+        """Drop all state so the next screen reloads every symbol."""
+        with self._lock:
+            self._loaded = False
+
+    def _read_window(self, symbol: str) -> Tuple[np.ndarray, np.ndarray, int, np.datetime64]:
+        bars = self.store.read(symbol)
+        length = len(bars['date'])
+        closes = np.full(WINDOW, np.nan)
+        highs = np.full(WINDOW, np.nan)
+        take = min(length, WINDOW)
+        if take:
+            closes[-take:] = bars['close'][-take:]
+            highs[-take:] = bars['high'][-take:]
+        last_date = bars['date'][-1] if length else np.datetime64('NaT')
+        return closes, highs, length, last_date
+
+    def _load(self):
+        # Taken before reading, so bars appended during the load stay dirty
+        self._take_dirty()
+        symbols = self.store.symbols()
+        count = len(symbols)
+        self._symbols = symbols
+        self._rows = {symbol: i for i, symbol in enumerate(symbols)}
+        self._closes = np.full((count, WINDOW), np.nan)
+        self._highs = np.full((count, WINDOW), np.nan)
+        self._lengths = np.zeros(count, dtype=np.int64)
+        self._last_dates = np.full(count, np.datetime64('NaT'), dtype='datetime64[D]')
+        for i, symbol in enumerate(symbols):
+            self._closes[i], self._highs[i], self._lengths[i], self._last_dates[i] = (
+                self._read_window(symbol)
+            )
+        self._avg_gain, self._avg_loss = self._seed_rsi(self._closes)
+        self._cache.clear()
+        self._loaded = True
+        logger.info(f"Technical indicators loaded {count} symbols")
+
+    @staticmethod
+    def _seed_rsi(closes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wilder's average gain/loss for each row, from its first bar in the window.
+
+        Rows are walked together, one column at a time; each row starts
+        smoothing once it has ``RSI_PERIOD`` changes.
+        """
+        changes = np.diff(closes, axis=1)
+        gains = np.clip(changes, 0, None)
+        losses = np.clip(-changes, 0, None)
+        rows = closes.shape[0]
+        avg_gain = np.full(rows, np.nan)
+        avg_loss = np.full(rows, np.nan)
+        first = np.argmax(~np.isnan(closes), axis=1)
+        seed_at = first + RSI_PERIOD
+        for column in range(changes.shape[1]):
+            seeding = seed_at == column + 1
+            if seeding.any():
+                window = slice(column + 1 - RSI_PERIOD, column + 1)
+                avg_gain[seeding] = gains[seeding, window].mean(axis=1)
+                avg_loss[seeding] = losses[seeding, window].mean(axis=1)
+            smoothing = seed_at <= column
+            if smoothing.any():
+                avg_gain[smoothing] = (avg_gain[smoothing] * (RSI_PERIOD - 1) + gains[smoothing, column]) / RSI_PERIOD
+                avg_loss[smoothing] = (avg_loss[smoothing] * (RSI_PERIOD - 1) + losses[smoothing, column]) / RSI_PERIOD
+        return avg_gain, avg_loss
+
+    def _apply_updates(self):
+        """Fold bars appended since the last screen into the affected rows."""
+        dirty = self._take_dirty()
+        if any(symbol not in self._rows for symbol in dirty):
+            # A new symbol changes the matrix shape; rebuild everything once
+            self._load()
+            return
+
+        changed = []
+        for symbol in dirty:
+            row = self._rows[symbol]
+            bars = self.store.read(symbol)
+            length = len(bars['date'])
+            added = length - int(self._lengths[row])
+            if added <= 0:
+                continue
+            changed.append(row)
+            self._lengths[row] = length
+            self._last_dates[row] = bars['date'][-1]
+
+            if added >= WINDOW or np.isnan(self._avg_gain[row]):
+                self._closes[row], self._highs[row], _, _ = self._read_window(symbol)
+                gain, loss = self._seed_rsi(self._closes[row:row + 1])
+                self._avg_gain[row], self._avg_loss[row] = gain[0], loss[0]
+                continue
+
+            new_closes = np.asarray(bars['close'][-added:])
+            changes = np.diff(np.concatenate(([self._closes[row, -1]], new_closes)))
+            for change in changes:
+                self._avg_gain[row] = (self._avg_gain[row] * (RSI_PERIOD - 1) + max(change, 0)) / RSI_PERIOD
+                self._avg_loss[row] = (self._avg_loss[row] * (RSI_PERIOD - 1) + max(-change, 0)) / RSI_PERIOD
+            self._closes[row, :-added] = self._closes[row, added:]
+            self._closes[row, -added:] = new_closes
+            self._highs[row, :-added] = self._highs[row, added:]
+            self._highs[row, -added:] = bars['high'][-added:]
+
+        if changed:
+            rows = np.array(changed)
+            for key, values in self._cache.items():
+                values[rows] = KERNELS[key[0]](self._closes[rows], self._highs[rows], *key[1:])
+
+    def _indicator(self, name: str, *params) -> np.ndarray:
+        key = (name, *params)
+        values = self._cache.get(key)
+        if values is not None:
+            self._cache.move_to_end(key)
+            return values
+        values = self._cache[key] = KERNELS[name](self._closes, self._highs, *params)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return values
+
+    def _rsi(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + self._avg_gain / self._avg_loss)
+        # No losses over the smoothing window means RSI 100
+        return np.where((self._avg_loss == 0) & (self._avg_gain > 0), 100.0, rsi)
+
+    def matching_symbols(self, filters: ScreeningFilters) -> Optional[Set[str]]:
+        """Symbols passing the technical filters, or None if none are set."""
+        if not has_technical_filters(filters):
+            return None
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            elif self._dirty:
+                self._apply_updates()
+            if not self._symbols:
+                return set()
+
+            newest = self._last_dates.max()
+            mask = self._last_dates >= newest - MAX_LAG
+
+            with np.errstate(invalid='ignore'):
+                if filters.min_rsi is not None or filters.max_rsi is not None:
+                    rsi = self._rsi()
+                    if filters.min_rsi is not None:
+                        mask &= rsi >= filters.min_rsi
+                    if filters.max_rsi is not None:
+                        mask &= rsi <= filters.max_rsi
+
+                ranges = (
+                    ('return', (filters.return_days,), filters.min_return, filters.max_return),
+                    ('pct_below_52w_high', (), filters.min_pct_below_52w_high, filters.max_pct_below_52w_high),
+                    ('volatility', (filters.volatility_days,), filters.min_volatility, filters.max_volatility),
+                )
+                for name, params, lower, upper in ranges:
+                    if lower is None and upper is None:
+                        continue
+                    values = self._indicator(name, *params)
+                    if lower is not None:
+                        mask &= values >= lower
+                    if upper is not None:
+                        mask &= values <= upper
+
+                if filters.sma_signal is not None:
+                    spread = self._indicator(
+                        'sma_spread', filters.sma_fast, filters.sma_slow, filters.cross_within_days
+                    )
+                    now, before = spread[:, -1], spread[:, :-1]
+                    if filters.sma_signal == 'above':
+                        mask &= now > 0
+                    elif filters.sma_signal == 'below':
+                        mask &= now < 0
+                    elif filters.sma_signal == 'crossed_above':
+                        mask &= (now > 0) & (before <= 0).any(axis=1)
+                    else:
+                        mask &= (now < 0) & (before >= 0).any(axis=1)
+
+            return {self._symbols[i] for i in np.flatnonzero(mask)}
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from ..models.models import User
 from ..schemas.schemas import UserCreate
-from ..core.security import get_password_hash, verify_password
+from ..core.security import get_password_hash
 from typing import Optional
 
 
@@ -15,8 +15,9 @@ class UserService:
         return db.query(User).filter(User.username == username).first()
     
     @staticmethod
-    def create_user(db: Session, user: UserCreate) -> User:
-        hashed_password = get_password_hash(user.password)
+    def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+        if hashed_password is None:
+            hashed_password = get_password_hash(user.password)
         db_user = User(
             email=user.email,
             username=user.username,
@@ -28,10 +29,8 @@ class UserService:
         return db_user
     
     @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-        user = UserService.get_user_by_username(db, username)
-        if not user:
-            return None
-        if not verify_password(password, user.hashed_password):
-            return None
+    def set_active(db: Session, user: User, is_active: bool) -> User:
+        user.is_active = is_active
+        db.commit()
+        db.refresh(user)
         return user
\ No newline at end of file
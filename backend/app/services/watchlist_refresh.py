@@ -0,0 +1,94 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from ..core.database import SessionLocal
+from .async_alpha_vantage import AsyncAlphaVantageService
+from .stock_service import StockService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WatchlistRefreshProgress:
+    """State of one user's current (or last) watchlist price refresh."""
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = symbols
+        self.running = True
+        self.refreshed = 0
+        self.failed: List[str] = []
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'total': len(self.symbols),
+            'refreshed': self.refreshed,
+            'failed': self.failed,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class WatchlistRefresher:
+    """
+    Background watchlist quote refreshes, one at a time per user.
+
+    Quotes are rate limited, so a large watchlist can take minutes; the
+    request only starts the refresh and its progress is polled. Prices are
+    written through a session of the refresher's own, since the request's
+    session is closed by then. Progress lives in this process only and
+    keeps the last refresh of each user.
+    """
+
+    def __init__(
+        self,
+        alpha_vantage: AsyncAlphaVantageService,
+        stock_service: StockService,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.alpha_vantage = alpha_vantage
+        self.stock_service = stock_service
+        self.session_factory = session_factory
+        self._progress: Dict[int, WatchlistRefreshProgress] = {}
+
+    def status(self, user_id: int) -> Optional[WatchlistRefreshProgress]:
+        return self._progress.get(user_id)
+
+    def start(self, user_id: int, symbols: List[str]) -> Optional[WatchlistRefreshProgress]:
+        """Record a new refresh for ``user_id``, or return None if one is already running."""
+        current = self._progress.get(user_id)
+        if current is not None and current.running:
+            return None
+        progress = WatchlistRefreshProgress(symbols)
+        self._progress[user_id] = progress
+        return progress
+
+    def _write_prices(self, prices: Dict[str, float]) -> int:
+        db = self.session_factory()
+        try:
+            return self.stock_service.update_prices(db, prices)
+        finally:
+            db.close()
+
+    async def run(self, progress: WatchlistRefreshProgress):
+        try:
+            # Quotes are fetched concurrently within the Alpha Vantage rate limit
+            quotes = await self.alpha_vantage.get_global_quotes(progress.symbols)
+            prices = {}
+            for symbol, quote in quotes.items():
+                price = StockService.parse_quote_price(quote)
+                if price is not None:
+                    prices[symbol] = price
+            progress.refreshed = await run_in_threadpool(self._write_prices, prices)
+            progress.failed = [symbol for symbol in progress.symbols if symbol not in prices]
+        except Exception as e:
+            logger.error(f"Watchlist refresh failed: {e}")
+            progress.error = str(e)
+        finally:
+            progress.running = False
+            progress.finished_at = time.time()
@@ -0,0 +1,377 @@
+"""
+Local Alpha Vantage stand-in for offline load testing.
+
+Serves OVERVIEW, INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW,
+TIME_SERIES_DAILY and GLOBAL_QUOTE from recordings under ``--data-dir``,
+and synthesizes deterministic payloads for any symbol not recorded. With
+``--record-from`` a missing payload is fetched from the real API once and
+saved for replay. Latency, HTTP error rate and the per-minute limit that
+answers with a rate-limit ``Note`` are configurable, so ingestion and
+analysis can be driven at full speed or under realistic limits.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.alpha_vantage_stub --port 8765 --latency-ms 150 --jitter-ms 50
+    python -m benchmarks.alpha_vantage_stub --calls-per-minute 5 --error-rate 0.02
+    python -m benchmarks.alpha_vantage_stub --data-dir recordings \\
+        --record-from https://www.alphavantage.co/query --api-key YOUR_KEY
+
+Point the app at it with ``ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:8765/query``
+and raise ``ALPHA_VANTAGE_CALLS_PER_MINUTE`` to match the stub's limit.
+Counters are served as JSON from ``/stats``.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zlib
+from collections import Counter, deque
+from datetime import date, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.screening_indexes import SECTORS
+
+FUNCTIONS = (
+    'OVERVIEW', 'INCOME_STATEMENT', 'BALANCE_SHEET', 'CASH_FLOW', 'TIME_SERIES_DAILY', 'GLOBAL_QUOTE',
+)
+COMPACT_DAYS = 100
+
+# Synthetic price history starts here whatever the as-of date, so a symbol's
+# past bars never change as days are added.
+HISTORY_START = date(2010, 1, 4)
+
+RATE_LIMIT_NOTE = (
+    "Thank you for using Alpha Vantage! Our standard API call frequency is "
+    "{limit} calls per minute and 500 calls per day."
+)
+INVALID_CALL = (
+    "Invalid API call. Please retry or visit the documentation "
+    "(https://www.alphavantage.co/documentation/) for {function}."
+)
+
+
+def _rng(symbol: str, salt: str = '') -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32(f'{symbol}:{salt}'.encode()))
+
+
+def _fmt(value: float, digits: int = 4) -> str:
+    return f'{value:.{digits}f}'
+
+
+@lru_cache(maxsize=1024)
+def _price_series(symbol: str, as_of: date) -> Tuple[Tuple[str, ...], np.ndarray]:
+    """Weekday dates up to ``as_of`` and their OHLCV bars, oldest first."""
+    dates = np.arange(np.datetime64(HISTORY_START), np.datetime64(as_of) + 1, dtype='datetime64[D]')
+    dates = dates[np.is_busday(dates)]
+    rng = _rng(symbol, 'prices')
+    count = len(dates)
+    start = rng.lognormal(3.5, 0.8)
+    drift, sigma = rng.normal(0.0003, 0.0002), rng.uniform(0.01, 0.03)
+    close = start * np.exp(np.cumsum(rng.normal(drift, sigma, count)))
+    open_ = close * np.exp(rng.normal(0, sigma / 2, count))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, sigma, count))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, sigma, count))
+    volume = rng.lognormal(14, 1, count).astype(np.int64)
+    bars = np.stack([open_, high, low, close, volume], axis=1)
+    return tuple(str(d) for d in dates), bars
+
+
+def synthesize(function: str, symbol: str, params: Dict[str, str], as_of: date) -> Dict[str, Any]:
+    """A deterministic payload for ``symbol`` shaped like the real API's."""
+    if function == 'OVERVIEW':
+        rng = _rng(symbol, 'overview')
+        maybe = lambda value, null_fraction, digits=4: 'None' if rng.random() < null_fraction else _fmt(value, digits)
+        return {
+            'Symbol': symbol,
+            'AssetType': 'Common Stock',
+            'Name': f'{symbol} Synthetic Inc',
+            'Exchange': 'NYSE',
+            'Currency': 'USD',
+            'Sector': str(rng.choice(SECTORS)).upper(),
+            'Industry': 'SYNTHETIC',
+            'FiscalYearEnd': 'December',
+            'MarketCapitalization': str(int(rng.lognormal(21.5, 2.0))),
+            'PERatio': maybe(rng.lognormal(2.9, 0.6), 0.15, 2),
+            'PriceToBookRatio': maybe(rng.lognormal(0.9, 0.8), 0.10, 2),
+            'DividendYield': maybe(rng.exponential(0.02), 0.35),
+            'DebtToEquityRatio': maybe(rng.lognormal(-0.3, 0.9), 0.10, 3),
+            'ReturnOnEquityTTM': maybe(rng.normal(0.12, 0.15), 0.08, 3),
+        }
+
+    if function in ('INCOME_STATEMENT', 'BALANCE_SHEET', 'CASH_FLOW'):
+        # Same draws for all three statements, so their periods agree
+        rng = _rng(symbol, 'statements')
+        revenue = rng.lognormal(21, 1.5)
+
+        def report(period_end: date, scale: float) -> Dict[str, str]:
+            base = revenue * scale * rng.lognormal(0, 0.05)
+            fields = {
+                'INCOME_STATEMENT': {
+                    'totalRevenue': base, 'grossProfit': base * 0.4, 'netIncome': base * rng.normal(0.1, 0.05),
+                },
+                'BALANCE_SHEET': {
+                    'totalAssets': base * 2.5, 'totalLiabilities': base * 1.4,
+                    'shortLongTermDebtTotal': base * 0.6, 'longTermDebt': base * 0.5,
+                },
+                'CASH_FLOW': {
+                    'operatingCashflow': base * 0.15, 'capitalExpenditures': base * 0.05,
+                },
+            }[function]
+            return dict(
+                fiscalDateEnding=str(period_end), reportedCurrency='USD',
+                **{key: str(int(value)) for key, value in fields.items()},
+            )
+
+        year = as_of.year - 1
+        quarter_ends = []
+        end = date(as_of.year, ((as_of.month - 1) // 3) * 3 + 1, 1) - timedelta(days=1)
+        for _ in range(20):
+            quarter_ends.append(end)
+            end = date(end.year, ((end.month - 1) // 3) * 3 + 1, 1) - timedelta(days=1)
+        return {
+            'symbol': symbol,
+            'annualReports': [report(date(year - i, 12, 31), 1.0) for i in range(5)],
+            'quarterlyReports': [report(end, 0.25) for end in quarter_ends],
+        }
+
+    dates, bars = _price_series(symbol, as_of)
+    if function == 'GLOBAL_QUOTE':
+        (open_, high, low, close, volume), previous = bars[-1], bars[-2][3]
+        return {'Global Quote': {
+            '01. symbol': symbol, '02. open': _fmt(open_), '03. high': _fmt(high), '04. low': _fmt(low),
+            '05. price': _fmt(close), '06. volume': str(int(volume)), '07. latest trading day': dates[-1],
+            '08. previous close': _fmt(previous), '09. change': _fmt(close - previous),
+            '10. change percent': f'{(close / previous - 1) * 100:.4f}%',
+        }}
+
+    compact = params.get('outputsize', 'compact') != 'full'
+    take = COMPACT_DAYS if compact else len(dates)
+    series = {}
+    for day, (open_, high, low, close, volume) in zip(reversed(dates[-take:]), bars[::-1][:take]):
+        series[day] = {
+            '1. open': _fmt(open_), '2. high': _fmt(high), '3. low': _fmt(low),
+            '4. close': _fmt(close), '5. volume': str(int(volume)),
+        }
+    return {
+        'Meta Data': {
+            '1. Information': 'Daily Prices (open, high, low, close) and Volumes',
+            '2. Symbol': symbol,
+            '3. Last Refreshed': dates[-1],
+            '4. Output Size': 'Compact' if compact else 'Full size',
+            '5. Time Zone': 'US/Eastern',
+        },
+        'Time Series (Daily)': series,
+    }
+
+
+class AlphaVantageStub:
+    """Answers Alpha Vantage query parameters; shared by all handler threads."""
+
+    def __init__(
+        self,
+        data_dir: Optional[str] = None,
+        record_from: Optional[str] = None,
+        api_key: Optional[str] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        calls_per_minute: Optional[int] = None,
+        unknown_rate: float = 0.0,
+        as_of: Optional[date] = None,
+        seed: int = 0,
+    ):
+        self.data_dir = data_dir
+        self.record_from = record_from
+        self.api_key = api_key
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.calls_per_minute = calls_per_minute
+        self.unknown_rate = unknown_rate
+        self.as_of = as_of
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._calls: deque = deque()
+        self.counters: Counter = Counter()
+
+    def _count(self, *names: str):
+        with self._lock:
+            self.counters.update(names)
+
+    def _rate_limited(self) -> bool:
+        """Sliding one-minute window over accepted calls."""
+        if not self.calls_per_minute:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.calls_per_minute:
+                return True
+            self._calls.append(now)
+            return False
+
+    def _path(self, function: str, symbol: str, outputsize: Optional[str] = None) -> str:
+        name = f'{symbol}.{outputsize}.json' if outputsize else f'{symbol}.json'
+        return os.path.join(self.data_dir, function, name)
+
+    def _replay(self, function: str, symbol: str, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if not self.data_dir:
+            return None
+        if function != 'TIME_SERIES_DAILY':
+            candidates = [self._path(function, symbol)]
+        elif params.get('outputsize') == 'full':
+            candidates = [self._path(function, symbol, 'full')]
+        else:
+            candidates = [self._path(function, symbol, 'compact'), self._path(function, symbol, 'full')]
+        for path in candidates:
+            if os.path.exists(path):
+                with open(path) as f:
+                    payload = json.load(f)
+                if function == 'TIME_SERIES_DAILY' and path.endswith('.full.json') and 'Time Series (Daily)' in payload:
+                    # A full recording answers compact requests with its newest days
+                    days = sorted(payload['Time Series (Daily)'], reverse=True)[:COMPACT_DAYS]
+                    payload['Time Series (Daily)'] = {day: payload['Time Series (Daily)'][day] for day in days}
+                return payload
+        return None
+
+    def _record(self, function: str, symbol: str, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if not (self.record_from and self.data_dir):
+            return None
+        query = urllib.parse.urlencode(dict(params, apikey=self.api_key or 'demo'))
+        with urllib.request.urlopen(f'{self.record_from}?{query}', timeout=30) as response:
+            payload = json.load(response)
+        if not payload or 'Note' in payload or 'Error Message' in payload or 'Information' in payload:
+            return payload
+        outputsize = params.get('outputsize', 'compact') if function == 'TIME_SERIES_DAILY' else None
+        path = self._path(function, symbol, outputsize)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(payload, f)
+        self._count('recorded')
+        return payload
+
+    def _is_unknown(self, symbol: str) -> bool:
+        return zlib.crc32(f'{symbol}:unknown'.encode()) % 10000 < self.unknown_rate * 10000
+
+    def respond(self, params: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """(HTTP status, JSON body) for one request's query parameters."""
+        function = params.get('function', '')
+        symbol = params.get('symbol', '').upper()
+        self._count('requests', f'function:{function}')
+
+        delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self._rate_limited():
+            self._count('notes')
+            return 200, {'Note': RATE_LIMIT_NOTE.format(limit=self.calls_per_minute)}
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self._count('errors')
+            return 500, {'error': 'injected failure'}
+        if function not in FUNCTIONS or not symbol:
+            self._count('invalid')
+            return 200, {'Error Message': INVALID_CALL.format(function=function or 'this API function')}
+
+        payload = self._replay(function, symbol, params)
+        if payload is not None:
+            self._count('replayed')
+            return 200, payload
+        payload = self._record(function, symbol, params)
+        if payload is not None:
+            return 200, payload
+        if self._is_unknown(symbol):
+            self._count('unknown')
+            if function in ('OVERVIEW', 'GLOBAL_QUOTE'):
+                return 200, {} if function == 'OVERVIEW' else {'Global Quote': {}}
+            return 200, {'Error Message': INVALID_CALL.format(function=function)}
+        self._count('synthesized')
+        return 200, synthesize(function, symbol, params, self.as_of or date.today())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
+
+
+def make_server(stub: AlphaVantageStub, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path == '/stats':
+                status, body = 200, stub.stats()
+            else:
+                status, body = stub.respond(dict(urllib.parse.parse_qsl(url.query)))
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(stub: AlphaVantageStub, host: str = '127.0.0.1', port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve ``stub`` from a background thread; returns the server and its query URL."""
+    server = make_server(stub, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/query'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data-dir', help="recorded payloads, as <FUNCTION>/<SYMBOL>.json")
+    parser.add_argument('--record-from', help="real API URL to fetch and save payloads missing from --data-dir")
+    parser.add_argument('--api-key', help="key used with --record-from")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls answered with HTTP 500")
+    parser.add_argument('--calls-per-minute', type=int, help="answer calls past this limit with a rate-limit Note")
+    parser.add_argument('--unknown-rate', type=float, default=0.0, help="fraction of symbols treated as unlisted")
+    parser.add_argument('--as-of', type=date.fromisoformat, help="last trading day of synthesized prices")
+    parser.add_argument('--seed', type=int, default=0, help="seed for latency jitter and injected errors")
+    args = parser.parse_args()
+
+    if args.record_from and not args.data_dir:
+        parser.error("--record-from needs --data-dir")
+    stub = AlphaVantageStub(
+        data_dir=args.data_dir,
+        record_from=args.record_from,
+        api_key=args.api_key,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        calls_per_minute=args.calls_per_minute,
+        unknown_rate=args.unknown_rate,
+        as_of=args.as_of,
+        seed=args.seed,
+    )
+    server = make_server(stub, args.host, args.port)
+    print(f"Alpha Vantage stub on http://{args.host}:{args.port}/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(stub.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Login throughput benchmark for bcrypt cost factors.
+
+For each cost factor, fires bursts of concurrent password verifications
+through ``PasswordHasher`` and reports logins per second, p50/p99 login
+latency and the worst event-loop stall seen during the burst. The stall
+column shows whether other requests would still be served while logins
+are hashing.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.password_hashing
+    python -m benchmarks.password_hashing --rounds 10 11 12 13 --workers 4 --logins 64
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from passlib.context import CryptContext
+
+from app.services.password_hasher import PasswordHasher
+
+PASSWORD = 'correct horse battery staple'
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay between a scheduled wake-up and the loop running it."""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+
+async def burst(hasher: PasswordHasher, hashed: str, logins: int) -> Dict[str, Any]:
+    async def login() -> float:
+        start = time.perf_counter()
+        assert await hasher.verify(PASSWORD, hashed)
+        return time.perf_counter() - start
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    max_lag = await lag_task
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'logins_per_second': logins / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'max_loop_lag_ms': max_lag * 1000,
+    }
+
+
+async def run(rounds: List[int], workers: int, logins: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {'workers': workers, 'logins': logins, 'rounds': {}}
+    for cost in rounds:
+        context = CryptContext(schemes=['bcrypt'], bcrypt__rounds=cost)
+        hasher = PasswordHasher(context, max_workers=workers, max_pending=logins)
+        try:
+            start = time.perf_counter()
+            hashed = await hasher.hash(PASSWORD)
+            entry = {'hash_ms': (time.perf_counter() - start) * 1000}
+            entry.update(await burst(hasher, hashed, logins))
+            entry['hasher'] = hasher.stats()
+        finally:
+            hasher.shutdown()
+        results['rounds'][cost] = entry
+    return results
+
+
+def report(results: Dict[str, Any]):
+    print(f"\n{results['logins']} concurrent logins, {results['workers']} hashing workers")
+    print(f"{'rounds':<8}{'hash ms':>10}{'logins/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'loop lag ms':>13}")
+    for cost, entry in results['rounds'].items():
+        print(
+            f"{cost:<8}{entry['hash_ms']:>10.1f}{entry['logins_per_second']:>10.1f}"
+            f"{entry['p50_ms']:>10.1f}{entry['p99_ms']:>10.1f}{entry['max_loop_lag_ms']:>13.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.rounds, args.workers, args.logins))
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
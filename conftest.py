@@ -0,0 +1,54 @@
+"""
+Shared fixtures for the backend tests: an in-memory database seeded from
+the test module's ``STOCKS`` rows, and a StockService with a sector rank
+index on each screening path.
+
+Fixtures import the app lazily, so test files that skip for missing
+dependencies still collect.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+# The app binds its engine at import; these tests use their own
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+
+@pytest.fixture
+def session_factory():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.models.models import Base
+
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(request, session_factory):
+    from app.models.models import Stock
+
+    session = session_factory()
+    session.add_all(
+        Stock(**dict({'name': row['symbol']}, **row)) for row in getattr(request.module, 'STOCKS', ())
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture(params=['sql', 'engine'])
+def service(request):
+    from app.services.screening_engine import ColumnarScreeningEngine
+    from app.services.sector_ranks import SectorRankIndex
+    from app.services.stock_service import StockService
+
+    engine = ColumnarScreeningEngine() if request.param == 'engine' else None
+    return StockService(None, engine, rank_index=SectorRankIndex())
@@ -29,6 +29,7 @@ import { useNavigate } from 'react-router-dom';
 const ScreeningPage: React.FC = () => {
   const [filters, setFilters] = useState<ScreeningFilters>({});
   const [results, setResults] = useState<Stock[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const navigate = useNavigate();
 
@@ -42,8 +43,9 @@ const ScreeningPage: React.FC = () => {
   const handleScreen = async () => {
     setLoading(true);
     try {
-      const stocks = await stockAPI.screenStocks(filters);
-      setResults(stocks);
+      const page = await stockAPI.screenStocks(filters);
+      setResults(page.stocks);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Screening failed:', error);
     } finally {
@@ -51,6 +53,20 @@ const ScreeningPage: React.FC = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoading(true);
+    try {
+      const page = await stockAPI.screenStocks({ ...filters, cursor: nextCursor });
+      setResults(prev => [...prev, ...page.stocks]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Loading more results failed:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleAddToWatchlist = async (symbol: string) => {
     try {
       await stockAPI.addToWatchlist(symbol);
@@ -177,7 +193,7 @@ const ScreeningPage: React.FC = () => {
         {results.length > 0 && (
           <Paper>
             <Typography variant="h6" sx={{ p: 2 }}>
-              Results ({results.length} stocks)
+              Results ({results.length}{nextCursor ? '+' : ''} stocks)
             </Typography>
             
             <TableContainer>
@@ -233,6 +249,14 @@ const ScreeningPage: React.FC = () => {
                 </TableBody>
               </Table>
             </TableContainer>
+
+            {nextCursor && (
+              <Box sx={{ p: 2, textAlign: 'center' }}>
+                <Button variant="outlined" onClick={handleLoadMore} disabled={loading}>
+                  {loading ? 'Loading...' : 'Load More'}
+                </Button>
+              </Box>
+            )}
           </Paper>
         )}
       </Box>
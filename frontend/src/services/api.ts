@@ -1,5 +1,8 @@
 import axios from 'axios';
-import { LoginCredentials, RegisterCredentials, AuthToken, User } from '../types';
+import {
+  LoginCredentials, RegisterCredentials, AuthToken, User, ScreeningFilters, SavedScreen, SavedScreenView,
+  Alert, AlertCreate, Stock,
+} from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api/v1';
 
@@ -34,9 +37,10 @@ export const stockAPI = {
     return response.data;
   },
 
-  screenStocks: async (filters: any) => {
+  screenStocks: async (filters: any): Promise<{ stocks: Stock[]; nextCursor: string | null }> => {
     const response = await api.post('/stocks/screen', filters);
-    return response.data;
+    // Set when more rows match than fit in one page
+    return { stocks: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
   },
 
   getWatchlist: async () => {
@@ -54,6 +58,11 @@ export const stockAPI = {
     return response.data;
   },
 
+  refreshWatchlist: async () => {
+    const response = await api.post('/stocks/watchlist/refresh');
+    return response.data;
+  },
+
   getAnalysis: async (symbol: string) => {
     const response = await api.get(`/stocks/${symbol}/analysis`);
     return response.data;
@@ -65,4 +74,43 @@ export const stockAPI = {
   },
 };
 
+export const screenAPI = {
+  createScreen: async (name: string, filters: ScreeningFilters): Promise<SavedScreen> => {
+    const response = await api.post('/screens', { name, filters });
+    return response.data;
+  },
+
+  listScreens: async (): Promise<SavedScreen[]> => {
+    const response = await api.get('/screens');
+    return response.data;
+  },
+
+  viewScreen: async (id: number): Promise<SavedScreenView> => {
+    const response = await api.get(`/screens/${id}`);
+    return response.data;
+  },
+
+  deleteScreen: async (id: number) => {
+    const response = await api.delete(`/screens/${id}`);
+    return response.data;
+  },
+};
+
+export const alertAPI = {
+  createAlert: async (alert: AlertCreate): Promise<Alert> => {
+    const response = await api.post('/alerts', alert);
+    return response.data;
+  },
+
+  listAlerts: async (): Promise<Alert[]> => {
+    const response = await api.get('/alerts');
+    return response.data;
+  },
+
+  deleteAlert: async (id: number) => {
+    const response = await api.delete(`/alerts/${id}`);
+    return response.data;
+  },
+};
+
 export default api;
\ No newline at end of file
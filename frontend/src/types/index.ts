@@ -37,6 +37,62 @@ export interface ScreeningFilters {
   min_roe?: number;
   max_roe?: number;
   sectors?: string[];
+  min_rsi?: number;
+  max_rsi?: number;
+  return_days?: number;
+  min_return?: number;
+  max_return?: number;
+  min_pct_below_52w_high?: number;
+  max_pct_below_52w_high?: number;
+  volatility_days?: number;
+  min_volatility?: number;
+  max_volatility?: number;
+  sma_fast?: number;
+  sma_slow?: number;
+  sma_signal?: 'above' | 'below' | 'crossed_above' | 'crossed_below';
+  cross_within_days?: number;
+  min_sector_percentile?: Record<string, number>;
+  max_sector_percentile?: Record<string, number>;
+  max_sector_rank?: Record<string, number>;
+  expression?: string;
+  sort_by?: string;
+  sort_desc?: boolean;
+  limit?: number;
+  cursor?: string;
+  fields?: string[];
+}
+
+export interface SavedScreen {
+  id: number;
+  name: string;
+  filters: ScreeningFilters;
+  created_at: string;
+  last_viewed_at?: string;
+}
+
+export interface SavedScreenView {
+  screen: SavedScreen;
+  stocks: Stock[];
+  entered: string[];
+  left: string[];
+}
+
+export type AlertMetric =
+  | 'current_price' | 'market_cap' | 'pe_ratio' | 'pb_ratio' | 'dividend_yield' | 'debt_to_equity' | 'roe';
+
+export interface AlertCreate {
+  symbol: string;
+  metric: AlertMetric;
+  direction: 'above' | 'below';
+  threshold: number;
+}
+
+export interface Alert extends AlertCreate {
+  id: number;
+  active: boolean;
+  created_at: string;
+  triggered_at?: string;
+  triggered_value?: number;
 }
 
 export interface AIAnalysis {
@@ -0,0 +1,123 @@
+"""
+Threshold alerts: the bisected slice of crossed thresholds, firing once on
+the crossing, and the index needing ``load()`` before the first write.
+"""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app.models.models import Alert, Stock, User  # noqa: E402
+from app.services.alerts import AlertNotifier, AlertService  # noqa: E402
+
+THRESHOLDS = [(5.0, 1), (10.0, 2), (10.0, 3), (15.0, 4)]
+
+
+class RecordingNotifier(AlertNotifier):
+    def __init__(self):
+        self.events = []
+
+    def notify(self, events):
+        self.events.extend(events)
+
+
+def crossed(direction, old, new):
+    return [alert_id for _, alert_id in THRESHOLDS[AlertService._crossed(THRESHOLDS, direction, old, new)]]
+
+
+@pytest.mark.parametrize('old,new,expected', [
+    (4.0, 5.0, []),
+    (5.0, 10.0, [1]),
+    (5.0, 10.5, [1, 2, 3]),
+    (10.0, 15.5, [2, 3, 4]),
+    (0.0, 100.0, [1, 2, 3, 4]),
+    (12.0, 8.0, []),
+])
+def test_above_crosses_thresholds_from_at_or_below_to_above(old, new, expected):
+    assert crossed('above', old, new) == expected
+
+
+@pytest.mark.parametrize('old,new,expected', [
+    (10.0, 9.0, [2, 3]),
+    (10.5, 10.0, []),
+    (15.0, 4.0, [1, 2, 3, 4]),
+    (5.0, 4.99, [1]),
+    (8.0, 12.0, []),
+])
+def test_below_crosses_thresholds_from_at_or_above_to_below(old, new, expected):
+    assert crossed('below', old, new) == expected
+
+
+@pytest.fixture(autouse=True)
+def seed(session_factory):
+    with session_factory() as db:
+        db.add_all([
+            User(id=1, username='u', email='u@example.com', hashed_password='x'),
+            Stock(id=1, symbol='AAA', name='A', current_price=10.0),
+        ])
+        db.commit()
+
+
+@pytest.fixture
+def service(session_factory):
+    service = AlertService(RecordingNotifier(), session_factory)
+    service.load()
+    return service
+
+
+def add_alert(session_factory, service, direction, threshold):
+    with session_factory() as db:
+        user, stock = db.get(User, 1), db.get(Stock, 1)
+        return service.create_alert(db, user, stock, 'current_price', direction, threshold).id
+
+
+def test_alert_fires_once_on_the_crossing(session_factory, service):
+    alert_id = add_alert(session_factory, service, 'above', 12.0)
+
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 11.0}])
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 13.0}])
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 11.0}])
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 14.0}])
+
+    assert [event['alert_id'] for event in service.notifier.events] == [alert_id]
+    assert service.notifier.events[0]['value'] == 13.0
+    with session_factory() as db:
+        alert = db.get(Alert, alert_id)
+        assert not alert.active
+        assert alert.triggered_value == 13.0
+
+
+def test_threshold_already_passed_must_be_crossed_again(session_factory, service):
+    alert_id = add_alert(session_factory, service, 'above', 8.0)
+
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 12.0}])
+    assert service.notifier.events == []
+
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 7.0}])
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 9.0}])
+    assert [event['alert_id'] for event in service.notifier.events] == [alert_id]
+
+
+def test_alert_deactivated_elsewhere_is_not_notified(session_factory, service):
+    add_alert(session_factory, service, 'below', 5.0)
+    with session_factory() as db:
+        db.query(Alert).update({Alert.active: False})
+        db.commit()
+
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 4.0}])
+
+    assert service.notifier.events == []
+
+
+def test_first_write_after_load_is_seen(session_factory):
+    with session_factory() as db:
+        db.add(Alert(user_id=1, stock_id=1, metric='current_price', direction='above', threshold=12.0))
+        db.commit()
+    service = AlertService(RecordingNotifier(), session_factory)
+
+    # Written before the index exists: ignored rather than misread
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 11.0}])
+    service.load()
+    service.on_stocks_changed([{'symbol': 'AAA', 'current_price': 13.0}])
+
+    assert len(service.notifier.events) == 1
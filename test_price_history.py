@@ -0,0 +1,75 @@
+"""
+The columnar price history store: appends keep dates sorted and unique,
+range reads slice by date, a crash mid-append is truncated away by the
+next append, and symbols cannot name paths outside the store.
+"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.price_history import COLUMNS, InvalidSymbolError, PriceHistoryStore  # noqa: E402
+
+
+def bars(days, start=1.0):
+    closes = np.arange(len(days), dtype=np.float64) + start
+    return {
+        'date': np.array(days, dtype='datetime64[D]'),
+        **{column: closes.astype(dtype) for column, dtype in COLUMNS},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceHistoryStore(str(tmp_path))
+
+
+def test_append_sorts_and_drops_known_and_repeated_days(store):
+    assert store.append('AAA', bars(['2024-01-03', '2024-01-02', '2024-01-02'], start=10)) == 2
+    assert store.append('AAA', bars(['2024-01-03', '2024-01-04'], start=20)) == 1
+
+    stored = store.read('AAA')
+    assert stored['date'].astype(str).tolist() == ['2024-01-02', '2024-01-03', '2024-01-04']
+    assert stored['close'].tolist() == [11.0, 10.0, 21.0]
+
+
+def test_read_slices_by_inclusive_date_range(store):
+    store.append('AAA', bars(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04']))
+
+    stored = store.read('AAA', np.datetime64('2024-01-02').item(), np.datetime64('2024-01-03').item())
+    assert stored['close'].tolist() == [2.0, 3.0]
+    assert store.read('BBB')['date'].size == 0
+
+
+def test_value_columns_written_without_their_dates_are_truncated(store):
+    store.append('AAA', bars(['2024-01-01', '2024-01-02']))
+    # A crash after the value columns but before the dates
+    for column, dtype in COLUMNS:
+        with open(store._path('AAA', column), 'ab') as f:
+            np.array([99], dtype=dtype).tofile(f)
+
+    assert store.length('AAA') == 2
+    store.append('AAA', bars(['2024-01-03'], start=3))
+
+    stored = store.read('AAA')
+    assert stored['close'].tolist() == [1.0, 2.0, 3.0]
+    assert os.path.getsize(store._path('AAA', 'close')) == 3 * 8
+
+
+def test_torn_date_record_is_truncated(store):
+    store.append('AAA', bars(['2024-01-01', '2024-01-02']))
+    with open(store._path('AAA', 'date'), 'ab') as f:
+        f.write(b'\x01\x02\x03')
+
+    assert store.length('AAA') == 2
+    store.append('AAA', bars(['2024-01-03'], start=3))
+
+    assert store.read('AAA')['date'].astype(str).tolist() == ['2024-01-01', '2024-01-02', '2024-01-03']
+
+
+@pytest.mark.parametrize('symbol', ['..', '../../x', 'A/B', '', 'TOOLONGSYMBOL'])
+def test_symbols_that_are_not_tickers_are_rejected(store, symbol):
+    with pytest.raises(InvalidSymbolError):
+        store.append(symbol, bars(['2024-01-01']))
@@ -0,0 +1,63 @@
+"""
+The shared Alpha Vantage token bucket: tokens refill over time, ``reserve``
+keeps headroom for interactive calls, and a ``deadline`` that cannot be met
+gives up without spending a token.
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.services.alpha_vantage import AlphaVantageService, RateLimiter  # noqa: E402
+
+
+def test_acquire_spends_one_token_per_call():
+    limiter = RateLimiter(3)
+
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.tokens < 1
+
+
+def test_expired_deadline_takes_no_token():
+    limiter = RateLimiter(5)
+
+    assert limiter.acquire(deadline=time.monotonic() - 100) is None
+    assert limiter.tokens == 5
+
+
+def test_deadline_before_the_next_token_gives_up_without_sleeping():
+    limiter = RateLimiter(1, period=60)
+    limiter.acquire()
+
+    start = time.monotonic()
+    assert limiter.acquire(deadline=start + 1) is None
+    assert time.monotonic() - start < 0.5
+
+
+def test_short_wait_within_the_deadline_sleeps_and_takes_a_token():
+    limiter = RateLimiter(10, period=0.5)
+    for _ in range(10):
+        limiter.acquire()
+
+    slept = limiter.acquire(deadline=time.monotonic() + 5)
+    assert slept is not None and slept > 0
+
+
+def test_reserve_leaves_headroom_for_other_callers():
+    limiter = RateLimiter(5, period=60)
+
+    assert limiter._take(reserve=3) == 0.0
+    assert limiter._take(reserve=3) == 0.0
+    # Three tokens left, and the reserve keeps them for callers without one
+    assert limiter._take(reserve=3) > 0
+    assert limiter._take(reserve=0) == 0.0
+
+
+def test_request_past_its_deadline_is_not_sent(monkeypatch):
+    service = AlphaVantageService(rate_limiter=RateLimiter(5))
+    monkeypatch.setattr('app.services.alpha_vantage.requests.get', pytest.fail)
+
+    assert service._make_request({'function': 'OVERVIEW', 'symbol': 'AAA'}, deadline=time.monotonic() - 1) is None
+    assert service.rate_limiter.tokens == 5
@@ -0,0 +1,99 @@
+"""
+Saved screens: results are materialized on save and kept current by
+re-testing only written rows, and a view reports what entered and left
+since the previous one.
+"""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("numpy")
+
+from app.models.models import User  # noqa: E402
+from app.schemas.schemas import ScreeningFilters  # noqa: E402
+from app.services.saved_screens import SavedScreenService  # noqa: E402
+from app.services.screen_expressions import ExpressionError  # noqa: E402
+
+STOCKS = [
+    dict(id=1, symbol='AAA', sector='Tech', roe=0.20, current_price=10.0),
+    dict(id=2, symbol='BBB', sector='Tech', roe=0.10, current_price=20.0),
+    dict(id=3, symbol='CCC', sector='Energy', roe=0.30, current_price=30.0),
+]
+
+
+@pytest.fixture
+def user(db):
+    user = User(username='u', email='u@example.com', hashed_password='x')
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def screens(service, session_factory):
+    screens = SavedScreenService(service, session_factory)
+    service.listeners.append(screens.on_stocks_changed)
+    return screens
+
+
+def write(service, db, symbol, **values):
+    row = {'symbol': symbol, 'name': None, 'sector': None, 'roe': None}
+    service.upsert_stock_rows(db, [dict(row, **values)])
+
+
+def view(screens, db, screen):
+    result = screens.view_screen(db, screen)
+    return [stock.symbol for stock in result['stocks']], result['entered'], result['left']
+
+
+def test_saved_screen_is_materialized_and_acknowledged(screens, db, user):
+    screen = screens.create_screen(db, user, 'quality', ScreeningFilters(min_roe=0.15))
+
+    assert view(screens, db, screen) == (['AAA', 'CCC'], [], [])
+
+
+def test_writes_update_members_and_views_report_the_difference(screens, service, db, user):
+    screen = screens.create_screen(db, user, 'quality', ScreeningFilters(min_roe=0.15))
+
+    write(service, db, 'BBB', roe=0.25)
+    write(service, db, 'CCC', roe=0.05)
+
+    assert view(screens, db, screen) == (['AAA', 'BBB'], ['BBB'], ['CCC'])
+    assert view(screens, db, screen) == (['AAA', 'BBB'], [], [])
+
+
+def test_member_that_enters_and_leaves_between_views_is_not_reported(screens, service, db, user):
+    screen = screens.create_screen(db, user, 'quality', ScreeningFilters(min_roe=0.15))
+
+    write(service, db, 'BBB', roe=0.25)
+    write(service, db, 'BBB', roe=0.05)
+
+    assert view(screens, db, screen) == (['AAA', 'CCC'], [], [])
+
+
+def test_price_updates_maintain_expression_screens(screens, service, db, user):
+    screen = screens.create_screen(db, user, 'pricey', ScreeningFilters(expression='current_price > 25'))
+
+    service.update_prices(db, {'AAA': 40.0, 'CCC': 5.0})
+
+    assert view(screens, db, screen) == (['AAA'], ['AAA'], ['CCC'])
+
+
+def test_invalid_expression_is_rejected_without_breaking_other_screens(screens, service, db, user):
+    screen = screens.create_screen(db, user, 'quality', ScreeningFilters(min_roe=0.15))
+    with pytest.raises(ExpressionError):
+        screens.create_screen(db, user, 'broken', ScreeningFilters(expression='roe >'))
+
+    write(service, db, 'BBB', roe=0.5)
+
+    assert view(screens, db, screen) == (['AAA', 'BBB', 'CCC'], ['BBB'], [])
+
+
+def test_rank_screens_are_rerun_on_view(screens, service, db, user):
+    screen = screens.create_screen(db, user, 'leaders', ScreeningFilters(max_sector_rank={'roe': 1}))
+    assert view(screens, db, screen)[0] == ['AAA', 'CCC']
+
+    # Changes another stock's rank without touching AAA's row
+    write(service, db, 'BBB', roe=0.25)
+
+    assert view(screens, db, screen) == (['BBB', 'CCC'], ['BBB'], ['AAA'])
@@ -0,0 +1,105 @@
+"""
+Screen expressions: the SQL path, the columnar engine and single-row
+evaluation agree on NULL, ``not``, ``in`` and division by zero, and bad
+expressions are rejected with ExpressionError.
+"""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("numpy")
+
+from app.schemas.schemas import ScreeningFilters  # noqa: E402
+from app.services.screen_expressions import ExpressionError, compile_expression  # noqa: E402
+from app.services.stock_service import CHANGED_COLUMNS  # noqa: E402
+
+STOCKS = [
+    dict(id=1, symbol='AAA', sector='Tech', pe_ratio=10.0, pb_ratio=2.0, roe=0.2, current_price=100.0),
+    dict(id=2, symbol='BBB', sector='Tech', pe_ratio=None, pb_ratio=0.0, roe=0.1, current_price=50.0),
+    dict(id=3, symbol='CCC', sector='Energy', pe_ratio=30.0, pb_ratio=1.0, roe=None, current_price=None),
+    dict(id=4, symbol='DDD', sector=None, pe_ratio=5.0, pb_ratio=None, roe=-0.1, current_price=10.0),
+]
+
+# A stock matches only if the expression is true; NULL and x / 0 are unknown
+CASES = [
+    ('pe_ratio > 8', {1, 3}),
+    ('not pe_ratio > 8', {4}),
+    ('pe_ratio is null', {2}),
+    ('not (pe_ratio is null)', {1, 3, 4}),
+    ('pe_ratio is not null and not pe_ratio < 8', {1, 3}),
+    ('sector in ["Tech"]', {1, 2}),
+    ('sector not in ["Tech"]', {3}),
+    ('not sector in ["Tech"]', {3}),
+    ('sector is null', {4}),
+    ('pe_ratio in [5, 10]', {1, 4}),
+    ('pe_ratio not in [5, 10]', {3}),
+    ('roe / pb_ratio > 0', {1}),
+    ('not (roe / pb_ratio > 0)', set()),
+    ('roe / pb_ratio is null', {2, 3, 4}),
+    ('pe_ratio > 8 or roe / pb_ratio is null', {1, 2, 3, 4}),
+    ('current_price / (pb_ratio - 2) < 0', {2}),
+    ("symbol == 'AAA' or -pe_ratio < -20", {1, 3}),
+]
+
+
+@pytest.mark.parametrize('expression,expected', CASES)
+def test_screen_matches_sql_semantics(service, db, expression, expected):
+    rows, _ = service.screen_stocks(db, ScreeningFilters(expression=expression, sort_by='id'))
+
+    assert {row['id'] for row in rows} == expected
+
+
+@pytest.mark.parametrize('expression,expected', CASES)
+def test_single_row_evaluation_matches(expression, expected):
+    compiled = compile_expression(expression)
+    rows = [{name: row.get(name) for name in CHANGED_COLUMNS} for row in STOCKS]
+
+    assert {row['id'] for row in rows if compiled.matches_row(row)} == expected
+
+
+@pytest.mark.parametrize('expression', [
+    '',
+    'pe_ratio >',
+    'pe_ratio > > 1',
+    '(pe_ratio > 1',
+    'pe_ratio > 1)',
+    'pe_ratio > 1 $',
+    'foo > 1',
+    'sector in []',
+    "pe_ratio in [1, 'a']",
+    'pe_ratio is',
+])
+def test_malformed_expression_is_rejected(expression):
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize('expression', [
+    'pe_ratio',
+    'pe_ratio + 1',
+    'sector > 1',
+    "sector + 1 > 2",
+    "-sector == 'Tech'",
+    'pe_ratio and roe > 1',
+    'not pe_ratio',
+    "pe_ratio in ['Tech']",
+    'sector in [1]',
+    '(pe_ratio > 1) is null',
+])
+def test_ill_typed_expression_is_rejected(expression):
+    with pytest.raises(ExpressionError):
+        compile_expression(expression)
+
+
+@pytest.mark.parametrize('expression', [
+    '(' * 300 + 'roe > 1' + ')' * 300,
+    '-' * 1000 + 'roe > 1',
+    'not ' * 400 + 'roe > 1',
+])
+def test_deeply_nested_expression_is_rejected(expression):
+    with pytest.raises(ExpressionError, match='nests deeper'):
+        compile_expression(expression)
+
+
+def test_nesting_within_the_limit_compiles():
+    assert compile_expression('(' * 40 + 'roe > 1' + ')' * 40).matches_row({'roe': 2.0})
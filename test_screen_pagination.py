@@ -0,0 +1,91 @@
+"""
+Keyset pagination of /stocks/screen: cursor round-trips, NULLS LAST ordering
+and ties broken on id, on both the SQL path and the columnar engine.
+"""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("numpy")
+
+from app.schemas.schemas import ScreeningFilters  # noqa: E402
+from app.services.pagination import InvalidCursorError, decode_cursor, encode_cursor  # noqa: E402
+
+# Runs of equal values longer than a page, plus NULLs, so pages split ties
+PE_RATIOS = [15.0, None, 10.0, 15.0, 15.0, None, 20.0, 15.0, 10.0, None, 15.0, 5.0]
+STOCKS = [
+    dict(id=i + 1, symbol=f'S{i + 1:02d}', name=f'Stock {i + 1}', pe_ratio=pe) for i, pe in enumerate(PE_RATIOS)
+]
+
+
+def expected_ids(sort_desc):
+    """pe_ratio order with NULLs last, ties and NULLs in id order."""
+    rows = [(pe, i + 1) for i, pe in enumerate(PE_RATIOS)]
+    present = sorted((row for row in rows if row[0] is not None), key=lambda row: (-row[0] if sort_desc else row[0], row[1]))
+    return [i for _, i in present] + [i for pe, i in rows if pe is None]
+
+
+def fetch_all(service, db, **options):
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = service.screen_stocks(db, ScreeningFilters(cursor=cursor, **options))
+        ids.extend(row['id'] for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+        assert pages <= len(PE_RATIOS), "pagination did not terminate"
+
+
+@pytest.mark.parametrize('sort_desc', [False, True])
+def test_cursor_round_trip_visits_every_row_once_in_order(service, db, sort_desc):
+    ids, pages = fetch_all(service, db, sort_by='pe_ratio', sort_desc=sort_desc, limit=2)
+
+    assert ids == expected_ids(sort_desc)
+    assert pages == len(PE_RATIOS) // 2
+
+
+@pytest.mark.parametrize('sort_desc', [False, True])
+def test_nulls_sort_last_in_both_directions(service, db, sort_desc):
+    rows, _ = service.screen_stocks(db, ScreeningFilters(sort_by='pe_ratio', sort_desc=sort_desc))
+
+    values = [row['pe_ratio'] for row in rows]
+    nulls = PE_RATIOS.count(None)
+    assert values[-nulls:] == [None] * nulls
+    assert None not in values[:-nulls]
+
+
+def test_ties_are_broken_on_id_across_page_boundaries(service, db):
+    ids, _ = fetch_all(service, db, sort_by='pe_ratio', limit=1)
+
+    ties = [i for i in ids if PE_RATIOS[i - 1] == 15.0]
+    assert ties == sorted(ties)
+    assert len(ties) == PE_RATIOS.count(15.0)
+
+
+def test_last_page_has_no_cursor(service, db):
+    rows, cursor = service.screen_stocks(db, ScreeningFilters(sort_by='pe_ratio', limit=len(PE_RATIOS)))
+
+    assert len(rows) == len(PE_RATIOS)
+    assert cursor is None
+
+
+def test_cursor_round_trips_its_position():
+    filters = ScreeningFilters(sort_by='pe_ratio', sort_desc=True)
+    cursor = encode_cursor(filters, {'id': 7, 'pe_ratio': 12.5})
+
+    assert decode_cursor(filters.model_copy(update={'cursor': cursor})) == (12.5, 7)
+
+
+def test_cursor_from_another_sort_is_rejected():
+    cursor = encode_cursor(ScreeningFilters(sort_by='pe_ratio'), {'id': 7, 'pe_ratio': 12.5})
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(ScreeningFilters(sort_by='pe_ratio', sort_desc=True, cursor=cursor))
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(ScreeningFilters(sort_by='market_cap', cursor=cursor))
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'bm90IGpzb24', 'WyJwZV9yYXRpbyIsZmFsc2UsIngiLDdd'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(ScreeningFilters(sort_by='pe_ratio', cursor=cursor))
@@ -0,0 +1,85 @@
+"""
+Sector-relative filters: percent ranks and ranks within each sector match
+a brute-force ranking on both screening paths, including after writes move
+values between sectors.
+"""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("numpy")
+
+from app.models.models import Stock  # noqa: E402
+from app.schemas.schemas import ScreeningFilters  # noqa: E402
+
+# Ties, a NULL, a single-stock sector and a stock without a sector
+STOCKS = [
+    dict(id=1, symbol='T1', sector='Tech', roe=0.1),
+    dict(id=2, symbol='T2', sector='Tech', roe=0.2),
+    dict(id=3, symbol='T3', sector='Tech', roe=0.2),
+    dict(id=4, symbol='T4', sector='Tech', roe=0.3),
+    dict(id=5, symbol='T5', sector='Tech', roe=None),
+    dict(id=6, symbol='E1', sector='Energy', roe=0.05),
+    dict(id=7, symbol='E2', sector='Energy', roe=0.15),
+    dict(id=8, symbol='U1', sector='Utilities', roe=0.4),
+    dict(id=9, symbol='X1', sector=None, roe=0.5),
+]
+
+FILTERS = [
+    {'min_sector_percentile': {'roe': 50}},
+    {'max_sector_percentile': {'roe': 50}},
+    {'min_sector_percentile': {'roe': 30}, 'max_sector_percentile': {'roe': 70}},
+    {'min_sector_percentile': {'roe': 0}},
+    {'max_sector_percentile': {'roe': 100}},
+    {'max_sector_rank': {'roe': 1}},
+    {'max_sector_rank': {'roe': 2}},
+]
+
+
+def brute_force(db, options):
+    """Ids passing ``options``, ranking each sector's non-NULL roe values directly."""
+    rows = [(stock.id, stock.sector, stock.roe) for stock in db.query(Stock)]
+    matches = set()
+    for stock_id, sector, value in rows:
+        if sector is None or value is None:
+            continue
+        peers = [v for _, s, v in rows if s == sector and v is not None]
+        below = sum(v < value for v in peers)
+        percentile = 100 * below / (len(peers) - 1) if len(peers) > 1 else 0.0
+        rank = 1 + sum(v > value for v in peers)
+        if percentile < options.get('min_sector_percentile', {}).get('roe', 0):
+            continue
+        if percentile > options.get('max_sector_percentile', {}).get('roe', 100):
+            continue
+        if rank > options.get('max_sector_rank', {}).get('roe', len(peers)):
+            continue
+        matches.add(stock_id)
+    return matches
+
+
+def screen_ids(service, db, options):
+    rows, _ = service.screen_stocks(db, ScreeningFilters(**options))
+    return {row['id'] for row in rows}
+
+
+@pytest.mark.parametrize('options', FILTERS)
+def test_rank_filters_match_brute_force(service, db, options):
+    assert screen_ids(service, db, options) == brute_force(db, options)
+
+
+def test_top_of_each_sector(service, db):
+    assert screen_ids(service, db, {'max_sector_rank': {'roe': 1}}) == {4, 7, 8}
+
+
+@pytest.mark.parametrize('options', FILTERS)
+def test_writes_keep_the_index_current(service, db, options):
+    # Load the index, then move values and a sector through StockService
+    screen_ids(service, db, options)
+    # Rows share one set of columns, as parsed overviews do; None keeps a value
+    service.upsert_stock_rows(db, [
+        {'symbol': 'T1', 'name': None, 'sector': None, 'roe': 0.35},
+        {'symbol': 'E2', 'name': None, 'sector': 'Tech', 'roe': None},
+        {'symbol': 'T5', 'name': None, 'sector': None, 'roe': 0.25},
+    ])
+
+    assert screen_ids(service, db, options) == brute_force(db, options)